@@ -1,16 +1,20 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from datetime import date, timedelta
+from datetime import date
 from pathlib import Path
-import matplotlib.pyplot as plt
-from PIL import Image
-from utils import load_data, clean_numeric_column, calcular_peso_estimado, style_kpi_df, reconstruir_tabla_base, calcular_curva_mortalidad
+from utils import (
+    ARCHIVO_ICONO, ARCHIVO_LOGO, casilla_graficos_navegador, guardar_resultados_base, imagen_png, iniciar_trazas,
+    load_coeficientes, load_precios_alimento, load_referencia, mostrar_panel_rendimiento, style_kpi_df,
+    tabla_resultados_base,
+)
+from graficos import COLORES_PARTICIPACION, mostrar_grafico
+from motor import ARCHIVO_PRECIOS, FASES, calcular_presupuesto, lineas_disponibles
+from trazas import etapa, tramo
 
 # --- CONFIGURACIÓN DE PÁGINA ---
 BASE_DIR = Path(__file__).resolve().parent
 try:
-    page_icon_image = Image.open(BASE_DIR / "ARCHIVOS" / "pollito_tapabocas.ico")
+    page_icon_image = imagen_png(ARCHIVO_ICONO)
 except FileNotFoundError:
     page_icon_image = "🐔"
 
@@ -19,18 +23,21 @@ st.set_page_config(
     page_icon=page_icon_image, 
     layout="wide",
 )
+iniciar_trazas("Presupuesto Principal")
 
 # --- CARGA DE DATOS ---
-df_coeffs = load_data(BASE_DIR / "ARCHIVOS" / "Cons_Acum_Peso.csv")
-df_coeffs_15 = load_data(BASE_DIR / "ARCHIVOS" / "Cons_Acum_Peso_15.csv")
-df_referencia = load_data(BASE_DIR / "ARCHIVOS" / "ROSS_COBB_HUBBARD_2025.csv")
+etapa("Carga de datos")
+df_coeffs, df_coeffs_15 = load_coeficientes()
+referencia = load_referencia(BASE_DIR / "ARCHIVOS" / "ROSS_COBB_HUBBARD_2025.csv")
+precios_alimento = load_precios_alimento(ARCHIVO_PRECIOS)
 
 # =============================================================================
 # --- PANEL LATERAL DE ENTRADAS (SIDEBAR) ---
 # =============================================================================
+etapa("Panel lateral")
 st.sidebar.header("1. Valores de Entrada")
 try:
-    logo_sidebar = Image.open(BASE_DIR / "ARCHIVOS" / "log_PEQ.png")
+    logo_sidebar = imagen_png(ARCHIVO_LOGO, 150)
     st.sidebar.image(logo_sidebar, width=150)
 except Exception:
     st.sidebar.warning("Logo no encontrado.")
@@ -41,8 +48,7 @@ st.session_state.fecha_llegada = st.sidebar.date_input("Fecha de llegada", date.
 st.session_state.costo_pollito = st.sidebar.number_input("Costo del Pollito ($/ave)", 0.0, 5000.0, 2000.0, format="%.2f")
 
 st.sidebar.subheader("Línea Genética")
-razas = sorted(df_referencia['RAZA'].unique()) if df_referencia is not None else ["ROSS 308 AP", "COBB", "HUBBARD", "ROSS"]
-sexos = sorted(df_referencia['SEXO'].unique()) if df_referencia is not None else ["MIXTO", "HEMBRA", "MACHO"]
+razas, sexos = lineas_disponibles(referencia) if referencia is not None else (["ROSS 308 AP", "COBB", "HUBBARD", "ROSS"], ["MIXTO", "HEMBRA", "MACHO"])
 st.session_state.raza_seleccionada = st.sidebar.selectbox("RAZA", razas)
 st.session_state.sexo_seleccionado = st.sidebar.selectbox("SEXO", sexos)
 
@@ -75,6 +81,10 @@ st.session_state.val_iniciador = st.sidebar.number_input("Costo Iniciador ($/Kg)
 st.session_state.val_engorde = st.sidebar.number_input("Costo Engorde ($/Kg)", 0.0, 5200.0, 2100.0, format="%.2f")
 st.session_state.val_retiro = st.sidebar.number_input("Costo Retiro ($/Kg)", 0.0, 5200.0, 2050.0, format="%.2f")
 st.session_state.otros_costos_ave = st.sidebar.number_input("Otros Costos Estimados ($/ave)", 0.0, 10000.0, 1500.0, format="%.2f", help="Incluye mano de obra, sanidad, energía, depreciación, etc.")
+if precios_alimento is not None:
+    st.sidebar.caption(f"📅 El alimento se costea con la serie de precios por fecha ({ARCHIVO_PRECIOS.name}, {len(precios_alimento)} cambios de precio); los costos por fase de arriba solo cubren las fechas sin precio.")
+if st.session_state.get("version_coeficientes"):
+    st.sidebar.caption(f"📐 El peso estimado usa los coeficientes ajustados con registros propios (versión {st.session_state.version_coeficientes}); se cambian en la página 'Ajuste de Curvas'.")
 
 st.sidebar.markdown("---")
 if st.sidebar.button("Generar Presupuesto", type="primary", use_container_width=True):
@@ -83,10 +93,11 @@ if st.sidebar.button("Generar Presupuesto", type="primary", use_container_width=
 # =============================================================================
 # --- ÁREA PRINCIPAL ---
 # =============================================================================
+etapa("Encabezado")
 col1_header, col2_header = st.columns([1, 4])
 with col1_header:
     try:
-        logo_main = Image.open(BASE_DIR / "ARCHIVOS" / "log_PEQ.png")
+        logo_main = imagen_png(ARCHIVO_LOGO, 150)
         st.image(logo_main, width=150)
     except Exception:
         pass
@@ -104,54 +115,27 @@ else:
         try:
             st.header("Resultados del Presupuesto")
             
-            # 1. CÁLCULOS BASE
-            tabla_filtrada = reconstruir_tabla_base(st.session_state, df_referencia, df_coeffs, df_coeffs_15)
+            # 1. CÁLCULOS BASE (MOTOR SIN STREAMLIT)
+            etapa("Cálculo del presupuesto (motor)")
+            kpis, tabla_filtrada = calcular_presupuesto(st.session_state, referencia, df_coeffs, df_coeffs_15, precios_alimento)
 
             if tabla_filtrada is None or tabla_filtrada.empty:
                 st.error("No se pudieron generar los datos base. Verifique los parámetros.")
                 st.stop()
+            if kpis is not None:
+                guardar_resultados_base(kpis)
 
-            df_interp = tabla_filtrada.drop_duplicates(subset=['Peso_Estimado']).sort_values('Peso_Estimado')
-            consumo_total_objetivo_ave = np.interp(st.session_state.peso_objetivo, df_interp['Peso_Estimado'], df_interp['Cons_Acum_Ajustado'])
-            
-            limite_pre = st.session_state.pre_iniciador
-            limite_ini = st.session_state.pre_iniciador + st.session_state.iniciador
-            limite_ret = consumo_total_objetivo_ave - st.session_state.retiro if st.session_state.retiro > 0 else np.inf
-            conditions = [
-                tabla_filtrada['Cons_Acum_Ajustado'] <= limite_pre,
-                tabla_filtrada['Cons_Acum_Ajustado'].between(limite_pre, limite_ini, inclusive='right'),
-                tabla_filtrada['Cons_Acum_Ajustado'] > limite_ret
-            ]
-            choices = ['Pre-iniciador', 'Iniciador', 'Retiro']
-            tabla_filtrada['Fase_Alimento'] = np.select(conditions, choices, default='Engorde')
-            
-            closest_idx = (tabla_filtrada['Peso_Estimado'] - st.session_state.peso_objetivo).abs().idxmin()
-            
-            # 2. CÁLCULOS DE MORTALIDAD Y CONSUMO (ESCENARIO BASE: LINEAL)
+            closest_idx = tabla_filtrada.index[-1]
             dia_obj = tabla_filtrada.loc[closest_idx, 'Dia']
-            total_mortalidad_aves = st.session_state.aves_programadas * (st.session_state.mortalidad_objetivo / 100.0)
-            mortalidad_acum = calcular_curva_mortalidad(dia_obj, total_mortalidad_aves, "Lineal (Uniforme)", 50)
-            
-            if len(mortalidad_acum) > len(tabla_filtrada):
-                mortalidad_acum = mortalidad_acum[:len(tabla_filtrada)]
-            
-            tabla_filtrada = tabla_filtrada.iloc[:len(mortalidad_acum)]
-            tabla_filtrada['Mortalidad_Acumulada'] = mortalidad_acum
-            tabla_filtrada['Saldo'] = st.session_state.aves_programadas - tabla_filtrada['Mortalidad_Acumulada']
-            tabla_filtrada['Fecha'] = tabla_filtrada['Dia'].apply(lambda d: st.session_state.fecha_llegada + timedelta(days=d - 1))
-            
-            tabla_filtrada['Cons_Diario_Ave_gr'] = tabla_filtrada['Cons_Acum_Ajustado'].diff().fillna(tabla_filtrada['Cons_Acum_Ajustado'].iloc[0])
             if st.session_state.unidades_calculo == "Kilos":
                 daily_col = "Kilos Diarios"
                 total_col = "Kilos Totales"
-                tabla_filtrada[daily_col] = (tabla_filtrada['Cons_Diario_Ave_gr'] * tabla_filtrada['Saldo']) / 1000
             else:
                 daily_col = "Bultos Diarios"
                 total_col = "Bultos Totales"
-                tabla_filtrada[daily_col] = np.ceil((tabla_filtrada['Cons_Diario_Ave_gr'] * tabla_filtrada['Saldo']) / 40000)
-            tabla_filtrada[total_col] = tabla_filtrada[daily_col].cumsum()
             
             # 3. VISUALIZACIONES
+            etapa("Tabla de proyección (Styler)")
             st.markdown(f"### Tabla de Proyección para {st.session_state.aves_programadas:,.0f} aves ({st.session_state.raza_seleccionada} - {st.session_state.sexo_seleccionado})")
             
             columnas_a_mostrar = ['Dia', 'Fecha', 'Saldo', 'Cons_Acum_Ajustado', 'Peso_Estimado', daily_col, total_col, 'Fase_Alimento']
@@ -159,19 +143,30 @@ else:
             styler = tabla_filtrada[columnas_a_mostrar].style.format(format_dict)
             styler.apply(lambda row: ['background-color: #ffcccc' if row.name == closest_idx else '' for _ in row], axis=1)
             st.dataframe(styler.hide(axis="index"), use_container_width=True)
+            tabla_guardada = tabla_resultados_base()
+            if tabla_guardada is not None:
+                st.download_button(
+                    "⬇️ Descargar proyección (CSV)", tabla_guardada.to_csv(index=False).encode("utf-8"),
+                    file_name="proyeccion_presupuesto.csv", mime="text/csv",
+                )
             
             # 4. ANÁLISIS ECONÓMICO
+            etapa("Resumen del alimento")
             st.subheader("Resumen del Presupuesto de Alimento")
             consumo_por_fase = tabla_filtrada.groupby('Fase_Alimento')[daily_col].sum()
             
-            fases = ['Pre-iniciador', 'Iniciador', 'Engorde', 'Retiro']
+            fases = FASES
             unidades = [consumo_por_fase.get(f, 0) for f in fases]
             factor_kg = 1 if st.session_state.unidades_calculo == "Kilos" else 40
             costos_kg_map = {
                 'Pre-iniciador': st.session_state.val_pre_iniciador, 'Iniciador': st.session_state.val_iniciador,
                 'Engorde': st.session_state.val_engorde, 'Retiro': st.session_state.val_retiro
             }
-            costos = [(u * factor_kg) * costos_kg_map.get(f, 0) for f, u in zip(fases, unidades)]
+            if precios_alimento is not None and 'Costo_Kg_Dia' in tabla_filtrada:
+                valor_por_fase = (tabla_filtrada[daily_col] * factor_kg * tabla_filtrada['Costo_Kg_Dia']).groupby(tabla_filtrada['Fase_Alimento']).sum()
+                costos = [valor_por_fase.get(f, 0) for f in fases]
+            else:
+                costos = [(u * factor_kg) * costos_kg_map.get(f, 0) for f, u in zip(fases, unidades)]
             costo_total_alimento = sum(costos)
 
             df_resumen = pd.DataFrame({
@@ -182,50 +177,22 @@ else:
             styler_resumen = df_resumen.style.format({f"Consumo ({st.session_state.unidades_calculo})": "{:,.0f}", "Valor del Alimento ($)": "${:,.2f}"})
             st.dataframe(styler_resumen.hide(axis="index"), use_container_width=True)
 
-            costo_total_pollitos = st.session_state.aves_programadas * st.session_state.costo_pollito
-            costo_total_otros = st.session_state.aves_programadas * st.session_state.otros_costos_ave
-            costo_total_lote = costo_total_alimento + costo_total_pollitos + costo_total_otros
-
-            aves_producidas = tabla_filtrada['Saldo'].iloc[-1]
-            peso_obj_final = tabla_filtrada['Peso_Estimado'].iloc[-1]
-            kilos_totales_producidos = (aves_producidas * peso_obj_final) / 1000 if aves_producidas > 0 else 0
-            consumo_total_kg = tabla_filtrada[daily_col].sum() * factor_kg
-            
-            if kilos_totales_producidos > 0:
-                costo_total_kilo = costo_total_lote / kilos_totales_producidos
-                conversion_alimenticia = consumo_total_kg / kilos_totales_producidos
-                costo_alimento_kilo = costo_total_alimento / kilos_totales_producidos
-                costo_pollito_kilo = costo_total_pollitos / kilos_totales_producidos
-                costo_otros_kilo = costo_total_otros / kilos_totales_producidos
-                
-                tabla_filtrada['Costo_Kg_Dia'] = tabla_filtrada['Fase_Alimento'].map(costos_kg_map)
-                tabla_filtrada['Costo_Alimento_Diario_Ave'] = (tabla_filtrada['Cons_Diario_Ave_gr'] / 1000) * tabla_filtrada['Costo_Kg_Dia']
-                tabla_filtrada['Costo_Alimento_Acum_Ave'] = tabla_filtrada['Costo_Alimento_Diario_Ave'].cumsum()
-                tabla_filtrada['Mortalidad_Diaria'] = tabla_filtrada['Mortalidad_Acumulada'].diff().fillna(tabla_filtrada['Mortalidad_Acumulada'].iloc[0])
-                costo_alimento_desperdiciado = (tabla_filtrada['Mortalidad_Diaria'] * tabla_filtrada['Costo_Alimento_Acum_Ave']).sum()
-                
-                aves_muertas_total = st.session_state.aves_programadas - aves_producidas
-                costo_pollitos_perdidos = aves_muertas_total * st.session_state.costo_pollito
-                costo_otros_desperdiciados = aves_muertas_total * st.session_state.otros_costos_ave
-                costo_desperdicio_total = costo_pollitos_perdidos + costo_alimento_desperdiciado + costo_otros_desperdiciados
-
-                st.session_state['resultados_base'] = {
-                    "kilos_totales_producidos": kilos_totales_producidos, "consumo_total_kg": consumo_total_kg,
-                    "costo_total_alimento": costo_total_alimento, "costo_total_pollitos": costo_total_pollitos,
-                    "costo_total_otros": costo_total_otros, "costo_total_lote": costo_total_lote,
-                    "costo_alimento_kilo": costo_alimento_kilo, "costo_pollito_kilo": costo_pollito_kilo,
-                    "costo_otros_kilo": costo_otros_kilo, "costo_total_por_kilo": costo_total_kilo,
-                    "conversion_alimenticia": conversion_alimenticia,
-                    "costo_total_mortalidad": costo_desperdicio_total,
-                    "costo_alimento_mortalidad_total": costo_alimento_desperdiciado,
-                    "costo_pollito_mortalidad_total": costo_pollitos_perdidos,
-                    "costo_otros_mortalidad_total": costo_otros_desperdiciados,
-                    "costo_alimento_mortalidad_kilo": costo_alimento_desperdiciado / kilos_totales_producidos,
-                    "costo_pollito_mortalidad_kilo": costo_pollitos_perdidos / kilos_totales_producidos,
-                    "costo_otros_mortalidad_kilo": costo_otros_desperdiciados / kilos_totales_producidos,
-                    "tabla_proyeccion": tabla_filtrada
-                }
+            if kpis is not None:
+                aves_producidas = kpis["aves_producidas"]
+                kilos_totales_producidos = kpis["kilos_totales_producidos"]
+                consumo_total_objetivo_ave = kpis["consumo_objetivo_ave"]
+                peso_obj_final = kpis["peso_final_ave"]
+                costo_total_pollitos = kpis["costo_total_pollitos"]
+                costo_total_otros = kpis["costo_total_otros"]
+                costo_total_lote = kpis["costo_total_lote"]
+                costo_total_kilo = kpis["costo_total_por_kilo"]
+                conversion_alimenticia = kpis["conversion_alimenticia"]
+                costo_alimento_kilo = kpis["costo_alimento_kilo"]
+                costo_pollito_kilo = kpis["costo_pollito_kilo"]
+                costo_otros_kilo = kpis["costo_otros_kilo"]
+                costo_desperdicio_total = kpis["costo_total_mortalidad"]
 
+                etapa("Indicadores")
                 st.subheader("Indicadores de Eficiencia Clave")
                 kpi_cols = st.columns(3)
                 kpi_cols[0].metric("Costo Total por Kilo", f"${costo_total_kilo:,.2f}")
@@ -254,38 +221,24 @@ else:
                     st.dataframe(style_kpi_df(df_kpi.iloc[7:]), use_container_width=True)
 
                 st.markdown("---")
+                etapa("Gráficos")
                 st.subheader("Gráficos de Resultados")
                 col1_graf, col2_graf = st.columns(2)
                 with col1_graf:
-                    fig, ax = plt.subplots()
-                    ax.plot(tabla_filtrada['Dia'], tabla_filtrada['Peso'], color='darkred', label='Peso de Referencia')
-                    ax.plot(tabla_filtrada['Dia'], tabla_filtrada['Peso_Estimado'], color='lightcoral', label='Peso Estimado')
-                    ax.plot(dia_obj, peso_obj_final, 'o', color='blue', markersize=8, label=f"Día {dia_obj:.0f}: {peso_obj_final:,.0f} gr")
-                    ax.legend()
-                    ax.set_xlabel("Día del Ciclo")
-                    ax.set_ylabel("Peso (gramos)")
-                    ax.set_title("Gráfico de Crecimiento")
-                    ax.grid(True, linestyle='--', alpha=0.6)
-                    
-                    try:
-                        from matplotlib.offsetbox import OffsetImage, AnnotationBbox
-                        logo_img_f = Image.open(BASE_DIR / "ARCHIVOS" / "log_PEQ.png")
-                        imagebox = OffsetImage(logo_img_f, zoom=0.2, alpha=0.15)
-                        ab = AnnotationBbox(imagebox, (0.95, 0.05), xycoords='axes fraction', frameon=False, box_alignment=(1, 0))
-                        ax.add_artist(ab)
-                    except Exception:
-                        pass
-                    st.pyplot(fig)
+                    with tramo("Gráfico de crecimiento"):
+                        mostrar_grafico(
+                            "crecimiento", dia=tabla_filtrada['Dia'].to_numpy(), peso_referencia=tabla_filtrada['Peso'].to_numpy(),
+                            peso_estimado=tabla_filtrada['Peso_Estimado'].to_numpy(), dia_obj=dia_obj, peso_obj=peso_obj_final,
+                        )
 
                 with col2_graf:
                     sizes = [costo_alimento_kilo, costo_pollito_kilo, costo_otros_kilo]
                     labels = [f"Alimento\n${sizes[0]:,.2f}", f"Pollitos\n${sizes[1]:,.2f}", f"Otros Costos\n${sizes[2]:,.2f}"]
-                    colors = ['darkred', 'lightblue', 'lightcoral']
-
-                    fig_pie, ax_pie = plt.subplots()
-                    ax_pie.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90, colors=colors)
-                    ax_pie.set_title(f"Participación de Costos\nCosto Total: ${costo_total_kilo:,.2f}/Kg")
-                    st.pyplot(fig_pie)
+                    with tramo("Gráfico de participación"):
+                        mostrar_grafico(
+                            "participacion", tamanos=sizes, etiquetas=labels, colores=COLORES_PARTICIPACION,
+                            titulo=f"Participación de Costos\nCosto Total: ${costo_total_kilo:,.2f}/Kg",
+                        )
             else:
                 st.warning("No se pueden calcular KPIs: los kilos producidos son cero.")
 
@@ -301,3 +254,6 @@ else:
 Desarrollado por la Dirección Técnica de Albateq dtecnico@albateq.com 
             </div>
             """, unsafe_allow_html=True)
+
+casilla_graficos_navegador()
+mostrar_panel_rendimiento()
@@ -0,0 +1,213 @@
+"""
+Ajuste de los coeficientes de peso a partir de registros históricos de la granja. No depende de Streamlit.
+
+Los coeficientes entregados (ARCHIVOS/Cons_Acum_Peso.csv y Cons_Acum_Peso_15.csv) modelan el
+peso como un polinomio de grado 4 del consumo acumulado, por línea (RAZA, SEXO): el de 15 días
+se ajustó con los días 1-15 y el general con todos los días. Aquí se repite ese ajuste con los
+registros propios (RAZA, SEXO, Dia, Cons_Acum, Peso) para todas las líneas y tramos en una sola
+resolución por lotes de mínimos cuadrados, y cada ajuste se guarda como una versión en
+ARCHIVOS/ajustes/<versión>/ con los dos CSV en el mismo esquema que los entregados y un
+manifiesto. Las líneas sin registros suficientes conservan los coeficientes entregados.
+
+    ajuste = ajustar_coeficientes(registros)
+    version = guardar_ajuste(ajuste)
+    df_coeffs, df_coeffs_15 = coeficientes_de_version(version)
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+from math import comb
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from motor import COLUMNAS_COEFICIENTES, DIR_ARCHIVOS, clean_numeric_column, leer_csv_cacheado
+
+DIR_AJUSTES = DIR_ARCHIVOS / "ajustes"
+ARCHIVO_COEFICIENTES = "Cons_Acum_Peso.csv"
+ARCHIVO_COEFICIENTES_15 = "Cons_Acum_Peso_15.csv"
+ARCHIVO_MANIFIESTO = "ajuste.json"
+ESQUEMA_VERSION = 1
+
+COLUMNAS_REGISTROS = ['RAZA', 'SEXO', 'Dia', 'Cons_Acum', 'Peso']
+DIA_FIN_AJUSTE_15 = 15  # el modelo de 15 días se ajusta con los días 1-15 (rige hasta el 14)
+GRADO = len(COLUMNAS_COEFICIENTES) - 1
+TRAMOS = {0: "Días 1-15", 1: "Todos los días"}
+
+
+# =============================================================================
+# --- REGISTROS ---
+# =============================================================================
+
+def normalizar_registros(df):
+    """
+    Registros históricos con números limpios (comas decimales incluidas). Descarta las filas
+    incompletas o con día, consumo o peso no positivos. Lanza ValueError si falta una columna.
+    """
+    faltantes = [c for c in COLUMNAS_REGISTROS if c not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en los registros: {', '.join(faltantes)}.")
+    registros = pd.DataFrame({
+        'RAZA': df['RAZA'].astype(str).str.strip(),
+        'SEXO': df['SEXO'].astype(str).str.strip(),
+        **{c: clean_numeric_column(df[c]).astype(float) for c in ('Dia', 'Cons_Acum', 'Peso')},
+    }).dropna()
+    registros = registros[(registros[['Dia', 'Cons_Acum', 'Peso']] > 0).all(axis=1)]
+    return registros.astype({'Dia': int}).reset_index(drop=True)
+
+
+def huella_registros(registros):
+    """Huella del contenido de los registros (define la versión del ajuste)."""
+    contenido = pd.util.hash_pandas_object(registros[COLUMNAS_REGISTROS], index=False).to_numpy().tobytes()
+    return hashlib.sha256(contenido).hexdigest()[:12]
+
+
+# =============================================================================
+# --- AJUSTE POR LOTES ---
+# =============================================================================
+
+# _BINOMIAL[k, j] = C(k, j): pasa un polinomio en (x - m) / h a potencias de x.
+_BINOMIAL = np.array([[comb(k, j) for j in range(GRADO + 1)] for k in range(GRADO + 1)], dtype=float)
+
+
+def ajustar_coeficientes(registros):
+    """
+    Ajusta por mínimos cuadrados el polinomio de grado 4 del peso en el consumo acumulado
+    para cada (línea, tramo) a la vez. Cada registro entra en el tramo general y, si es de los
+    días 1-15, también en el de 15 días. El consumo se centra y escala a [-1, 1] por grupo
+    (para que las ecuaciones normales queden bien condicionadas); las sumas de potencias salen
+    de np.bincount sobre todos los registros y los sistemas 5×5 se resuelven juntos con
+    np.linalg.solve. Devuelve {'df_coeffs', 'df_coeffs_15', 'calidad', 'registros', 'version'};
+    los grupos con menos de 5 consumos distintos quedan fuera.
+    """
+    registros = normalizar_registros(registros)
+    if registros.empty:
+        vacia = pd.DataFrame(columns=['RAZA', 'SEXO', *COLUMNAS_COEFICIENTES])
+        calidad = pd.DataFrame(columns=['RAZA', 'SEXO', 'Tramo', 'Registros', 'Consumos_Distintos', 'RMSE_g', 'R2', 'Ajustado'])
+        return {"df_coeffs": vacia, "df_coeffs_15": vacia.copy(), "calidad": calidad,
+                "registros": 0, "version": huella_registros(registros)}
+    hasta_15 = registros['Dia'].to_numpy() <= DIA_FIN_AJUSTE_15
+    filas = pd.concat([registros.assign(Tramo=1), registros[hasta_15].assign(Tramo=0)], ignore_index=True)
+    claves = ['RAZA', 'SEXO', 'Tramo']
+    grupo = filas.groupby(claves, sort=True).ngroup().to_numpy()
+    grupos = filas[claves].drop_duplicates().sort_values(claves).reset_index(drop=True)
+    n_grupos = len(grupos)
+    x = filas['Cons_Acum'].to_numpy(dtype=float)
+    y = filas['Peso'].to_numpy(dtype=float)
+
+    # Centro y semiancho del consumo de cada grupo, y consumos distintos (rango suficiente).
+    x_min = np.full(n_grupos, np.inf)
+    x_max = np.full(n_grupos, -np.inf)
+    np.minimum.at(x_min, grupo, x)
+    np.maximum.at(x_max, grupo, x)
+    centro, semiancho = (x_max + x_min) / 2, (x_max - x_min) / 2
+    orden = np.lexsort((x, grupo))
+    nuevo = np.r_[True, (np.diff(grupo[orden]) != 0) | (np.diff(x[orden]) != 0)]
+    distintos = np.bincount(grupo[orden][nuevo], minlength=n_grupos)
+    validos = distintos > GRADO
+    semiancho = np.where(validos, semiancho, 1.0)
+
+    # Ecuaciones normales de todos los grupos: Gram[g, a, b] = Σ t^(a+b), Xty[g, a] = Σ t^a·y.
+    t = (x - centro[grupo]) / semiancho[grupo]
+    potencias = t[:, None] ** np.arange(2 * GRADO + 1)
+    sumas = np.stack([np.bincount(grupo, potencias[:, p], n_grupos) for p in range(2 * GRADO + 1)], axis=1)
+    gram = sumas[:, np.add.outer(np.arange(GRADO + 1), np.arange(GRADO + 1))]
+    xty = np.stack([np.bincount(grupo, potencias[:, a] * y, n_grupos) for a in range(GRADO + 1)], axis=1)
+    gram[~validos] = np.eye(GRADO + 1)
+    escalados = np.linalg.solve(gram, xty[:, :, None])[:, :, 0]
+
+    # Calidad del ajuste por grupo (en la escala original, en gramos).
+    residuo = y - np.einsum('nk,nk->n', potencias[:, :GRADO + 1], escalados[grupo])
+    n = np.bincount(grupo, minlength=n_grupos)
+    media = np.bincount(grupo, y, n_grupos) / n
+    ss_res = np.bincount(grupo, residuo ** 2, n_grupos)
+    ss_tot = np.bincount(grupo, (y - media[grupo]) ** 2, n_grupos)
+
+    # c_j = Σ_k c'_k · C(k, j) · (-m)^(k-j) / h^k
+    k, j = np.indices((GRADO + 1, GRADO + 1))
+    exponente = np.clip(k - j, 0, None)
+    cambio = np.where(k >= j, _BINOMIAL * (-centro[:, None, None]) ** exponente, 0.0) / semiancho[:, None, None] ** k
+    coeficientes = np.einsum('gk,gkj->gj', escalados, cambio)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        calidad = grupos.assign(
+            Tramo=grupos['Tramo'].map(TRAMOS), Registros=n, Consumos_Distintos=distintos,
+            RMSE_g=np.where(validos, np.sqrt(ss_res / n), np.nan),
+            R2=np.where(validos, 1 - ss_res / ss_tot, np.nan), Ajustado=validos,
+        )
+    tabla = pd.concat([grupos, pd.DataFrame(coeficientes, columns=COLUMNAS_COEFICIENTES)], axis=1)[validos]
+    de_tramo = lambda tramo: tabla[tabla['Tramo'] == tramo].drop(columns='Tramo').reset_index(drop=True)
+    return {"df_coeffs": de_tramo(1), "df_coeffs_15": de_tramo(0), "calidad": calidad,
+            "registros": len(registros), "version": huella_registros(registros)}
+
+
+def combinar_coeficientes(entregados, ajustados):
+    """Coeficientes entregados con las líneas ajustadas reemplazadas (y las nuevas agregadas al final)."""
+    if entregados is None:
+        return ajustados.reset_index(drop=True)
+    ajustadas = set(zip(ajustados['RAZA'], ajustados['SEXO']))
+    conservar = [linea not in ajustadas for linea in zip(entregados['RAZA'], entregados['SEXO'])]
+    return pd.concat([entregados[conservar], ajustados], ignore_index=True)[['RAZA', 'SEXO', *COLUMNAS_COEFICIENTES]]
+
+
+# =============================================================================
+# --- VERSIONES GUARDADAS ---
+# =============================================================================
+
+def _escribir_atomico(ruta, texto):
+    descriptor, temporal = tempfile.mkstemp(prefix=ruta.stem, suffix=".tmp", dir=ruta.parent)
+    with os.fdopen(descriptor, "w", encoding="utf-8") as archivo:
+        archivo.write(texto)
+    os.chmod(temporal, 0o644)
+    os.replace(temporal, ruta)
+
+
+def guardar_ajuste(ajuste, descripcion="", directorio=DIR_AJUSTES, entregados=DIR_ARCHIVOS):
+    """
+    Guarda el ajuste como ARCHIVOS/ajustes/<versión>/ (los dos CSV completos, combinados con los
+    entregados, y ajuste.json). La versión es la huella de los registros: volver a guardar el
+    mismo ajuste no duplica nada. Devuelve la versión.
+    """
+    version = ajuste["version"]
+    carpeta = Path(directorio) / version
+    carpeta.mkdir(parents=True, exist_ok=True)
+    entregados = Path(entregados)
+    for nombre, clave in ((ARCHIVO_COEFICIENTES, "df_coeffs"), (ARCHIVO_COEFICIENTES_15, "df_coeffs_15")):
+        base = pd.read_csv(entregados / nombre) if (entregados / nombre).exists() else None
+        _escribir_atomico(carpeta / nombre, combinar_coeficientes(base, ajuste[clave]).to_csv(index=False))
+    calidad = ajuste["calidad"]
+    manifiesto = {
+        "esquema": ESQUEMA_VERSION,
+        "version": version,
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "descripcion": descripcion,
+        "registros": ajuste["registros"],
+        "lineas_ajustadas": sorted({f"{r} - {s}" for r, s in zip(calidad['RAZA'][calidad['Ajustado']],
+                                                               calidad['SEXO'][calidad['Ajustado']])}),
+        "calidad": json.loads(calidad.to_json(orient="records")),
+    }
+    _escribir_atomico(carpeta / ARCHIVO_MANIFIESTO, json.dumps(manifiesto, indent=1, ensure_ascii=False))
+    return version
+
+
+def versiones_de_ajuste(directorio=DIR_AJUSTES):
+    """Manifiestos de las versiones guardadas, de la más reciente a la más antigua."""
+    manifiestos = []
+    for ruta in Path(directorio).glob(f"*/{ARCHIVO_MANIFIESTO}"):
+        try:
+            manifiesto = json.loads(ruta.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if manifiesto.get("esquema") == ESQUEMA_VERSION:
+            manifiestos.append(manifiesto)
+    return sorted(manifiestos, key=lambda m: m["fecha"], reverse=True)
+
+
+def coeficientes_de_version(version, directorio=DIR_AJUSTES):
+    """(df_coeffs, df_coeffs_15) de una versión guardada, desde la caché de archivos del proceso."""
+    carpeta = Path(directorio) / version
+    return leer_csv_cacheado(carpeta / ARCHIVO_COEFICIENTES), leer_csv_cacheado(carpeta / ARCHIVO_COEFICIENTES_15)
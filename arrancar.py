@@ -0,0 +1,48 @@
+"""
+Arranque de la app con precalentamiento.
+
+Antes de levantar el servidor de Streamlit (en este mismo proceso) llena las cachés que usan
+las páginas: lee la tabla genética y los coeficientes, arma las tablas base e inversas de cada
+línea (motor.precalentar) e importa matplotlib. Así la primera sesión después de reiniciar el
+contenedor no paga esa carga. Los argumentos que no son de este script pasan a "streamlit run".
+
+Uso:
+    python arrancar.py
+    python arrancar.py --server.port 8501 --server.headless true
+    python arrancar.py --sin-graficos          # no importa matplotlib por adelantado
+"""
+
+import argparse
+import sys
+import time
+
+import motor
+
+PAGINA_PRINCIPAL = motor.BASE_DIR / "1_Presupuesto_Principal.py"
+
+
+def precalentar(graficos=True, informar=print):
+    """Llena las cachés del proceso (y opcionalmente importa matplotlib); devuelve los ms por paso."""
+    tiempos = motor.precalentar()
+    if graficos:
+        inicio = time.perf_counter()
+        import figuras  # noqa: F401  (importa matplotlib y deja listas las figuras)
+        tiempos["matplotlib"] = (time.perf_counter() - inicio) * 1000
+    informar("Precalentamiento: " + ", ".join(f"{paso} {ms:,.0f} ms" for paso, ms in tiempos.items()))
+    return tiempos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sin-graficos", action="store_true", help="No importa matplotlib antes de arrancar.")
+    args, opciones_streamlit = parser.parse_known_args(argv)
+
+    precalentar(graficos=not args.sin_graficos)
+
+    from streamlit.web import cli as stcli
+    sys.argv = ["streamlit", "run", str(PAGINA_PRINCIPAL), *opciones_streamlit]
+    return stcli.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,450 @@
+"""
+Banco de rendimiento de las rutas calientes del presupuesto, con verificación contra
+resultados dorados.
+
+Cronometra, para todas las líneas (RAZA, SEXO) de ROSS_COBB_HUBBARD_2025.csv y una malla de
+parámetros, la construcción de la tabla base, las curvas de mortalidad, el día óptimo de
+sacrificio (página 5), la sensibilidad al peso objetivo (página 3), la búsqueda del plan de
+alimentación (un caso por línea, porque ya recorre su propia malla) y el presupuesto por
+lotes, la edición de un lote (precio o mortalidad) con y sin la memoización por etapa
+de GRAFO_ETAPAS, y el seguimiento de lotes en curso (anexar un día real y refrescar la
+reproyección de todos). Guarda los tiempos en JSON para comparar corridas y verifica que los KPIs
+coincidan con ARCHIVOS/kpis_dorados.json dentro de la tolerancia; si no coinciden termina con
+código 1. Las rutas memoizadas se comparan además, valor por valor, con las completas, y la
+reproyección del seguimiento con registros iguales al plan debe devolver los KPIs del plan.
+Con --arranque mide además el tiempo hasta la primera página en procesos nuevos, sin y con
+el precalentamiento de arrancar.py.
+
+Uso:
+    python benchmark.py --salida bench.json --comparar bench_anterior.json
+    python benchmark.py --arranque
+    python benchmark.py --actualizar-dorados      # solo tras un cambio intencional de resultados
+"""
+
+import argparse
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+from datetime import date, datetime
+from itertools import count, product
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from motor import (
+    DIR_ARCHIVOS, KPIS, TIPOS_MORTALIDAD, calcular_curva_mortalidad, calcular_presupuestos, cargar_referencias,
+    construir_tabla_base, construir_tabla_inversa, curvas_mortalidad, limpiar_cache_tablas,
+    optimizar_dia_sacrificio, optimizar_dia_sacrificio_cacheado, optimizar_plan_alimentacion, precios_por_fase,
+    preparar_ciclo_alimentacion, preparar_lotes, proyectar_lote, proyectar_lotes, sensibilidad_peso_objetivo,
+    tabla_base_cacheada,
+)
+import seguimiento
+
+ARCHIVO_DORADOS = DIR_ARCHIVOS / "kpis_dorados.json"
+VERSION_DORADOS = 1
+TOLERANCIA = {"rtol": 1e-9, "atol": 1e-6}
+
+# Malla de parámetros que se cruza con cada línea genética; el resto toma LOTE_POR_DEFECTO.
+MALLA = {
+    "productividad": (90.0, 100.0),
+    "peso_objetivo": (2200, 2800),
+    "mortalidad_objetivo": (3.0, 6.0),
+    "restriccion_programada": (0, 10),
+}
+FECHA_LLEGADA = date(2025, 1, 6)
+PESOS_SENSIBILIDAD = np.arange(1800, 3601, 10)
+PORCENTAJES_MORTALIDAD = (50, 90)
+
+
+def casos_de_malla(referencia):
+    """Un lote por cada (línea genética × punto de la malla), en orden estable."""
+    casos = []
+    for (raza, sexo), valores in product(sorted(referencia), product(*MALLA.values())):
+        casos.append({"raza_seleccionada": raza, "sexo_seleccionado": sexo,
+                      "fecha_llegada": FECHA_LLEGADA, **dict(zip(MALLA, valores))})
+    return preparar_lotes(casos)
+
+
+def clave_caso(caso):
+    return "|".join(str(caso[c]) for c in ("raza_seleccionada", "sexo_seleccionado", *MALLA))
+
+
+def cronometrar(funcion, repeticiones):
+    """Corre `funcion` `repeticiones` veces y devuelve mediana y mínimo en milisegundos."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {"mediana_ms": statistics.median(tiempos), "minimo_ms": min(tiempos), "repeticiones": repeticiones}
+
+
+# --- RUTAS CRONOMETRADAS ---
+
+def rutas(referencia, df_coeffs, df_coeffs_15, casos):
+    """Diccionario nombre -> (función sin argumentos, casos que cubre) con cada ruta caliente."""
+    lineas = sorted(referencia)
+    por_caso = casos.to_dict("records")
+    tablas = {}
+
+    def tabla(caso):
+        clave = (caso["raza_seleccionada"], caso["sexo_seleccionado"], caso["restriccion_programada"], caso["productividad"])
+        if clave not in tablas:
+            base = construir_tabla_base(referencia, df_coeffs, df_coeffs_15, *clave)
+            tablas[clave] = (base, construir_tabla_inversa(base))
+        return tablas[clave]
+
+    for caso in por_caso:
+        tabla(caso)
+    dias_ciclo = sorted({len(base) for base, _ in tablas.values()})
+
+    def tablas_sin_cache():
+        for raza, sexo in lineas:
+            construir_tabla_base(referencia, df_coeffs, df_coeffs_15, raza, sexo, 0, 95.0)
+
+    def tablas_con_cache():
+        for raza, sexo in lineas:
+            tabla_base_cacheada(referencia, df_coeffs, df_coeffs_15, raza, sexo, 0, 95.0)
+
+    def mortalidad_escalar():
+        for dias, tipo, porcentaje in product(dias_ciclo, TIPOS_MORTALIDAD, PORCENTAJES_MORTALIDAD):
+            calcular_curva_mortalidad(dias, 500.0, tipo, porcentaje)
+
+    def mortalidad_vectorizada():
+        tipos, porcentajes = zip(*product(range(len(TIPOS_MORTALIDAD)), PORCENTAJES_MORTALIDAD))
+        for dias in dias_ciclo:
+            curvas_mortalidad(dias, 500.0, np.array(tipos), np.array(porcentajes, dtype=float))
+
+    def dia_sacrificio():
+        for caso in por_caso:
+            optimizar_dia_sacrificio(tabla(caso)[0], caso)
+
+    def sensibilidad():
+        for caso in por_caso:
+            sensibilidad_peso_objetivo(*tabla(caso), PESOS_SENSIBILIDAD, caso)
+
+    # La búsqueda del plan recorre toda la malla de RANGOS_PLAN: un caso por línea basta.
+    por_linea = list({(c["raza_seleccionada"], c["sexo_seleccionado"]): c for c in por_caso}.values())
+
+    def plan_alimentacion():
+        for caso in por_linea:
+            ciclo, consumo, _ = preparar_ciclo_alimentacion(*tabla(caso), caso)
+            optimizar_plan_alimentacion(ciclo["Cons_Acum_Ajustado"].to_numpy(), ciclo["Kilos_Diarios_Lote"].to_numpy(),
+                                        consumo, precios_por_fase(caso))
+
+    def presupuestos():
+        calcular_presupuestos(casos, referencia, df_coeffs, df_coeffs_15)
+
+    # Ediciones de un lote (un caso por línea, como una sesión que mueve un control del panel):
+    # todas las etapas sin memoizar contra las etapas memoizadas cuando cambia un precio
+    # (solo costos y KPIs) o la mortalidad (balance, costos y KPIs). Cada llamada usa un valor
+    # nuevo, así que la etapa editada nunca sale de la caché.
+    ediciones = count(1)
+
+    def editado(caso, campo):
+        return {**caso, campo: caso[campo] + next(ediciones) * 1e-6}
+
+    def presupuesto_sin_etapas():
+        for caso in por_linea:
+            proyectar_lotes(pd.DataFrame([editado(caso, "val_engorde")]), referencia, df_coeffs, df_coeffs_15)
+
+    def presupuesto_edicion(campo):
+        def medir():
+            for caso in por_linea:
+                proyectar_lote(editado(caso, campo), referencia, df_coeffs, df_coeffs_15)
+        return medir
+
+    def dia_sacrificio_edicion_precio():
+        for caso in por_linea:
+            optimizar_dia_sacrificio_cacheado(referencia, df_coeffs, df_coeffs_15, editado(caso, "val_engorde"))
+
+    def dia_sacrificio_sin_etapas():
+        for caso in por_linea:
+            optimizar_dia_sacrificio(tabla(caso)[0], editado(caso, "val_engorde"))
+
+    # Seguimiento: cada llamada anexa el día siguiente (igual al plan) a todos los lotes de la
+    # malla; la actualización además reproyecta los lotes, como un refresco de la carpeta.
+    plan = proyectar_lotes(casos, referencia, df_coeffs, df_coeffs_15)
+    ids = [f"banco-{i}" for i in range(len(casos))]
+    seguimiento.registrar_lotes(casos.assign(lote=ids), referencia, df_coeffs, df_coeffs_15)
+    dias_seguimiento = count(1)
+
+    def anexar_dia_a_todos():
+        d = next(dias_seguimiento)
+        for i, lote in enumerate(ids):
+            seguimiento.anexar_dia(lote, d, plan["Mortalidad_Diaria"][i, d - 1], plan["Diario"][i, d - 1],
+                                   plan["Peso_Estimado"][i, d - 1] if d % 7 == 0 else None)
+
+    def seguimiento_actualizacion():
+        anexar_dia_a_todos()
+        seguimiento.estado_de_lotes(ids)
+
+    limpiar_cache_tablas()
+    return {
+        "tabla_base": (tablas_sin_cache, len(lineas)),
+        "tabla_base_cacheada": (tablas_con_cache, len(lineas)),
+        "curva_mortalidad_escalar": (mortalidad_escalar, len(dias_ciclo) * len(TIPOS_MORTALIDAD) * len(PORCENTAJES_MORTALIDAD)),
+        "curvas_mortalidad_vectorizada": (mortalidad_vectorizada, len(dias_ciclo) * len(TIPOS_MORTALIDAD) * len(PORCENTAJES_MORTALIDAD)),
+        "dia_sacrificio": (dia_sacrificio, len(por_caso)),
+        "sensibilidad_peso_objetivo": (sensibilidad, len(por_caso)),
+        "plan_alimentacion": (plan_alimentacion, len(por_linea)),
+        "presupuestos_por_lotes": (presupuestos, len(por_caso)),
+        "presupuesto_sin_etapas": (presupuesto_sin_etapas, len(por_linea)),
+        "presupuesto_edicion_precio": (presupuesto_edicion("val_engorde"), len(por_linea)),
+        "presupuesto_edicion_mortalidad": (presupuesto_edicion("mortalidad_objetivo"), len(por_linea)),
+        "dia_sacrificio_sin_etapas": (dia_sacrificio_sin_etapas, len(por_linea)),
+        "dia_sacrificio_edicion_precio": (dia_sacrificio_edicion_precio, len(por_linea)),
+        "seguimiento_anexar_dia": (anexar_dia_a_todos, len(ids)),
+        "seguimiento_actualizacion": (seguimiento_actualizacion, len(ids)),
+    }, tablas
+
+
+# --- RESULTADOS DORADOS ---
+
+def _numero(valor):
+    valor = float(valor)
+    return valor if math.isfinite(valor) else None
+
+
+def kpis_de_referencia(referencia, df_coeffs, df_coeffs_15, casos, tablas):
+    """KPIs que se comparan contra los dorados: presupuesto, día óptimo y mínimo de la sensibilidad."""
+    kpis = calcular_presupuestos(casos, referencia, df_coeffs, df_coeffs_15)
+    resultado = {}
+    for i, caso in enumerate(casos.to_dict("records")):
+        base, inversa = tablas[(caso["raza_seleccionada"], caso["sexo_seleccionado"],
+                                caso["restriccion_programada"], caso["productividad"])]
+        fila = {k: _numero(kpis.iloc[i][k]) for k in KPIS}
+
+        por_dia = optimizar_dia_sacrificio(base, caso)
+        optimo = por_dia.loc[por_dia["Total Costo x Kilo"].idxmin()]
+        fila.update(dia_optimo=int(optimo["Dia"]), costo_kilo_dia_optimo=_numero(optimo["Total Costo x Kilo"]))
+
+        sensibilidad = sensibilidad_peso_objetivo(base, inversa, PESOS_SENSIBILIDAD, caso)
+        minimo = sensibilidad.loc[sensibilidad["costo_total_por_kilo"].idxmin()]
+        fila.update(peso_minimo_costo=_numero(minimo["peso_objetivo"]),
+                    costo_kilo_minimo_sensibilidad=_numero(minimo["costo_total_por_kilo"]))
+        resultado[clave_caso(caso)] = fila
+    return resultado
+
+
+def comparar_con_dorados(actuales, dorados, rtol=TOLERANCIA["rtol"], atol=TOLERANCIA["atol"]):
+    """Lista de diferencias (caso, kpi, dorado, actual) fuera de tolerancia, incluidos casos faltantes."""
+    diferencias = []
+    for clave in sorted(set(actuales) | set(dorados)):
+        esperado, obtenido = dorados.get(clave), actuales.get(clave)
+        if esperado is None or obtenido is None:
+            diferencias.append((clave, "*", esperado is not None, obtenido is not None))
+            continue
+        for kpi in sorted(set(esperado) | set(obtenido)):
+            a, b = esperado.get(kpi), obtenido.get(kpi)
+            if a is None or b is None:
+                if a is not None or b is not None:
+                    diferencias.append((clave, kpi, a, b))
+            elif not math.isclose(a, b, rel_tol=rtol, abs_tol=atol):
+                diferencias.append((clave, kpi, a, b))
+    return diferencias
+
+
+def verificar_equivalencias(dias_ciclo):
+    """Las curvas vectorizadas deben ser idénticas a calcular_curva_mortalidad."""
+    fallas = []
+    for dias, (t, tipo), porcentaje in product(dias_ciclo, enumerate(TIPOS_MORTALIDAD), PORCENTAJES_MORTALIDAD):
+        escalar = calcular_curva_mortalidad(dias, 500.0, tipo, porcentaje)
+        vectorizada = curvas_mortalidad(dias, 500.0, np.array([t]), np.array([float(porcentaje)]))[0]
+        if not np.array_equal(escalar, vectorizada):
+            fallas.append(f"curvas_mortalidad({dias}, {tipo}, {porcentaje})")
+    return fallas
+
+
+def verificar_etapas(referencia, df_coeffs, df_coeffs_15, casos):
+    """
+    Las rutas memoizadas por etapa deben dar exactamente lo mismo que las completas, también
+    después de editar un precio o la mortalidad (aciertos de caché en las etapas anteriores).
+    """
+    fallas = []
+    for caso in casos.to_dict("records"):
+        for campo, delta in ((None, 0), ("val_engorde", 7.0), ("mortalidad_objetivo", 0.5)):
+            editado = caso if campo is None else {**caso, campo: caso[campo] + delta}
+            completa = proyectar_lotes(pd.DataFrame([editado]), referencia, df_coeffs, df_coeffs_15)
+            por_etapas = proyectar_lote(editado, referencia, df_coeffs, df_coeffs_15)
+            iguales = all(np.array_equal(completa["kpis"][k], por_etapas["kpis"][k], equal_nan=True) for k in KPIS)
+            iguales &= all(np.array_equal(completa[k], por_etapas[k], equal_nan=True)
+                           for k in completa if isinstance(completa[k], np.ndarray))
+            base = tabla_base_cacheada(referencia, df_coeffs, df_coeffs_15, caso["raza_seleccionada"],
+                                       caso["sexo_seleccionado"], caso["restriccion_programada"], caso["productividad"])
+            iguales &= optimizar_dia_sacrificio(base, editado).equals(
+                optimizar_dia_sacrificio_cacheado(referencia, df_coeffs, df_coeffs_15, editado))
+            if not iguales:
+                fallas.append(f"etapas({clave_caso(caso)}, {campo})")
+    return fallas
+
+
+def verificar_seguimiento(referencia, df_coeffs, df_coeffs_15, casos, dias=(0, 7, 14, 15, 21)):
+    """
+    Con registros diarios iguales al plan (mortalidad, kilos y pesajes semanales), la
+    productividad acumulada debe ser la del plan y la reproyección desde cada día N debe
+    devolver los KPIs del presupuesto.
+    """
+    fallas = []
+    plan = proyectar_lotes(casos, referencia, df_coeffs, df_coeffs_15)
+    ids = [f"verificacion-{i}" for i in range(len(casos))]
+    seguimiento.registrar_lotes(casos.assign(lote=ids), referencia, df_coeffs, df_coeffs_15)
+    for i, (lote, caso) in enumerate(zip(ids, casos.to_dict("records"))):
+        for n in dias:
+            for d in range(1, min(n, int(plan["n_dias"][i]) - 1) + 1):
+                seguimiento.anexar_dia(lote, d, plan["Mortalidad_Diaria"][i, d - 1], plan["Diario"][i, d - 1],
+                                       plan["Peso_Estimado"][i, d - 1] if d % 7 == 0 else None)
+            kpis = seguimiento.reproyectar(lote)["kpis"]
+            iguales = all(np.isclose(kpis[k], plan["kpis"][k][i], **TOLERANCIA) for k in seguimiento.KPIS_PLAN)
+            iguales &= np.isclose(kpis["productividad"], caso["productividad"], **TOLERANCIA)
+            if not iguales:
+                fallas.append(f"seguimiento({clave_caso(caso)}, día {n})")
+        seguimiento.quitar_lote(lote)
+    return fallas
+
+
+# --- ARRANQUE EN FRÍO (TIEMPO HASTA LA PRIMERA PÁGINA) ---
+
+# Corre en un proceso nuevo, como un contenedor recién reiniciado: importa Streamlit (lo que
+# el servidor ya tiene antes de la primera sesión), precalienta si se pide y mide la primera
+# ejecución de la página principal y la de "Generar Presupuesto" (que dibuja los gráficos).
+_SONDA_ARRANQUE = """
+import json, sys, time
+inicio = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+if sys.argv[1] == "1":
+    import arrancar
+    arrancar.precalentar(informar=lambda *_: None)
+listo = time.perf_counter()
+app = AppTest.from_file(sys.argv[2], default_timeout=300)
+app.run()
+primera = time.perf_counter()
+app.sidebar.button[0].click().run()
+presupuesto = time.perf_counter()
+assert not app.exception, app.exception
+print(json.dumps({"servidor_ms": (listo - inicio) * 1000, "primera_pagina_ms": (primera - listo) * 1000,
+                  "primer_presupuesto_ms": (presupuesto - primera) * 1000}))
+"""
+
+
+def medir_arranque(repeticiones=3):
+    """Mediana, en procesos nuevos, del tiempo hasta la primera página sin y con arrancar.precalentar."""
+    import subprocess
+    pagina = str(Path(__file__).resolve().parent / "1_Presupuesto_Principal.py")
+    resultados = {}
+    for nombre, precalentado in (("en_frio", "0"), ("precalentado", "1")):
+        corridas = []
+        for _ in range(repeticiones):
+            salida = subprocess.run([sys.executable, "-c", _SONDA_ARRANQUE, precalentado, pagina],
+                                    capture_output=True, text=True, check=True, cwd=Path(pagina).parent)
+            corridas.append(json.loads(salida.stdout.strip().splitlines()[-1]))
+        resultados[nombre] = {k: statistics.median(c[k] for c in corridas) for k in corridas[0]}
+    return resultados
+
+
+def informe_de_arranque(arranque):
+    lineas = [f"{'arranque':14s} {'servidor ms':>12s} {'1ª página ms':>13s} {'1er presupuesto ms':>19s}"]
+    for nombre, t in arranque.items():
+        lineas.append(f"{nombre:14s} {t['servidor_ms']:12.0f} {t['primera_pagina_ms']:13.0f} {t['primer_presupuesto_ms']:19.0f}")
+    return "\n".join(lineas)
+
+
+# --- CORRIDA ---
+
+def correr(repeticiones=5, directorio=DIR_ARCHIVOS, archivo_dorados=ARCHIVO_DORADOS, actualizar=False):
+    """Cronometra todas las rutas y verifica los dorados; devuelve el informe como diccionario."""
+    referencia, df_coeffs, df_coeffs_15 = cargar_referencias(directorio)
+    casos = casos_de_malla(referencia)
+    cronometradas, tablas = rutas(referencia, df_coeffs, df_coeffs_15, casos)
+
+    tiempos = {}
+    for nombre, (funcion, n_casos) in cronometradas.items():
+        funcion()  # calentamiento (cachés, importaciones perezosas)
+        tiempos[nombre] = {**cronometrar(funcion, repeticiones), "casos": n_casos}
+        tiempos[nombre]["ms_por_caso"] = tiempos[nombre]["mediana_ms"] / n_casos
+
+    actuales = kpis_de_referencia(referencia, df_coeffs, df_coeffs_15, casos, tablas)
+    if actualizar:
+        with open(archivo_dorados, "w", encoding="utf-8") as f:
+            json.dump({"version": VERSION_DORADOS, "malla": MALLA, "fecha_llegada": FECHA_LLEGADA.isoformat(),
+                       "casos": actuales}, f, indent=1, ensure_ascii=False)
+        diferencias = []
+    else:
+        with open(archivo_dorados, encoding="utf-8") as f:
+            dorados = json.load(f)
+        if dorados.get("version") != VERSION_DORADOS:
+            sys.exit(f"{archivo_dorados} es de la versión {dorados.get('version')}; se esperaba {VERSION_DORADOS}.")
+        diferencias = comparar_con_dorados(actuales, dorados["casos"])
+
+    equivalencias = verificar_equivalencias(sorted({len(base) for base, _ in tablas.values()}))
+    equivalencias += verificar_etapas(referencia, df_coeffs, df_coeffs_15, casos)
+    equivalencias += verificar_seguimiento(referencia, df_coeffs, df_coeffs_15, casos)
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "entorno": {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+                    "plataforma": platform.platform()},
+        "tiempos": tiempos,
+        "dorados": {"casos": len(actuales), "diferencias": [list(map(str, d)) for d in diferencias[:50]],
+                    "total_diferencias": len(diferencias), "tolerancia": TOLERANCIA},
+        "equivalencias": equivalencias,
+        "ok": not diferencias and not equivalencias,
+    }
+
+
+def informe_de_tiempos(informe, anterior=None):
+    """Tabla de texto con los tiempos de la corrida y, si se da, la razón contra una corrida anterior."""
+    lineas = [f"{'ruta':32s} {'casos':>6s} {'mediana ms':>11s} {'ms/caso':>9s}" + ("   vs anterior" if anterior else "")]
+    for nombre, t in informe["tiempos"].items():
+        linea = f"{nombre:32s} {t['casos']:6d} {t['mediana_ms']:11.2f} {t['ms_por_caso']:9.4f}"
+        previo = (anterior or {}).get("tiempos", {}).get(nombre)
+        if previo:
+            linea += f"   x{previo['mediana_ms'] / max(t['mediana_ms'], 1e-9):.2f}"
+        lineas.append(linea)
+    return "\n".join(lineas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banco de rendimiento y verificación de resultados dorados.")
+    parser.add_argument("--salida", help="JSON donde guardar el informe de la corrida.")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para comparar tiempos.")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--archivos", default=str(DIR_ARCHIVOS), help="Carpeta con la tabla genética y los coeficientes.")
+    parser.add_argument("--dorados", default=str(ARCHIVO_DORADOS), help="JSON con los KPIs dorados.")
+    parser.add_argument("--actualizar-dorados", action="store_true",
+                        help="Reescribe los dorados con los resultados actuales en lugar de verificarlos.")
+    parser.add_argument("--arranque", action="store_true",
+                        help="Mide también el tiempo hasta la primera página en procesos nuevos (requiere Streamlit).")
+    args = parser.parse_args(argv)
+
+    informe = correr(args.repeticiones, args.archivos, args.dorados, args.actualizar_dorados)
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+    print(informe_de_tiempos(informe, anterior))
+    if args.arranque:
+        informe["arranque"] = medir_arranque()
+        print(informe_de_arranque(informe["arranque"]))
+
+    dorados = informe["dorados"]
+    if args.actualizar_dorados:
+        print(f"Dorados actualizados: {dorados['casos']} casos en {args.dorados}")
+    else:
+        print(f"Dorados: {dorados['casos']} casos, {dorados['total_diferencias']} diferencias fuera de tolerancia")
+        for diferencia in dorados["diferencias"]:
+            print("  " + " | ".join(diferencia))
+    for falla in informe["equivalencias"]:
+        print(f"  Equivalencia rota: {falla}")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=1, ensure_ascii=False)
+    return 0 if informe["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Corrida por lotes del presupuesto, sin navegador.
+
+Lee un archivo de lotes (CSV o Parquet) con los mismos campos del panel lateral, calcula los
+KPIs de cada lote con el motor y los escribe en CSV o Parquet; opcionalmente escribe también
+la proyección diaria. El archivo se procesa por bloques que se reparten en un pool de
+procesos y se escriben en orden a medida que terminan, así que la memoria no crece con el
+tamaño del archivo. Al final informa el rendimiento en lotes por segundo.
+
+Uso:
+    python correr_lotes.py lotes.csv kpis.parquet --diario diario.csv --procesos 4
+"""
+
+import argparse
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from motor import (
+    ARCHIVO_PRECIOS, DIR_ARCHIVOS, KPIS, cargar_precios_alimento, cargar_referencias, preparar_lotes,
+    proyeccion_larga, proyectar_lotes,
+)
+
+TAMANO_BLOQUE = 2000
+
+# Datos de referencia de cada proceso: se cargan una sola vez en el inicializador.
+_datos = {}
+
+
+def _iniciar_proceso(directorio, ruta_precios):
+    referencia, df_coeffs, df_coeffs_15 = cargar_referencias(directorio)
+    precios = cargar_precios_alimento(ruta_precios) if ruta_precios else None
+    _datos.update(referencia=referencia, df_coeffs=df_coeffs, df_coeffs_15=df_coeffs_15, precios=precios)
+
+
+def procesar_bloque(bloque, con_diario=False):
+    """KPIs (y, si se pide, proyección diaria larga) de un bloque de lotes ya leído."""
+    lotes = preparar_lotes(bloque)
+    proyeccion = proyectar_lotes(
+        lotes, _datos["referencia"], _datos["df_coeffs"], _datos["df_coeffs_15"], _datos["precios"],
+    )
+    kpis = pd.DataFrame(proyeccion["kpis"], index=lotes.index)
+    kpis.loc[~proyeccion["valido"], KPIS[:-4]] = float("nan")
+    diario = proyeccion_larga(proyeccion) if con_diario else None
+    return pd.concat([bloque, kpis], axis=1), diario
+
+
+# --- LECTURA Y ESCRITURA POR BLOQUES ---
+
+def leer_bloques(ruta, tamano):
+    """Itera el archivo de entrada en DataFrames de `tamano` filas, con índice global continuo."""
+    ruta = Path(ruta)
+    if ruta.suffix.lower() == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("Leer Parquet requiere pyarrow (pip install pyarrow).")
+        lotes = (lote.to_pandas() for lote in pq.ParquetFile(ruta).iter_batches(batch_size=tamano))
+    else:
+        lotes = pd.read_csv(ruta, chunksize=tamano)
+    inicio = 0
+    for bloque in lotes:
+        bloque.index = pd.RangeIndex(inicio, inicio + len(bloque))
+        inicio += len(bloque)
+        yield bloque
+
+
+def abrir_escritor(ruta):
+    """
+    Prepara la escritura de DataFrames uno tras otro en un mismo CSV o Parquet.
+    Devuelve (escribir, cerrar); escribir(df, indice_como) agrega un bloque.
+    """
+    ruta = Path(ruta)
+    estado = {"primero": True, "parquet": None}
+    if ruta.suffix.lower() == ".parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("Escribir Parquet requiere pyarrow (pip install pyarrow).")
+
+    def escribir(df, indice_como="lote"):
+        df = df.rename_axis(indice_como).reset_index() if indice_como else df
+        if ruta.suffix.lower() == ".parquet":
+            tabla = pa.Table.from_pandas(df, preserve_index=False)
+            if estado["parquet"] is None:
+                estado["parquet"] = pq.ParquetWriter(ruta, tabla.schema)
+            estado["parquet"].write_table(tabla.cast(estado["parquet"].schema))
+        else:
+            df.to_csv(ruta, mode="w" if estado["primero"] else "a", header=estado["primero"], index=False)
+        estado["primero"] = False
+
+    def cerrar():
+        if estado["parquet"] is not None:
+            estado["parquet"].close()
+
+    return escribir, cerrar
+
+
+def correr(entrada, salida, diario=None, procesos=1, tamano=TAMANO_BLOQUE,
+           directorio=DIR_ARCHIVOS, precios=None, informar=print):
+    """
+    Procesa `entrada` completa y devuelve (lotes, segundos). Con `procesos` > 1 mantiene a
+    lo sumo dos bloques en curso por proceso y escribe los resultados en el orden de entrada.
+    """
+    ruta_precios = precios if precios is not None else (ARCHIVO_PRECIOS if ARCHIVO_PRECIOS.exists() else None)
+    escribir_kpis, cerrar_kpis = abrir_escritor(salida)
+    escribir_diario, cerrar_diario = abrir_escritor(diario) if diario else (None, None)
+    total, inicio = 0, time.perf_counter()
+
+    def guardar(resultado):
+        nonlocal total
+        kpis, tabla_diaria = resultado
+        escribir_kpis(kpis)
+        if escribir_diario is not None:
+            escribir_diario(tabla_diaria, indice_como=None)
+        total += len(kpis)
+        segundos = time.perf_counter() - inicio
+        informar(f"{total:,} lotes · {total / segundos:,.0f} lotes/s")
+
+    try:
+        bloques = leer_bloques(entrada, tamano)
+        if procesos <= 1:
+            _iniciar_proceso(directorio, ruta_precios)
+            for bloque in bloques:
+                guardar(procesar_bloque(bloque, diario is not None))
+        else:
+            with ProcessPoolExecutor(procesos, initializer=_iniciar_proceso,
+                                     initargs=(directorio, ruta_precios)) as pool:
+                en_curso = deque()
+                for bloque in bloques:
+                    en_curso.append(pool.submit(procesar_bloque, bloque, diario is not None))
+                    if len(en_curso) >= 2 * procesos:
+                        guardar(en_curso.popleft().result())
+                while en_curso:
+                    guardar(en_curso.popleft().result())
+    finally:
+        cerrar_kpis()
+        if cerrar_diario is not None:
+            cerrar_diario()
+
+    return total, time.perf_counter() - inicio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Presupuesto de pollo de engorde para un archivo de lotes.")
+    parser.add_argument("entrada", help="CSV o Parquet con un lote por fila (campos del panel lateral).")
+    parser.add_argument("salida", help="CSV o Parquet de salida con los KPIs de cada lote.")
+    parser.add_argument("--diario", help="CSV o Parquet opcional con la proyección diaria de todos los lotes.")
+    parser.add_argument("--procesos", type=int, default=1, help="Procesos en paralelo (por defecto 1).")
+    parser.add_argument("--tamano-bloque", type=int, default=TAMANO_BLOQUE, help="Lotes por bloque.")
+    parser.add_argument("--archivos", default=str(DIR_ARCHIVOS), help="Carpeta con la tabla genética y los coeficientes.")
+    parser.add_argument("--precios", help="CSV de precios del alimento por fecha (por defecto ARCHIVOS/Precios_Alimento.csv si existe).")
+    args = parser.parse_args(argv)
+
+    total, segundos = correr(
+        args.entrada, args.salida, args.diario, args.procesos, args.tamano_bloque, args.archivos, args.precios,
+        informar=lambda texto: print(texto, file=sys.stderr),
+    )
+    print(f"{total:,} lotes en {segundos:,.2f} s ({total / max(segundos, 1e-9):,.0f} lotes/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Figuras de matplotlib de las páginas: una función por gráfico que recibe solo datos y
+devuelve la figura. Este módulo (y con él matplotlib) se importa la primera vez que hay que
+rasterizar un gráfico (graficos.png_de_figura), no al cargar las páginas.
+"""
+
+import io
+
+import matplotlib.colors as mcolors
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from matplotlib.offsetbox import AnnotationBbox, OffsetImage
+from matplotlib.ticker import PercentFormatter, StrMethodFormatter
+
+from graficos import COLORES_VERDES, OPCIONES_PNG
+from utils import ARCHIVO_LOGO, imagen_rgba
+
+
+def _marca_de_agua(ax, zoom, alpha, posicion=(0.5, 0.5), alineacion=(0.5, 0.5), **kwargs):
+    try:
+        imagebox = OffsetImage(imagen_rgba(ARCHIVO_LOGO), zoom=zoom, alpha=alpha)
+        ax.add_artist(AnnotationBbox(imagebox, posicion, xycoords='axes fraction', frameon=False,
+                                     box_alignment=alineacion, **kwargs))
+    except Exception:
+        pass
+
+
+# =============================================================================
+# --- FIGURAS DE MATPLOTLIB (UNA FUNCIÓN POR GRÁFICO) ---
+# =============================================================================
+
+def figura_crecimiento(dia, peso_referencia, peso_estimado, dia_obj, peso_obj):
+    fig, ax = plt.subplots()
+    ax.plot(dia, peso_referencia, color='darkred', label='Peso de Referencia')
+    ax.plot(dia, peso_estimado, color='lightcoral', label='Peso Estimado')
+    ax.plot(dia_obj, peso_obj, 'o', color='blue', markersize=8, label=f"Día {dia_obj:.0f}: {peso_obj:,.0f} gr")
+    ax.legend()
+    ax.set_xlabel("Día del Ciclo")
+    ax.set_ylabel("Peso (gramos)")
+    ax.set_title("Gráfico de Crecimiento")
+    ax.grid(True, linestyle='--', alpha=0.6)
+    _marca_de_agua(ax, 0.2, 0.15, (0.95, 0.05), (1, 0))
+    return fig
+
+
+def figura_participacion(tamanos, etiquetas, colores, titulo=None, anillo=False):
+    fig, ax = plt.subplots()
+    ax.pie(tamanos, labels=etiquetas, autopct='%1.1f%%', startangle=90, colors=colores,
+           wedgeprops=dict(width=0.4) if anillo else None)
+    if anillo:
+        ax.axis('equal')
+    if titulo:
+        ax.set_title(titulo)
+    return fig
+
+
+def figura_mortalidad(dia, saldo, mortalidad_diaria, titulo):
+    fig, ax = plt.subplots()
+    ax.plot(dia, saldo, color='orange', label='Saldo de Aves')
+    ax.set_xlabel("Día")
+    ax.set_ylabel("Número de Aves", color='orange')
+    ax.tick_params(axis='y', labelcolor='orange')
+    ax.grid(True, linestyle='--', alpha=0.4)
+    ax_twin = ax.twinx()
+    ax_twin.bar(dia, mortalidad_diaria, color='red', alpha=0.5, label='Mortalidad Diaria')
+    ax_twin.set_ylabel("Mortalidad Diaria", color='red')
+    ax_twin.tick_params(axis='y', labelcolor='red')
+    ax.set_title(titulo)
+    return fig
+
+
+def figura_sensibilidad_mortalidad(curvas, mortalidad_base):
+    fig, ax = plt.subplots(figsize=(10, 4))
+    for etiqueta, (mortalidad, costo) in curvas.items():
+        ax.plot(mortalidad, costo, label=etiqueta)
+    ax.axvline(mortalidad_base, color='gray', linestyle='--', alpha=0.6)
+    ax.set_xlabel("Mortalidad Total (%)")
+    ax.set_ylabel("Costo Total / Kilo ($)")
+    ax.grid(True, linestyle='--', alpha=0.4)
+    ax.legend()
+    return fig
+
+
+def figura_costo_por_peso(pesos, costos, peso_optimo, costo_optimo, peso_base):
+    fig, ax = plt.subplots(figsize=(10, 4))
+    ax.plot(pesos, costos, color='#2E7D32')
+    ax.plot(peso_optimo, costo_optimo, 'o', color='red', label="Mínimo")
+    ax.axvline(peso_base, color='gray', linestyle='--', alpha=0.6, label="Peso objetivo actual")
+    ax.set_xlabel("Peso Objetivo (gramos)")
+    ax.set_ylabel("Costo Total / Kilo ($)")
+    ax.grid(True, linestyle='--', alpha=0.4)
+    ax.legend()
+    return fig
+
+
+
+def figura_estructura_costos(pesos, porcentajes, componentes):
+    df_percentage = pd.DataFrame(porcentajes, index=pd.Index(pesos, name="Peso Objetivo (gr)"), columns=componentes)
+    fig, ax = plt.subplots()
+    df_percentage.plot(kind='bar', stacked=True, ax=ax, color=COLORES_VERDES)
+    ax.yaxis.set_major_formatter(PercentFormatter(100))
+    ax.set_ylim(0, 100)
+    ax.set_ylabel("Participación Porcentual en el Costo por Kilo")
+    ax.set_xlabel("Peso Objetivo (gramos)")
+    ax.legend(title="Componente de Costo")
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+
+    # Color de texto dinámico (blanco/negro)
+    for i, container in enumerate(ax.containers):
+        rgb = mcolors.to_rgb(COLORES_VERDES[i])
+        luminancia = 0.299 * rgb[0] + 0.587 * rgb[1] + 0.114 * rgb[2]
+        color_texto = 'white' if luminancia < 0.5 else 'black'
+        labels = [f"{v:.1f}%" if v > 4 else '' for v in container.datavalues]
+        ax.bar_label(container, labels=labels, label_type='center', color=color_texto, weight='bold', fontsize=8)
+
+    _marca_de_agua(ax, 0.3, 0.1, zorder=-1)
+    return fig
+
+
+def figura_impacto_productividad(productividad, series):
+    df_cost_lines = pd.DataFrame(series, index=pd.Index(productividad, name="Productividad (%)"))
+    fig, ax = plt.subplots(figsize=(10, 6))
+    df_cost_lines.plot(kind='line', ax=ax, marker='o')
+    ax.yaxis.set_major_formatter(StrMethodFormatter('${x:,.0f}'))
+    ax.set_ylabel("Costo por Kilo ($)")
+    ax.set_xlabel("Productividad (%)")
+    ax.set_title("Sensibilidad del Costo por Kilo a la Productividad")
+    ax.legend(title="Componente de Costo")
+    ax.grid(True, linestyle='--', alpha=0.6)
+    # Eje X invertido para que la "caída" de productividad se lea de izquierda a derecha.
+    ax.invert_xaxis()
+    fig.tight_layout()
+    return fig
+
+
+def figura_superficie(superficie, productividad_base):
+    variacion = (superficie["multiplicador"] - 1) * 100
+    fig, ax = plt.subplots(figsize=(10, 6))
+    malla = ax.pcolormesh(superficie["productividad"], variacion, superficie["costo_total_por_kilo"],
+                          cmap='Reds', shading='auto')
+    fig.colorbar(malla, ax=ax, format='${x:,.0f}', label="Costo Total por Kilo ($)")
+    for nivel, curva in zip(superficie["niveles_iso_costo"], superficie["productividad_iso_costo"]):
+        ax.plot(curva, variacion, color='white', linewidth=1)
+        visibles = np.flatnonzero(~np.isnan(curva))
+        if visibles.size:
+            medio = visibles[visibles.size // 2]
+            ax.annotate(f"${nivel:,.0f}", (curva[medio], variacion[medio]),
+                        color='white', fontsize=8, ha='center', va='bottom')
+    ax.plot(productividad_base, 0, 'o', color='blue', markersize=8, label="Escenario base")
+    ax.set_xlabel("Productividad (%)")
+    ax.set_ylabel("Variación del Precio del Alimento (%)")
+    ax.legend(loc='upper right')
+    fig.tight_layout()
+    return fig
+
+
+def figura_evolucion_costos(dia, alimento, pollito, otros, total, dia_optimo, costo_optimo, peso_optimo):
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.plot(dia, alimento, label='Costo Alimento/Kilo', color='green')
+    ax.plot(dia, pollito, label='Costo Pollito/Kilo', color='orange')
+    ax.plot(dia, otros, label='Otros Costos/Kilo', color='gray')
+    ax.plot(dia, total, label='Costo TOTAL/Kilo', color='red', linewidth=3)
+    ax.plot(dia_optimo, costo_optimo, 'o', markersize=12, color='blue', label=f"Punto Óptimo (Día {dia_optimo})")
+    ax.annotate(
+        f"Costo Mínimo: ${costo_optimo:,.0f}\nPeso: {peso_optimo:,.0f} gr",
+        xy=(dia_optimo, costo_optimo),
+        xytext=(dia_optimo + 1, costo_optimo + 50),
+        arrowprops=dict(facecolor='black', shrink=0.05),
+        bbox=dict(boxstyle="round,pad=0.3", fc="yellow", ec="black", lw=1, alpha=0.8)
+    )
+    ax.yaxis.set_major_formatter(StrMethodFormatter('${x:,.0f}'))
+    ax.set_xlabel("Día del Ciclo")
+    ax.set_ylabel("Costo por Kilo Producido ($)")
+    ax.set_title("Evolución del Costo por Kilo a Lo Largo del Ciclo")
+    ax.legend()
+    ax.grid(True, linestyle='--', alpha=0.6)
+    _marca_de_agua(ax, 0.2, 0.1, zorder=-1)
+    return fig
+
+
+FIGURAS = {
+    "crecimiento": figura_crecimiento,
+    "participacion": figura_participacion,
+    "mortalidad": figura_mortalidad,
+    "sensibilidad_mortalidad": figura_sensibilidad_mortalidad,
+    "costo_por_peso": figura_costo_por_peso,
+    "estructura_costos": figura_estructura_costos,
+    "impacto_productividad": figura_impacto_productividad,
+    "superficie": figura_superficie,
+    "evolucion_costos": figura_evolucion_costos,
+}
+
+
+def rasterizar(nombre, datos):
+    """PNG de la figura `nombre` para estos datos; la figura se cierra apenas se rasteriza."""
+    fig = FIGURAS[nombre](**datos)
+    try:
+        imagen = io.BytesIO()
+        fig.savefig(imagen, **OPCIONES_PNG)
+        return imagen.getvalue()
+    finally:
+        plt.close(fig)
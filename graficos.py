@@ -0,0 +1,178 @@
+"""
+Gráficos de las páginas.
+
+Cada figura se arma con una función de figuras.py que recibe solo datos (arreglos y números),
+se rasteriza una sola vez por combinación de datos (caché de Streamlit) y se cierra enseguida,
+así que las reejecuciones no vuelven a dibujar lo que no cambió y las figuras no se acumulan
+en el proceso del servidor. matplotlib se importa recién al rasterizar el primer gráfico.
+En el modo "gráficos en el navegador" las mismas figuras se envían como datos compactos con
+una especificación Vega-Lite y las dibuja el navegador.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Mismas opciones que usa st.pyplot, para que la imagen se vea igual.
+OPCIONES_PNG = {"format": "png", "dpi": 200, "bbox_inches": "tight"}
+CACHE_GRAFICOS_MAX = 256
+COLORES_PARTICIPACION = ['darkred', 'lightblue', 'lightcoral']
+COLORES_VERDES = ['#2E7D32', '#66BB6A', '#A5D6A7']
+
+
+@st.cache_data(max_entries=CACHE_GRAFICOS_MAX, show_spinner=False)
+def png_de_figura(nombre, datos):
+    """PNG de la figura `nombre` para estos datos (figuras.rasterizar, cacheado)."""
+    import figuras
+    return figuras.rasterizar(nombre, datos)
+
+
+# =============================================================================
+# --- ESPECIFICACIONES VEGA-LITE (MODO NAVEGADOR) ---
+# =============================================================================
+
+def _valores(df):
+    """Registros con tipos nativos de Python, listos para el JSON de Vega-Lite."""
+    return json.loads(df.to_json(orient='records'))
+
+
+def _capa(df, marca, codificacion, **extra):
+    return {"data": {"values": _valores(df)}, "mark": marca, "encoding": codificacion, **extra}
+
+
+def _lineas_largas(x, series, nombre_x, nombre_y="Valor", nombre_serie="Serie"):
+    df = pd.DataFrame({nombre_x: np.asarray(x), **{k: np.asarray(v) for k, v in series.items()}})
+    return df.melt(id_vars=nombre_x, var_name=nombre_serie, value_name=nombre_y)
+
+
+def _escala_colores(dominio, colores):
+    return {"domain": list(dominio), "range": list(colores)}
+
+
+def vega_crecimiento(dia, peso_referencia, peso_estimado, dia_obj, peso_obj):
+    series = {'Peso de Referencia': peso_referencia, 'Peso Estimado': peso_estimado}
+    return {"title": "Gráfico de Crecimiento", "layer": [
+        _capa(_lineas_largas(dia, series, "Día", "Peso (gramos)"), "line", {
+            "x": {"field": "Día", "type": "quantitative", "title": "Día del Ciclo"},
+            "y": {"field": "Peso (gramos)", "type": "quantitative"},
+            "color": {"field": "Serie", "scale": _escala_colores(series, ['darkred', 'lightcoral'])},
+        }),
+        _capa(pd.DataFrame({"Día": [dia_obj], "Peso (gramos)": [peso_obj]}),
+              {"type": "point", "filled": True, "size": 80, "color": "blue"},
+              {"x": {"field": "Día", "type": "quantitative"}, "y": {"field": "Peso (gramos)", "type": "quantitative"}}),
+    ]}
+
+
+def vega_participacion(tamanos, etiquetas, colores, titulo=None, anillo=False):
+    componentes = [e.split("\n")[0] for e in etiquetas]
+    df = pd.DataFrame({"Componente": componentes, "Valor": np.asarray(tamanos, dtype=float)})
+    return {"title": (titulo or "").replace("\n", " · "), **_capa(
+        df, {"type": "arc", "innerRadius": 50 if anillo else 0, "tooltip": True},
+        {"theta": {"field": "Valor", "type": "quantitative", "stack": True},
+         "color": {"field": "Componente", "scale": _escala_colores(componentes, colores), "sort": None}},
+    )}
+
+
+def vega_mortalidad(dia, saldo, mortalidad_diaria, titulo):
+    df = pd.DataFrame({"Día": np.asarray(dia), "Saldo de Aves": np.asarray(saldo),
+                       "Mortalidad Diaria": np.asarray(mortalidad_diaria)})
+    eje_x = {"field": "Día", "type": "quantitative"}
+    return {"title": titulo, "resolve": {"scale": {"y": "independent"}}, "layer": [
+        _capa(df, {"type": "bar", "color": "red", "opacity": 0.5},
+              {"x": eje_x, "y": {"field": "Mortalidad Diaria", "type": "quantitative", "axis": {"orient": "right"}}}),
+        _capa(df, {"type": "line", "color": "orange"},
+              {"x": eje_x, "y": {"field": "Saldo de Aves", "type": "quantitative", "scale": {"zero": False}}}),
+    ]}
+
+
+def vega_sensibilidad_mortalidad(curvas, mortalidad_base):
+    df = pd.concat([pd.DataFrame({"Mortalidad Total (%)": m, "Costo Total / Kilo ($)": c, "Curva": etiqueta})
+                    for etiqueta, (m, c) in curvas.items()])
+    return {"layer": [
+        _capa(df, "line", {"x": {"field": "Mortalidad Total (%)", "type": "quantitative"},
+                           "y": {"field": "Costo Total / Kilo ($)", "type": "quantitative", "scale": {"zero": False}},
+                           "color": {"field": "Curva", "sort": None}}),
+        _capa(pd.DataFrame({"x": [mortalidad_base]}), {"type": "rule", "color": "gray", "strokeDash": [4, 4]},
+              {"x": {"field": "x", "type": "quantitative"}}),
+    ]}
+
+
+def vega_costo_por_peso(pesos, costos, peso_optimo, costo_optimo, peso_base):
+    eje_y = {"field": "Costo Total / Kilo ($)", "type": "quantitative", "scale": {"zero": False}}
+    eje_x = {"field": "Peso Objetivo (gramos)", "type": "quantitative", "scale": {"zero": False}}
+    return {"layer": [
+        _capa(pd.DataFrame({"Peso Objetivo (gramos)": pesos, "Costo Total / Kilo ($)": costos}),
+              {"type": "line", "color": "#2E7D32"}, {"x": eje_x, "y": eje_y}),
+        _capa(pd.DataFrame({"Peso Objetivo (gramos)": [peso_optimo], "Costo Total / Kilo ($)": [costo_optimo]}),
+              {"type": "point", "filled": True, "size": 80, "color": "red"}, {"x": eje_x, "y": eje_y}),
+        _capa(pd.DataFrame({"Peso Objetivo (gramos)": [peso_base]}),
+              {"type": "rule", "color": "gray", "strokeDash": [4, 4]}, {"x": eje_x}),
+    ]}
+
+
+def vega_estructura_costos(pesos, porcentajes, componentes):
+    df = pd.DataFrame(porcentajes, columns=componentes).assign(**{"Peso Objetivo (gramos)": np.asarray(pesos)})
+    df = df.melt(id_vars="Peso Objetivo (gramos)", var_name="Componente de Costo", value_name="Participación (%)")
+    return _capa(df, {"type": "bar", "tooltip": True}, {
+        "x": {"field": "Peso Objetivo (gramos)", "type": "ordinal"},
+        "y": {"field": "Participación (%)", "type": "quantitative", "stack": True, "scale": {"domain": [0, 100]}},
+        "color": {"field": "Componente de Costo", "scale": _escala_colores(componentes, COLORES_VERDES), "sort": None},
+        "order": {"field": "Componente de Costo", "sort": "ascending"},
+    })
+
+
+def vega_impacto_productividad(productividad, series):
+    df = _lineas_largas(productividad, series, "Productividad (%)", "Costo por Kilo ($)", "Componente de Costo")
+    return {"title": "Sensibilidad del Costo por Kilo a la Productividad", **_capa(
+        df, {"type": "line", "point": True, "tooltip": True},
+        {"x": {"field": "Productividad (%)", "type": "quantitative", "scale": {"reverse": True, "zero": False}},
+         "y": {"field": "Costo por Kilo ($)", "type": "quantitative"},
+         "color": {"field": "Componente de Costo", "sort": None}},
+    )}
+
+
+def vega_evolucion_costos(dia, alimento, pollito, otros, total, dia_optimo, costo_optimo, peso_optimo):
+    series = {'Costo Alimento/Kilo': alimento, 'Costo Pollito/Kilo': pollito,
+              'Otros Costos/Kilo': otros, 'Costo TOTAL/Kilo': total}
+    eje_x = {"field": "Día", "type": "quantitative", "title": "Día del Ciclo"}
+    eje_y = {"field": "Costo por Kilo ($)", "type": "quantitative"}
+    return {"title": "Evolución del Costo por Kilo a Lo Largo del Ciclo", "layer": [
+        _capa(_lineas_largas(dia, series, "Día", "Costo por Kilo ($)"), {"type": "line", "tooltip": True}, {
+            "x": eje_x, "y": eje_y,
+            "color": {"field": "Serie", "scale": _escala_colores(series, ['green', 'orange', 'gray', 'red'])},
+        }),
+        _capa(pd.DataFrame({"Día": [dia_optimo], "Costo por Kilo ($)": [costo_optimo], "Peso (gr)": [peso_optimo]}),
+              {"type": "point", "filled": True, "size": 120, "color": "blue", "tooltip": True},
+              {"x": eje_x, "y": eje_y}),
+    ]}
+
+
+# La superficie (decenas de miles de celdas) sigue como imagen también en modo navegador.
+ESPECIFICACIONES_VEGA = {
+    "crecimiento": vega_crecimiento,
+    "participacion": vega_participacion,
+    "mortalidad": vega_mortalidad,
+    "sensibilidad_mortalidad": vega_sensibilidad_mortalidad,
+    "costo_por_peso": vega_costo_por_peso,
+    "estructura_costos": vega_estructura_costos,
+    "impacto_productividad": vega_impacto_productividad,
+    "evolucion_costos": vega_evolucion_costos,
+}
+
+
+# =============================================================================
+# --- MOSTRAR ---
+# =============================================================================
+
+def graficos_en_navegador():
+    return st.session_state.get("graficos_navegador", False)
+
+
+def mostrar_grafico(nombre, **datos):
+    """Muestra el gráfico `nombre`: Vega-Lite en el navegador si el modo está activo, si no la imagen cacheada."""
+    if graficos_en_navegador() and nombre in ESPECIFICACIONES_VEGA:
+        st.vega_lite_chart(spec=ESPECIFICACIONES_VEGA[nombre](**datos), use_container_width=True)
+    else:
+        st.image(png_de_figura(nombre, datos), use_container_width=True)
@@ -0,0 +1,1475 @@
+"""
+Motor de cálculo del presupuesto de pollo de engorde, sin dependencias de Streamlit.
+
+Reproduce la lógica de la página '1_Presupuesto_Principal' (fases de alimento,
+mortalidad, kilos/bultos diarios, costos y KPIs) y permite evaluar un portafolio
+completo de lotes en una sola pasada vectorizada de NumPy.
+"""
+
+import math
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent
+DIR_ARCHIVOS = BASE_DIR / "ARCHIVOS"
+ARCHIVO_PRECIOS = DIR_ARCHIVOS / "Precios_Alimento.csv"
+
+FASES = ['Pre-iniciador', 'Iniciador', 'Engorde', 'Retiro']
+FASE_PRE, FASE_INI, FASE_ENG, FASE_RET = range(len(FASES))
+
+# Parámetros de un lote: mismos nombres que usa el panel lateral en st.session_state.
+LOTE_POR_DEFECTO = {
+    "aves_programadas": 10000,
+    "fecha_llegada": None,
+    "costo_pollito": 2000.0,
+    "raza_seleccionada": "ROSS 308 AP",
+    "sexo_seleccionado": "MIXTO",
+    "peso_objetivo": 2500,
+    "mortalidad_objetivo": 5.0,
+    "productividad": 95.0,
+    "restriccion_programada": 0,
+    "pre_iniciador": 150,
+    "iniciador": 1200,
+    "retiro": 500,
+    "unidades_calculo": "Kilos",
+    "val_pre_iniciador": 2200.0,
+    "val_iniciador": 2150.0,
+    "val_engorde": 2100.0,
+    "val_retiro": 2050.0,
+    "otros_costos_ave": 1500.0,
+}
+CAMPOS_LOTE = list(LOTE_POR_DEFECTO)
+
+KPIS = [
+    "kilos_totales_producidos", "consumo_total_kg",
+    "costo_total_alimento", "costo_total_pollitos", "costo_total_otros", "costo_total_lote",
+    "costo_alimento_kilo", "costo_pollito_kilo", "costo_otros_kilo", "costo_total_por_kilo",
+    "conversion_alimenticia", "costo_total_mortalidad",
+    "costo_alimento_mortalidad_total", "costo_pollito_mortalidad_total", "costo_otros_mortalidad_total",
+    "costo_alimento_mortalidad_kilo", "costo_pollito_mortalidad_kilo", "costo_otros_mortalidad_kilo",
+    "aves_producidas", "peso_final_ave", "consumo_objetivo_ave", "dia_sacrificio",
+]
+
+
+def cargar_referencias(directorio=DIR_ARCHIVOS):
+    """
+    Carga la tabla genética (ya indexada por línea, ver indexar_referencia) y los
+    coeficientes de peso (día >= 15 y día <= 14), desde las cachés del proceso.
+    """
+    directorio = Path(directorio)
+    referencia = referencia_cacheada(directorio / "ROSS_COBB_HUBBARD_2025.csv")
+    df_coeffs = leer_csv_cacheado(directorio / "Cons_Acum_Peso.csv")
+    df_coeffs_15 = leer_csv_cacheado(directorio / "Cons_Acum_Peso_15.csv")
+    return referencia, df_coeffs, df_coeffs_15
+
+
+def _leer_tabla(ruta):
+    """Tabla del binario mapeado en memoria (tablas_binarias) o, si no se puede usar, del CSV."""
+    import tablas_binarias
+    tabla = tablas_binarias.tabla(ruta)
+    return pd.read_csv(ruta) if tabla is None else tabla
+
+
+def _leer_referencia(ruta):
+    import tablas_binarias
+    indice = tablas_binarias.referencia_indexada(ruta)
+    return indexar_referencia(pd.read_csv(ruta)) if indice is None else indice
+
+
+def leer_csv_cacheado(ruta):
+    """
+    Tabla de un CSV memoizada por proceso (la comparten todas las sesiones y la llena precalentar).
+    Sale del binario tipado y mapeado en memoria de tablas_binarias, que se reconstruye si el CSV
+    cambió; si no se puede usar, de pd.read_csv. Se vuelve a leer si cambia la fecha de
+    modificación del CSV; el llamador recibe una copia.
+    """
+    ruta = Path(ruta).resolve()
+    tabla = _memoizar("archivos", ("csv", str(ruta)), os.stat(ruta).st_mtime_ns, lambda: _leer_tabla(ruta))
+    return _copia_solo_lectura(tabla)
+
+
+def referencia_cacheada(ruta):
+    """
+    Tabla genética indexada (indexar_referencia) memoizada por proceso, igual que leer_csv_cacheado.
+    Con el binario, cada línea es un tramo del archivo mapeado en memoria (sin copia).
+    """
+    ruta = Path(ruta).resolve()
+    return _memoizar("archivos", ("referencia", str(ruta)), os.stat(ruta).st_mtime_ns, lambda: _leer_referencia(ruta))
+
+
+def clean_numeric_column(series):
+    """Convierte una columna a tipo numérico, manejando comas como decimales."""
+    if series.dtype == 'object' or pd.api.types.is_string_dtype(series):
+        return pd.to_numeric(series.str.replace(',', '.', regex=False), errors='coerce')
+    return series
+
+
+def indexar_referencia(df_referencia):
+    """
+    Indexa la tabla genética por (RAZA, SEXO). Cada línea queda como un diccionario de
+    arrays contiguos de solo lectura ('Dia', 'Peso', 'Cons_Acum' e 'Indice' con las
+    etiquetas de fila originales), limpiados una sola vez. Si recibe un índice ya
+    construido lo devuelve tal cual.
+    """
+    if isinstance(df_referencia, dict):
+        return df_referencia
+    indice = {}
+    for (raza, sexo), grupo in df_referencia.groupby(['RAZA', 'SEXO'], sort=False):
+        linea = {
+            'Dia': grupo['Dia'].to_numpy(),
+            'Peso': clean_numeric_column(grupo['Peso']).to_numpy(dtype=float),
+            'Cons_Acum': clean_numeric_column(grupo['Cons_Acum']).to_numpy(dtype=float),
+            'Indice': grupo.index.to_numpy(),
+        }
+        for clave, valores in linea.items():
+            linea[clave] = np.ascontiguousarray(valores)
+            linea[clave].setflags(write=False)
+        indice[(raza, sexo)] = linea
+    return indice
+
+
+def lineas_disponibles(referencia):
+    """Razas y sexos presentes en la referencia, ordenados como en el panel lateral."""
+    referencia = indexar_referencia(referencia)
+    return sorted({raza for raza, _ in referencia}), sorted({sexo for _, sexo in referencia})
+
+
+def buscar_coeficientes(coeffs_df, raza, sexo):
+    """Devuelve la fila de coeficientes de una línea/sexo, o None si no existe."""
+    if coeffs_df is None:
+        return None
+    coeffs_seleccion = coeffs_df[(coeffs_df['RAZA'] == raza) & (coeffs_df['SEXO'] == sexo)]
+    if coeffs_seleccion.empty:
+        return None
+    return coeffs_seleccion.iloc[0]
+
+
+def calcular_peso_estimado(data, coeffs_df, raza, sexo):
+    """Calcula el peso estimado usando coeficientes de regresión polinomial."""
+    params = buscar_coeficientes(coeffs_df, raza, sexo)
+    if params is None:
+        return pd.Series(0, index=data.index)
+    x = data['Cons_Acum_Ajustado']
+    return pd.Series(evaluar_horner(params[COLUMNAS_COEFICIENTES].to_numpy(dtype=float), x.to_numpy(dtype=float)),
+                     index=data.index, name=x.name)
+
+
+# =============================================================================
+# --- MATRIZ DE COEFICIENTES Y EVALUACIÓN DE HORNER ---
+# =============================================================================
+
+COLUMNAS_COEFICIENTES = ['Intercept', 'Coef_1', 'Coef_2', 'Coef_3', 'Coef_4']
+DIA_FIN_MODELO_15 = 14  # hasta este día rige Cons_Acum_Peso_15; desde el 15, Cons_Acum_Peso
+
+
+def construir_matriz_coeficientes(df_coeffs, df_coeffs_15):
+    """
+    Reúne los dos modelos de peso en una matriz (líneas × 2 tramos × 5 coeficientes).
+    El tramo 0 es el modelo de los días 1-14 y el tramo 1 el de los días 15 en adelante;
+    un tramo sin coeficientes queda en cero, igual que en calcular_peso_estimado.
+    """
+    tramos = (df_coeffs_15, df_coeffs)
+    lineas = []
+    for df in tramos:
+        if df is not None:
+            lineas.extend(zip(df['RAZA'], df['SEXO']))
+    lineas = list(dict.fromkeys(lineas))
+    indice = {linea: i for i, linea in enumerate(lineas)}
+
+    coef = np.zeros((len(lineas) + 1, 2, 5))  # la última fila (ceros) es la de las líneas ausentes
+    for tramo, df in enumerate(tramos):
+        if df is None:
+            continue
+        primeras = df.drop_duplicates(['RAZA', 'SEXO'], keep='first')  # como buscar_coeficientes
+        filas = [indice[k] for k in zip(primeras['RAZA'], primeras['SEXO'])]
+        coef[filas, tramo] = primeras[COLUMNAS_COEFICIENTES].to_numpy(dtype=float)
+    coef.setflags(write=False)
+    return {'lineas': lineas, 'indice': indice, 'coef': coef}
+
+
+def matriz_coeficientes(df_coeffs, df_coeffs_15):
+    """Matriz de coeficientes memoizada por contenido: se arma una sola vez por proceso."""
+    clave = (_huella_coeficientes(df_coeffs), _huella_coeficientes(df_coeffs_15))
+    return _memoizar("coeficientes", clave, clave,
+                     lambda: construir_matriz_coeficientes(df_coeffs, df_coeffs_15))
+
+
+def evaluar_horner(coef, x):
+    """Evalúa c0 + c1·x + ... + c4·x⁴ en forma de Horner; `coef[..., k]` se difunde contra `x`."""
+    coef = np.asarray(coef, dtype=float)
+    resultado = coef[..., 4] * x + coef[..., 3]
+    for k in (2, 1, 0):
+        resultado = resultado * x + coef[..., k]
+    return resultado
+
+
+def evaluar_curvas(matriz, x, lineas=None):
+    """
+    Evalúa los dos tramos de cada línea sobre una malla de consumo acumulado en una sola
+    llamada. `x` es un vector común o una matriz (líneas × puntos); `lineas` es una lista de
+    (raza, sexo) (por defecto todas las de la matriz). Devuelve (líneas × 2 tramos × puntos).
+    """
+    coef = matriz['coef']
+    if lineas is None:
+        coef = coef[:-1]
+    else:
+        ausente = len(matriz['lineas'])
+        coef = coef[[matriz['indice'].get(linea, ausente) for linea in lineas]]
+    x = np.asarray(x, dtype=float)[..., None, :]
+    return evaluar_horner(coef[:, :, None, :], x)
+
+
+def peso_estimado_por_dia(matriz, lineas, cons_acum_ajustado, dia):
+    """Peso estimado (líneas × días) eligiendo, según el día, el tramo de 15 días o el general."""
+    curvas = evaluar_curvas(matriz, cons_acum_ajustado, lineas)
+    return np.where(dia <= DIA_FIN_MODELO_15, curvas[:, 0], curvas[:, 1])
+
+
+def construir_tabla_base(referencia, df_coeffs, df_coeffs_15, raza, sexo, restriccion_programada, productividad):
+    """
+    Construye la tabla base de una línea genética con el consumo ajustado por restricción
+    y el peso estimado ajustado por productividad. Devuelve None si la línea no existe.
+    """
+    linea = indexar_referencia(referencia).get((raza, sexo))
+
+    if linea is None or len(linea['Dia']) == 0:
+        return None
+
+    tabla = pd.DataFrame({
+        'RAZA': raza, 'SEXO': sexo,
+        'Dia': linea['Dia'], 'Peso': linea['Peso'], 'Cons_Acum': linea['Cons_Acum'],
+    }, index=linea['Indice'], copy=True)
+    factor_ajuste = 1 - (restriccion_programada / 100.0)
+    tabla['Cons_Acum_Ajustado'] = tabla['Cons_Acum'] * factor_ajuste
+
+    peso_estimado = peso_estimado_por_dia(
+        matriz_coeficientes(df_coeffs, df_coeffs_15), [(raza, sexo)],
+        tabla['Cons_Acum_Ajustado'].to_numpy()[None, :], linea['Dia'][None, :])[0]
+    tabla['Peso_Estimado'] = peso_estimado * (productividad / 100.0)
+
+    return tabla
+
+
+# =============================================================================
+# --- CACHÉ COMPARTIDA DE TABLAS BASE (LRU) ---
+# =============================================================================
+
+CACHE_TABLAS_MAX = 128
+# Las salidas de las etapas son pequeñas (una fila por lote) y hay cinco por lote y edición.
+CACHE_ETAPAS_MAX = 512
+
+# Una caché LRU por tipo de resultado ('tablas' base, 'inversas' peso → consumo, matrices
+# de 'coeficientes', 'archivos' CSV de ARCHIVOS/ ya leídos y salidas de cada 'etapas' del
+# presupuesto, ver GRAFO_ETAPAS).
+_caches = {"tablas": OrderedDict(), "inversas": OrderedDict(), "coeficientes": OrderedDict(),
+           "archivos": OrderedDict(), "etapas": OrderedDict()}
+_cache_lock = threading.Lock()
+_cache_contadores = {nombre: {"hits": 0, "misses": 0, "desalojos": 0} for nombre in _caches}
+_cache_maximos = {nombre: CACHE_ETAPAS_MAX if nombre == "etapas" else CACHE_TABLAS_MAX for nombre in _caches}
+# Además del número de entradas, cada caché tiene un presupuesto de memoria (bytes estimados con
+# tamano_en_memoria); al pasarlo se desalojan también las entradas de uso más antiguo.
+CACHE_BYTES_MAX = 64 * 2**20
+_cache_bytes = {nombre: 0 for nombre in _caches}
+
+# Con Copy-on-Write (pandas >= 3) una copia superficial basta: cualquier escritura del
+# llamador crea su propia copia y nunca toca la tabla guardada en la caché.
+_COPIA_PEREZOSA = int(pd.__version__.split('.')[0]) >= 3
+
+
+_huellas_coeficientes = {}
+
+
+def _huella_coeficientes(coeffs_df):
+    """Huella del contenido de una tabla de coeficientes, memoizada por objeto."""
+    if coeffs_df is None:
+        return None
+    with _cache_lock:
+        guardada = _huellas_coeficientes.get(id(coeffs_df))
+    if guardada is not None and guardada[0]() is coeffs_df:
+        return guardada[1]
+    huella = hash(pd.util.hash_pandas_object(coeffs_df, index=False).to_numpy().tobytes())
+    with _cache_lock:
+        for clave in [k for k, (ref, _) in _huellas_coeficientes.items() if ref() is None]:
+            _huellas_coeficientes.pop(clave, None)
+        _huellas_coeficientes[id(coeffs_df)] = (weakref.ref(coeffs_df), huella)
+    return huella
+
+
+def _firma_fuentes(referencia, df_coeffs, df_coeffs_15, raza, sexo):
+    """Identifica los datos de origen de una línea, para no servir tablas de otra referencia."""
+    linea = indexar_referencia(referencia).get((raza, sexo))
+    return id(linea), _huella_coeficientes(df_coeffs), _huella_coeficientes(df_coeffs_15)
+
+
+def _copia_solo_lectura(tabla):
+    return tabla.copy(deep=not _COPIA_PEREZOSA)
+
+
+def tamano_en_memoria(valor):
+    """Bytes aproximados de un resultado cacheado: arreglos, tablas y sus contenedores (~8 por escalar)."""
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return int(np.sum(valor.memory_usage(index=True, deep=True)))
+    if isinstance(valor, dict):
+        return sum(tamano_en_memoria(v) for v in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return sum(tamano_en_memoria(v) for v in valor)
+    return 8
+
+
+def _memoizar(nombre, clave, firma, construir):
+    """Busca `clave` en la caché LRU `nombre`; si falta (o cambió su firma) la construye y la guarda."""
+    cache = _caches[nombre]
+    with _cache_lock:
+        entrada = cache.get(clave)
+        if entrada is not None and entrada[0] == firma:
+            cache.move_to_end(clave)
+            _cache_contadores[nombre]["hits"] += 1
+            return entrada[1]
+        _cache_contadores[nombre]["misses"] += 1
+
+    resultado = construir()
+    tamano = tamano_en_memoria(resultado)
+
+    with _cache_lock:
+        anterior = cache.pop(clave, None)
+        if anterior is not None:
+            _cache_bytes[nombre] -= anterior[2]
+        cache[clave] = (firma, resultado, tamano)
+        _cache_bytes[nombre] += tamano
+        while len(cache) > 1 and (len(cache) > _cache_maximos[nombre] or _cache_bytes[nombre] > CACHE_BYTES_MAX):
+            _cache_bytes[nombre] -= cache.popitem(last=False)[1][2]
+            _cache_contadores[nombre]["desalojos"] += 1
+    return resultado
+
+
+def tabla_base_cacheada(referencia, df_coeffs, df_coeffs_15, raza, sexo, restriccion_programada, productividad):
+    """
+    Igual que construir_tabla_base, pero memoizada en una caché LRU acotada que comparten
+    todas las páginas y sesiones del proceso. La clave es (raza, sexo, restricción,
+    productividad); el llamador recibe una copia, así que no puede alterar la tabla guardada.
+    """
+    clave = (raza, sexo, float(restriccion_programada), float(productividad))
+    tabla = _memoizar(
+        "tablas", clave, _firma_fuentes(referencia, df_coeffs, df_coeffs_15, raza, sexo),
+        lambda: construir_tabla_base(referencia, df_coeffs, df_coeffs_15, raza, sexo, restriccion_programada, productividad),
+    )
+    return None if tabla is None else _copia_solo_lectura(tabla)
+
+
+def estadisticas_cache_tablas(nombre="tablas"):
+    """
+    Contadores de una caché ('tablas', 'inversas', 'coeficientes', 'archivos' o 'etapas'): aciertos,
+    fallos, desalojos, entradas y capacidad, y la memoria estimada con su presupuesto.
+    """
+    with _cache_lock:
+        return {**_cache_contadores[nombre], "entradas": len(_caches[nombre]), "maximo": _cache_maximos[nombre],
+                "bytes": _cache_bytes[nombre], "maximo_bytes": CACHE_BYTES_MAX}
+
+
+def limpiar_cache_tablas():
+    """Vacía las cachés de tablas base, inversas, coeficientes, archivos y etapas y reinicia sus contadores."""
+    with _cache_lock:
+        for nombre, cache in _caches.items():
+            cache.clear()
+            _cache_bytes[nombre] = 0
+            _cache_contadores[nombre].update(hits=0, misses=0, desalojos=0)
+
+
+# =============================================================================
+# --- TABLAS INVERSAS PESO → CONSUMO / DÍA ---
+# =============================================================================
+
+def construir_tabla_inversa(tabla_base):
+    """
+    Tabla inversa de una tabla base: pesos estimados únicos y ordenados, con el consumo
+    acumulado ajustado, la posición y el día de su primera aparición. Equivale al
+    drop_duplicates + sort_values sobre 'Peso_Estimado' que hacían las páginas, hecho una vez.
+    Acepta también un diccionario de arreglos con esas columnas.
+    """
+    peso = np.asarray(tabla_base['Peso_Estimado'], dtype=float)
+    posicion = np.flatnonzero(~np.isnan(peso))
+    orden = posicion[np.argsort(peso[posicion], kind='stable')]
+    pesos_ordenados = peso[orden]
+    primera = np.ones(len(orden), dtype=bool)
+    primera[1:] = pesos_ordenados[1:] != pesos_ordenados[:-1]
+    orden = orden[primera]
+    inversa = {
+        'Peso': peso[orden],
+        'Consumo': np.asarray(tabla_base['Cons_Acum_Ajustado'], dtype=float)[orden],
+        'Posicion': orden,
+        'Dia': np.asarray(tabla_base['Dia'])[orden],
+    }
+    for valores in inversa.values():
+        valores.setflags(write=False)
+    return inversa
+
+
+def tabla_inversa_cacheada(referencia, df_coeffs, df_coeffs_15, raza, sexo, restriccion_programada, productividad):
+    """Tabla inversa de (línea, sexo, restricción, productividad), memoizada como las tablas base."""
+    clave = (raza, sexo, float(restriccion_programada), float(productividad))
+
+    def construir():
+        tabla = tabla_base_cacheada(referencia, df_coeffs, df_coeffs_15, raza, sexo, restriccion_programada, productividad)
+        return None if tabla is None else construir_tabla_inversa(tabla)
+
+    return _memoizar("inversas", clave, _firma_fuentes(referencia, df_coeffs, df_coeffs_15, raza, sexo), construir)
+
+
+def _mas_cercano(inversa, pesos):
+    """Índice en la tabla inversa del peso más cercano; en empate gana el día más temprano."""
+    xs, posicion = inversa['Peso'], inversa['Posicion']
+    pesos = np.asarray(pesos, dtype=float)
+    derecha = np.clip(np.searchsorted(xs, pesos), 0, len(xs) - 1)
+    izquierda = np.clip(derecha - 1, 0, len(xs) - 1)
+    dist_izq, dist_der = np.abs(xs[izquierda] - pesos), np.abs(xs[derecha] - pesos)
+    usar_derecha = (dist_der < dist_izq) | ((dist_der == dist_izq) & (posicion[derecha] < posicion[izquierda]))
+    return np.where(usar_derecha, derecha, izquierda)
+
+
+def posicion_para_pesos(inversa, pesos):
+    """Posición (fila de la tabla base) del día cuyo peso estimado está más cerca de cada peso."""
+    return inversa['Posicion'][_mas_cercano(inversa, pesos)]
+
+
+def consumo_para_pesos(inversa, pesos, hasta_el_mas_cercano=False):
+    """
+    Consumo acumulado ajustado (gr/ave) para uno o muchos pesos objetivo en una sola
+    interpolación. Con `hasta_el_mas_cercano` la curva se corta en el día más cercano al
+    peso, como cuando las páginas truncan la tabla antes de interpolar.
+    """
+    pesos = np.asarray(pesos, dtype=float)
+    if hasta_el_mas_cercano:
+        pesos = np.minimum(pesos, inversa['Peso'][_mas_cercano(inversa, pesos)])
+    return np.interp(pesos, inversa['Peso'], inversa['Consumo'])
+
+
+def calcular_curva_mortalidad(dias_ciclo, total_mortalidad, tipo, porcentaje=50):
+    """Genera un array de mortalidad acumulada según un escenario."""
+    dias_ciclo = int(dias_ciclo)
+    total_mortalidad = float(total_mortalidad)
+    mortalidad_acumulada = np.zeros(dias_ciclo)
+    if tipo == "Lineal (Uniforme)":
+        mortalidad_acumulada = np.linspace(0, total_mortalidad, dias_ciclo)
+    elif tipo == "Concentrada al Inicio (Semana 1)":
+        dias_concentracion = min(7, dias_ciclo)
+        mortalidad_inicial = total_mortalidad * (porcentaje / 100.0)
+        mortalidad_restante = total_mortalidad - mortalidad_inicial
+        curva_inicial = np.linspace(0, mortalidad_inicial, dias_concentracion)
+        mortalidad_acumulada[:dias_concentracion] = curva_inicial
+        if dias_ciclo > dias_concentracion:
+            curva_restante = np.linspace(0, mortalidad_restante, dias_ciclo - dias_concentracion)
+            mortalidad_acumulada[dias_concentracion:] = mortalidad_inicial + curva_restante
+    elif tipo == "Concentrada al Final (Última Semana)":
+        dias_concentracion = min(7, dias_ciclo)
+        punto_inicio_final = dias_ciclo - dias_concentracion
+        mortalidad_final_concentrada = total_mortalidad * (porcentaje / 100.0)
+        mortalidad_previa = total_mortalidad - mortalidad_final_concentrada
+        if punto_inicio_final > 0:
+            curva_previa = np.linspace(0, mortalidad_previa, punto_inicio_final)
+            mortalidad_acumulada[:punto_inicio_final] = curva_previa
+        curva_final = np.linspace(0, mortalidad_final_concentrada, dias_concentracion)
+        mortalidad_acumulada[punto_inicio_final:] = mortalidad_previa + curva_final
+    return np.floor(mortalidad_acumulada)
+
+
+TIPOS_MORTALIDAD = [
+    "Lineal (Uniforme)", "Concentrada al Inicio (Semana 1)", "Concentrada al Final (Última Semana)",
+]
+
+
+def _rampa(j, n, alto):
+    """np.linspace(0, alto, n) evaluado en las posiciones j, con el mismo redondeo."""
+    paso = alto / np.maximum(n - 1, 1)
+    return np.where((j == n - 1) & (n > 1), alto, j * paso)
+
+
+def curvas_mortalidad(dias_ciclo, total_mortalidad, tipo, porcentaje=50):
+    """
+    Versión vectorizada de calcular_curva_mortalidad. `total_mortalidad`, `tipo` (texto o
+    índice en TIPOS_MORTALIDAD) y `porcentaje` son escalares o vectores de escenarios; devuelve
+    la mortalidad acumulada (escenarios × días), idéntica fila a fila a la función escalar.
+    """
+    dias = int(dias_ciclo)
+    if isinstance(tipo, str) or (np.ndim(tipo) > 0 and isinstance(np.ravel(tipo)[0], str)):
+        tipo = [TIPOS_MORTALIDAD.index(t) if t in TIPOS_MORTALIDAD else -1 for t in np.ravel(tipo)]
+    total, codigo, porcentaje = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(total_mortalidad, dtype=float)),
+        np.atleast_1d(np.asarray(tipo, dtype=int)),
+        np.atleast_1d(np.asarray(porcentaje, dtype=float)),
+    )
+
+    # Cada curva son dos tramos lineales: n1 días hasta h1 y luego n2 días que suman h2.
+    dias_concentracion = min(7, dias)
+    concentrada = total * (porcentaje / 100.0)
+    es_inicio, es_final = codigo == 1, codigo == 2
+    n1 = np.select([es_inicio, es_final], [dias_concentracion, dias - dias_concentracion], default=dias)
+    h1 = np.select([es_inicio, es_final], [concentrada, total - concentrada], default=total)
+    h2 = np.select([es_inicio, es_final], [total - concentrada, concentrada], default=0.0)
+
+    j = np.arange(dias)[None, :]
+    n1, h1, h2 = n1[:, None], h1[:, None], h2[:, None]
+    mortalidad_acumulada = np.where(j < n1, _rampa(j, n1, h1), h1 + _rampa(j - n1, dias - n1, h2))
+    mortalidad_acumulada = np.where((codigo >= 0)[:, None], mortalidad_acumulada, 0.0)
+    return np.floor(mortalidad_acumulada)
+
+
+def asignar_fases(cons_acum_ajustado, consumo_objetivo, pre_iniciador, iniciador, retiro):
+    """
+    Asigna el código de fase (índice en FASES) a cada consumo acumulado. Acepta escalares
+    o arrays que se puedan combinar por broadcasting (por ejemplo lotes × días).
+    """
+    cons = np.asarray(cons_acum_ajustado, dtype=float)
+    limite_pre = np.asarray(pre_iniciador, dtype=float)
+    limite_ini = limite_pre + iniciador
+    limite_ret = np.where(np.asarray(retiro) > 0, consumo_objetivo - np.asarray(retiro, dtype=float), np.inf)
+    return np.select(
+        [cons <= limite_pre, (cons > limite_pre) & (cons <= limite_ini), cons > limite_ret],
+        [FASE_PRE, FASE_INI, FASE_RET], default=FASE_ENG,
+    )
+
+
+def precios_por_fase(parametros):
+    """Costo del alimento ($/Kg) de cada fase, en el orden de FASES."""
+    return np.array([
+        parametros['val_pre_iniciador'], parametros['val_iniciador'],
+        parametros['val_engorde'], parametros['val_retiro'],
+    ], dtype=float)
+
+
+def perfil_de_costos(cons_acum_ajustado, fase, peso_final, parametros):
+    """
+    Resume lo que no depende de la mortalidad en un ciclo ya proyectado (consumo diario,
+    fases, precios y costo acumulado del alimento por ave), para evaluar_mortalidades.
+    """
+    cons = np.asarray(cons_acum_ajustado, dtype=float)
+    fase = np.asarray(fase, dtype=int)
+    precios = precios_por_fase(parametros)
+    cons_diario = np.diff(cons, prepend=0.0)
+    return {
+        "cons_diario": cons_diario,
+        "una_fase": (fase[:, None] == np.arange(len(FASES))[None, :]).astype(float),
+        "precios": precios,
+        "costo_alimento_acum_ave": np.cumsum((cons_diario / 1000) * precios[fase]),
+        "peso_final": float(peso_final),
+        "aves": float(parametros['aves_programadas']),
+        "costo_pollito": float(parametros['costo_pollito']),
+        "otros_costos_ave": float(parametros['otros_costos_ave']),
+        "en_kilos": parametros['unidades_calculo'] == "Kilos",
+    }
+
+
+def evaluar_mortalidades(perfil, mortalidad_acumulada):
+    """
+    Costos de un ciclo bajo muchas curvas de mortalidad a la vez. `mortalidad_acumulada` es
+    una matriz (escenarios × días); devuelve un diccionario de vectores (escenarios) con los
+    KPIs del presupuesto y el desglose del costo por mortalidad (NaN si no hay kilos).
+    """
+    mortalidad = np.atleast_2d(np.asarray(mortalidad_acumulada, dtype=float))
+    aves = perfil["aves"]
+    saldo = aves - mortalidad
+
+    if perfil["en_kilos"]:
+        diario, factor_kg = (perfil["cons_diario"] * saldo) / 1000, 1
+    else:
+        diario, factor_kg = np.ceil((perfil["cons_diario"] * saldo) / 40000), 40
+    costo_total_alimento = ((diario @ perfil["una_fase"]) * factor_kg) @ perfil["precios"]
+    costo_total_pollitos = np.full(len(mortalidad), aves * perfil["costo_pollito"])
+    costo_total_otros = np.full(len(mortalidad), aves * perfil["otros_costos_ave"])
+    costo_total_lote = costo_total_alimento + costo_total_pollitos + costo_total_otros
+
+    aves_producidas = saldo[:, -1]
+    kilos = np.where(aves_producidas > 0, (aves_producidas * perfil["peso_final"]) / 1000, 0.0)
+    consumo_total_kg = diario.sum(axis=1) * factor_kg
+
+    mortalidad_diaria = np.diff(mortalidad, axis=1, prepend=0.0)
+    costo_alimento_desperdiciado = mortalidad_diaria @ perfil["costo_alimento_acum_ave"]
+    aves_muertas_total = aves - aves_producidas
+    costo_pollitos_perdidos = aves_muertas_total * perfil["costo_pollito"]
+    costo_otros_perdidos = aves_muertas_total * perfil["otros_costos_ave"]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        por_kilo = lambda v: np.where(kilos > 0, v / kilos, np.nan)
+        return {
+            "kilos_totales_producidos": kilos,
+            "consumo_total_kg": consumo_total_kg,
+            "costo_total_alimento": costo_total_alimento,
+            "costo_total_lote": costo_total_lote,
+            "costo_alimento_kilo": por_kilo(costo_total_alimento),
+            "costo_pollito_kilo": por_kilo(costo_total_pollitos),
+            "costo_otros_kilo": por_kilo(costo_total_otros),
+            "costo_total_por_kilo": por_kilo(costo_total_lote),
+            "costo_total_mortalidad": costo_pollitos_perdidos + costo_alimento_desperdiciado + costo_otros_perdidos,
+            "costo_alimento_mortalidad_total": costo_alimento_desperdiciado,
+            "costo_pollito_mortalidad_total": costo_pollitos_perdidos,
+            "costo_otros_mortalidad_total": costo_otros_perdidos,
+            "costo_alimento_mortalidad_kilo": por_kilo(costo_alimento_desperdiciado),
+            "costo_pollito_mortalidad_kilo": por_kilo(costo_pollitos_perdidos),
+            "costo_otros_mortalidad_kilo": por_kilo(costo_otros_perdidos),
+            "aves_producidas": aves_producidas,
+        }
+
+
+def perfil_mortalidad(tabla_base, inversa, parametros):
+    """
+    Perfil de costos del simulador de mortalidad: el ciclo completo de la tabla base con las
+    fases calculadas sobre el consumo que lleva al peso objetivo.
+    """
+    cons = tabla_base['Cons_Acum_Ajustado'].to_numpy()
+    fases = asignar_fases(
+        cons, consumo_para_pesos(inversa, parametros['peso_objetivo']),
+        parametros['pre_iniciador'], parametros['iniciador'], parametros['retiro'],
+    )
+    return perfil_de_costos(cons, fases, tabla_base['Peso_Estimado'].iloc[-1], parametros)
+
+
+def matriz_escenarios_mortalidad(perfil, tipos, porcentajes, mortalidades_porc):
+    """
+    Evalúa en una sola pasada todas las combinaciones (tipo de curva × % concentrado ×
+    % de mortalidad total) sobre un ciclo ya proyectado. Devuelve un DataFrame con una fila
+    por combinación y sus KPIs, y la mortalidad acumulada (combinaciones × días).
+    """
+    codigos = [TIPOS_MORTALIDAD.index(t) for t in tipos]
+    codigo, porcentaje, mortalidad_porc = (
+        m.ravel() for m in np.meshgrid(codigos, np.asarray(porcentajes, dtype=float),
+                                       np.asarray(mortalidades_porc, dtype=float), indexing='ij')
+    )
+    mortalidad = curvas_mortalidad(
+        len(perfil["cons_diario"]), perfil["aves"] * (mortalidad_porc / 100.0), codigo, porcentaje,
+    )
+    escenarios = pd.DataFrame({
+        "tipo_mortalidad": np.asarray(TIPOS_MORTALIDAD, dtype=object)[codigo],
+        "porcentaje_curva": porcentaje,
+        "mortalidad_objetivo": mortalidad_porc,
+        **evaluar_mortalidades(perfil, mortalidad),
+    })
+    return escenarios, mortalidad
+
+
+def optimizar_dia_sacrificio(tabla_base, parametros):
+    """
+    Calcula el costo por kilo de sacrificar en cada día del ciclo, con sumas acumuladas
+    sobre la tabla base (O(n) en la longitud del ciclo). Devuelve una fila por día con
+    kilos producidos mayores a cero.
+    """
+    return _sacrificio_por_etapas(tabla_base, construir_tabla_inversa(tabla_base), parametros,
+                                  lambda nombre, construir: construir())
+
+
+def _sacrificio_por_etapas(tabla_base, inversa, parametros, etapa):
+    """
+    optimizar_dia_sacrificio en las etapas de GRAFO_ETAPAS (la tabla base hace de 'curva').
+    `etapa(nombre, construir)` decide si cada etapa se memoiza.
+    """
+    aves = parametros['aves_programadas']
+    dia = tabla_base['Dia'].to_numpy(dtype=float)
+    cons = tabla_base['Cons_Acum_Ajustado'].to_numpy(dtype=float)
+    peso_est = tabla_base['Peso_Estimado'].to_numpy(dtype=float)
+
+    def fases():
+        consumo_objetivo = consumo_para_pesos(inversa, parametros['peso_objetivo'])
+        return {"Fase": asignar_fases(cons, consumo_objetivo, parametros['pre_iniciador'], parametros['iniciador'],
+                                      parametros['retiro'])}
+
+    def balance():
+        # Mortalidad lineal repartida hasta el día en que se alcanza el peso objetivo.
+        dia_obj_final = dia[posicion_para_pesos(inversa, parametros['peso_objetivo'])]
+        total_mortalidad_aves = aves * (parametros['mortalidad_objetivo'] / 100.0)
+        mortalidad_diaria_prom = total_mortalidad_aves / dia_obj_final if dia_obj_final > 0 else 0
+        saldo = aves - np.floor(dia * mortalidad_diaria_prom)
+        kilos_diarios_lote = (np.diff(cons, prepend=0.0) * saldo) / 1000
+        return {"Saldo": saldo, "kilos_diarios_lote": kilos_diarios_lote,
+                "consumo_total_kg": np.cumsum(kilos_diarios_lote), "kilos_producidos": (saldo * peso_est) / 1000}
+
+    def costos():
+        costo_total_alimento = np.cumsum(b["kilos_diarios_lote"] * precios_por_fase(parametros)[f["Fase"]])
+        costo_total_pollitos = aves * parametros['costo_pollito']
+        costo_total_otros = aves * parametros['otros_costos_ave']
+        return {"costo_total_alimento": costo_total_alimento, "costo_total_pollitos": costo_total_pollitos,
+                "costo_total_otros": costo_total_otros,
+                "costo_total_lote": costo_total_alimento + costo_total_pollitos + costo_total_otros}
+
+    def tabla():
+        saldo, kilos_producidos = b["Saldo"], b["kilos_producidos"]
+        cons_guia = tabla_base['Cons_Acum'].to_numpy(dtype=float)
+        peso_guia = tabla_base['Peso'].to_numpy(dtype=float)
+        validos = kilos_producidos > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            df_opt = pd.DataFrame({
+                'Dia': dia.astype(int),
+                'Fecha': [parametros['fecha_llegada'] + timedelta(days=int(d) - 1) for d in dia],
+                'Saldo': saldo.astype(int),
+                '% Mortalidad Acumulada': (aves - saldo) / aves,
+                'Consumo_Acumulado_Ajustado': cons.astype(int),
+                '% Consumo vs Consumo Guia': cons / cons_guia,
+                'Peso Guia': peso_guia.astype(int),
+                'Peso Esperado': peso_est.astype(int),
+                'Conversion': b["consumo_total_kg"] / kilos_producidos,
+                'Diferencia Genetica': peso_est - peso_guia,
+                'Costo Alimento x Kilo': c["costo_total_alimento"] / kilos_producidos,
+                'Costo Pollito x Kilo': c["costo_total_pollitos"] / kilos_producidos,
+                'Otros Costos x Kilo': c["costo_total_otros"] / kilos_producidos,
+                'Total Costo x Kilo': c["costo_total_lote"] / kilos_producidos,
+            })
+        return {"tabla": df_opt[validos].reset_index(drop=True)}
+
+    f = etapa("fases", fases)
+    b = etapa("balance", balance)
+    c = etapa("costos", costos)
+    return etapa("kpis", tabla)["tabla"]
+
+
+def optimizar_dia_sacrificio_cacheado(referencia, df_coeffs, df_coeffs_15, parametros):
+    """
+    optimizar_dia_sacrificio para los parámetros de una sesión, con las tablas base e inversa
+    de la caché LRU y cada etapa memoizada según GRAFO_ETAPAS. Devuelve None si la línea no
+    tiene datos; el llamador recibe una copia de la tabla.
+    """
+    linea = (parametros['raza_seleccionada'], parametros['sexo_seleccionado'],
+             parametros['restriccion_programada'], parametros['productividad'])
+    tabla_base = tabla_base_cacheada(referencia, df_coeffs, df_coeffs_15, *linea)
+    if tabla_base is None:
+        return None
+    valores = {campo: _valor_de_clave(parametros[campo]) for campo in CAMPOS_LOTE if campo in parametros}
+    valores["fuentes"] = _firma_fuentes(referencia, df_coeffs, df_coeffs_15, linea[0], linea[1])
+    etapa = _etapas_memoizadas("sacrificio", valores)
+    tabla = _sacrificio_por_etapas(tabla_base, tabla_inversa_cacheada(referencia, df_coeffs, df_coeffs_15, *linea),
+                                   parametros, etapa)
+    return _copia_solo_lectura(tabla)
+
+
+# =============================================================================
+# --- BÚSQUEDA DEL PLAN DE ALIMENTACIÓN DE MÍNIMO COSTO ---
+# =============================================================================
+
+# Gramos por ave que admiten los deslizadores del simulador de alimentación.
+RANGOS_PLAN = {'Pre-iniciador': (0, 500), 'Iniciador': (500, 2000), 'Retiro': (0, 1000)}
+
+
+def preparar_ciclo_alimentacion(tabla_base, inversa, parametros):
+    """
+    Ciclo del simulador de alimentación: tabla truncada en el día más cercano al peso objetivo,
+    con saldo (mortalidad diaria promedio) y kilos diarios del lote. Devuelve
+    (tabla, consumo_objetivo_ave, kilos_producidos).
+    """
+    posicion = posicion_para_pesos(inversa, parametros['peso_objetivo'])
+    tabla = tabla_base.iloc[:posicion + 1].copy()
+    consumo_objetivo = consumo_para_pesos(inversa, parametros['peso_objetivo'], hasta_el_mas_cercano=True)
+
+    mortalidad_diaria_prom = (parametros['aves_programadas'] * (parametros['mortalidad_objetivo'] / 100)) / len(tabla)
+    tabla['Saldo'] = parametros['aves_programadas'] - (tabla['Dia'] * mortalidad_diaria_prom).apply(np.floor)
+    tabla['Cons_Diario_Ave_gr'] = tabla['Cons_Acum_Ajustado'].diff().fillna(tabla['Cons_Acum_Ajustado'].iloc[0])
+    tabla['Kilos_Diarios_Lote'] = (tabla['Cons_Diario_Ave_gr'] * tabla['Saldo']) / 1000
+
+    kilos_producidos = (tabla['Saldo'].iloc[-1] * tabla['Peso_Estimado'].iloc[-1]) / 1000
+    return tabla, consumo_objetivo, kilos_producidos
+
+
+def kilos_por_fase_de_planes(cons_acum_ajustado, kilos_diarios, consumo_objetivo, pre_iniciador, iniciador, retiro):
+    """
+    Kilos de cada fase (planes × FASES) para muchos planes a la vez. Como el consumo acumulado
+    no decrece, cada fase es un tramo contiguo de días: los límites salen de searchsorted y los
+    kilos de una suma acumulada, con el mismo reparto que asignar_fases. `kilos_diarios` puede
+    ser un solo vector o uno por plan (planes × días); `consumo_objetivo` también puede variar.
+    """
+    cons = np.asarray(cons_acum_ajustado, dtype=float)
+    kilos = np.asarray(kilos_diarios, dtype=float)
+    acumulado = np.concatenate([np.zeros(kilos.shape[:-1] + (1,)), np.cumsum(kilos, axis=-1)], axis=-1)
+    pre, ini, ret, consumo_objetivo = np.broadcast_arrays(
+        *(np.asarray(v, dtype=float) for v in (pre_iniciador, iniciador, retiro, consumo_objetivo)))
+
+    fin_pre = np.searchsorted(cons, pre, side='right')
+    fin_ini = np.maximum(np.searchsorted(cons, pre + ini, side='right'), fin_pre)
+    inicio_ret = np.where(ret > 0, np.searchsorted(cons, consumo_objetivo - ret, side='right'), len(cons))
+    inicio_ret = np.maximum(inicio_ret, fin_ini)
+
+    if acumulado.ndim == 1:
+        tomar = lambda i: acumulado[i]
+    else:  # un vector de kilos diarios por plan (planes × días)
+        tomar = lambda i: np.take_along_axis(acumulado, i.reshape(-1, 1), axis=1)[:, 0].reshape(i.shape)
+    return np.stack([
+        tomar(fin_pre),
+        tomar(fin_ini) - tomar(fin_pre),
+        tomar(inicio_ret) - tomar(fin_ini),
+        acumulado[..., -1] - tomar(inicio_ret),
+    ], axis=-1)
+
+
+def _rangos_de_malla(limites):
+    """(mínimo, máximo) en gramos de pre-iniciador, iniciador y retiro: RANGOS_PLAN acotados por `limites`."""
+    rangos = []
+    for fase in ('Pre-iniciador', 'Iniciador', 'Retiro'):
+        minimo, maximo = RANGOS_PLAN[fase]
+        minimo_fase, maximo_fase = limites.get(fase, (minimo, maximo))
+        rangos.append((max(minimo, minimo_fase), min(maximo, maximo_fase)))
+    return rangos
+
+
+def planes_en_malla(limites=None, paso=10):
+    """Cantidad de planes que recorre optimizar_plan_alimentacion, sin construir la malla."""
+    planes = 1
+    for minimo, maximo in _rangos_de_malla(limites or {}):
+        planes *= max(0, math.ceil((maximo + 1 - minimo) / paso))
+    return planes
+
+
+def optimizar_plan_alimentacion(cons_acum_ajustado, kilos_diarios, consumo_objetivo, precios,
+                                limites=None, paso=10, plan_actual=None):
+    """
+    Recorre toda la malla de RANGOS_PLAN (cada `paso` gramos) y devuelve el plan más barato
+    cuyas fases caben en el consumo que lleva al peso objetivo. `limites` acota, si se da, los
+    gramos por ave de cada fase ({'Engorde': (mín, máx), ...}). Entre planes de igual costo se
+    queda con el más cercano a `plan_actual` (pre, ini, ret). Devuelve None si no hay plan factible.
+    """
+    limites = limites or {}
+    ejes = [np.arange(minimo, maximo + 1, paso, dtype=float) for minimo, maximo in _rangos_de_malla(limites)]
+    pre, ini, ret = (m.ravel() for m in np.meshgrid(*ejes, indexing='ij'))
+
+    engorde = consumo_objetivo - pre - ini - ret
+    minimo_eng, maximo_eng = limites.get('Engorde', (0, np.inf))
+    factible = (engorde >= max(minimo_eng, 0)) & (engorde <= maximo_eng)
+    if not factible.any():
+        return None
+    pre, ini, ret, engorde = pre[factible], ini[factible], ret[factible], engorde[factible]
+
+    kilos_fase = kilos_por_fase_de_planes(cons_acum_ajustado, kilos_diarios, consumo_objetivo, pre, ini, ret)
+    costos = kilos_fase @ np.asarray(precios, dtype=float)
+
+    candidatos = np.flatnonzero(np.isclose(costos, costos.min(), rtol=1e-12, atol=0))
+    if plan_actual is not None:
+        distancia = np.abs(pre[candidatos] - plan_actual[0]) + np.abs(ini[candidatos] - plan_actual[1]) + np.abs(ret[candidatos] - plan_actual[2])
+        candidatos = candidatos[np.argsort(distancia, kind='stable')]
+    mejor = candidatos[0]
+
+    return {
+        'pre_iniciador': float(pre[mejor]), 'iniciador': float(ini[mejor]), 'retiro': float(ret[mejor]),
+        'engorde': float(engorde[mejor]), 'costo_total_alimento': float(costos[mejor]),
+        'kilos_por_fase': dict(zip(FASES, kilos_fase[mejor].tolist())),
+        'planes_evaluados': int(factible.size), 'planes_factibles': int(factible.sum()),
+    }
+
+
+# =============================================================================
+# --- SENSIBILIDAD AL PESO OBJETIVO ---
+# =============================================================================
+
+def sensibilidad_peso_objetivo(tabla_base, inversa, pesos, parametros):
+    """
+    Costos por kilo para cada peso objetivo de `pesos` en una sola pasada, con el modelo del
+    simulador de alimentación: ciclo truncado en el día más cercano al peso, mortalidad diaria
+    promedio y consumo en kilos. Devuelve un DataFrame (un peso por fila) sin los pesos que no
+    producen kilos.
+    """
+    pesos = np.atleast_1d(np.asarray(pesos, dtype=float))
+    pesos = pesos[pesos > 0]
+    dia = tabla_base['Dia'].to_numpy(dtype=float)
+    cons = tabla_base['Cons_Acum_Ajustado'].to_numpy(dtype=float)
+    peso_estimado = tabla_base['Peso_Estimado'].to_numpy(dtype=float)
+
+    posicion = posicion_para_pesos(inversa, pesos)
+    consumo_objetivo = consumo_para_pesos(inversa, pesos, hasta_el_mas_cercano=True)
+    dias_ciclo = dia[posicion]
+
+    # Matriz (pesos × días): cada fila es el ciclo truncado en su día de sacrificio.
+    aves = float(parametros['aves_programadas'])
+    mortalidad_total_aves = aves * (parametros['mortalidad_objetivo'] / 100)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mortalidad_diaria_prom = np.where(dias_ciclo > 0, mortalidad_total_aves / dias_ciclo, 0.0)
+    saldo = aves - np.floor(dia[None, :] * mortalidad_diaria_prom[:, None])
+    activo = np.arange(len(dia))[None, :] <= posicion[:, None]
+    kilos_diarios = np.where(activo, (np.diff(cons, prepend=0.0)[None, :] * saldo) / 1000, 0.0)
+
+    kilos_fase = kilos_por_fase_de_planes(
+        cons, kilos_diarios, consumo_objetivo,
+        parametros['pre_iniciador'], parametros['iniciador'], parametros['retiro'],
+    )
+    costo_total_alimento = kilos_fase @ precios_por_fase(parametros)
+    costo_total_pollitos = aves * parametros['costo_pollito']
+    costo_total_otros = aves * parametros['otros_costos_ave']
+
+    aves_producidas = np.take_along_axis(saldo, posicion[:, None], axis=1)[:, 0]
+    kilos = (aves_producidas * peso_estimado[posicion]) / 1000
+    valido = kilos > 0
+    kilos = np.where(valido, kilos, np.nan)
+    resultado = pd.DataFrame({
+        "peso_objetivo": pesos,
+        "dias_ciclo": dias_ciclo.astype(int),
+        "kilos_totales_producidos": kilos,
+        "conversion_alimenticia": kilos_diarios.sum(axis=1) / kilos,
+        "costo_alimento_kilo": costo_total_alimento / kilos,
+        "costo_pollito_kilo": costo_total_pollitos / kilos,
+        "costo_otros_kilo": costo_total_otros / kilos,
+        "costo_total_por_kilo": (costo_total_alimento + costo_total_pollitos + costo_total_otros) / kilos,
+    })
+    return resultado[valido].reset_index(drop=True)
+
+
+# =============================================================================
+# --- SUPERFICIE PRODUCTIVIDAD × PRECIO DEL ALIMENTO ---
+# =============================================================================
+
+def kpis_por_productividad(parametros, referencia, df_coeffs, df_coeffs_15, productividades, precios_alimento=None):
+    """
+    KPIs del presupuesto del lote `parametros` (por ejemplo st.session_state) para cada
+    productividad (%), recalculados con el motor: la productividad cambia el peso estimado, el
+    día de sacrificio y el alimento consumido. Es una sola pasada de calcular_presupuestos;
+    devuelve un DataFrame con una fila por productividad.
+    """
+    lote = {campo: parametros[campo] if campo in parametros else valor for campo, valor in LOTE_POR_DEFECTO.items()}
+    productividades = np.asarray(productividades, dtype=float)
+    lotes = pd.DataFrame([lote] * len(productividades)).assign(productividad=productividades)
+    return calcular_presupuestos(lotes, referencia, df_coeffs, df_coeffs_15, precios_alimento).set_index(
+        pd.Index(productividades, name='productividad'))
+
+
+def superficie_productividad_precio(parametros, referencia, df_coeffs, df_coeffs_15, productividades=None,
+                                    multiplicadores=None, niveles=8, precios_alimento=None):
+    """
+    Costo por kilo y conversión sobre la malla (multiplicador de precio del alimento ×
+    productividad). Cada productividad se proyecta con el motor (kpis_por_productividad) y el
+    multiplicador escala el costo del alimento recalculado; la conversión no depende del precio.
+    Además de las matrices listas para un mapa de calor, devuelve las curvas de iso-costo: la
+    productividad que da cada costo por kilo de `niveles` en cada multiplicador (primer cruce
+    por interpolación lineal; NaN si no lo alcanza dentro de la malla).
+    """
+    productividades = (np.round(np.arange(700, 1101) / 10, 1) if productividades is None
+                       else np.asarray(productividades, dtype=float))
+    multiplicadores = (np.round(np.arange(80, 121) / 100, 2) if multiplicadores is None
+                       else np.asarray(multiplicadores, dtype=float))
+
+    kpis = kpis_por_productividad(parametros, referencia, df_coeffs, df_coeffs_15, productividades, precios_alimento)
+    kilos = kpis['kilos_totales_producidos'].to_numpy()
+    costo_alimento = kpis['costo_total_alimento'].to_numpy()[None, :] * multiplicadores[:, None]
+    costo_fijo = (kpis['costo_total_pollitos'] + kpis['costo_total_otros']).to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        costo_total_por_kilo = np.where(kilos > 0, (costo_alimento + costo_fijo) / kilos, np.nan)
+        costo_alimento_kilo = np.where(kilos > 0, costo_alimento / kilos, np.nan)
+        conversion = np.where(kilos > 0, kpis['consumo_total_kg'].to_numpy() / kilos, np.nan)
+
+    if np.isscalar(niveles):
+        finitos = costo_total_por_kilo[np.isfinite(costo_total_por_kilo)]
+        if finitos.size and finitos.max() > finitos.min():
+            # Niveles redondos: paso de 1, 2, 3... × 10^k que deje unas `niveles` curvas.
+            paso = (finitos.max() - finitos.min()) / (int(niveles) + 1)
+            escala = 10 ** np.floor(np.log10(paso))
+            paso = np.ceil(paso / escala) * escala
+            niveles = np.arange(np.ceil(finitos.min() / paso) * paso, finitos.max(), paso)
+        else:
+            niveles = np.empty(0)
+    niveles = np.asarray(niveles, dtype=float)
+
+    # Primer cruce de cada nivel a lo largo de la productividad (niveles × multiplicadores).
+    diferencia = costo_total_por_kilo[None, :, :] - niveles[:, None, None]
+    cruza = (np.signbit(diferencia[..., :-1]) != np.signbit(diferencia[..., 1:])) & np.isfinite(
+        diferencia[..., :-1] + diferencia[..., 1:])
+    primero = cruza.argmax(axis=-1)[..., None]
+    d0 = np.take_along_axis(diferencia, primero, axis=-1)[..., 0]
+    d1 = np.take_along_axis(diferencia, primero + 1, axis=-1)[..., 0]
+    p0, p1 = productividades[primero[..., 0]], productividades[np.minimum(primero[..., 0] + 1, len(productividades) - 1)]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        productividad_iso = np.where(cruza.any(axis=-1), p0 + (p1 - p0) * d0 / (d0 - d1), np.nan)
+
+    return {
+        "productividad": productividades, "multiplicador": multiplicadores,
+        "costo_total_por_kilo": costo_total_por_kilo, "costo_alimento_kilo": costo_alimento_kilo,
+        "conversion": np.broadcast_to(conversion, costo_total_por_kilo.shape),
+        "niveles_iso_costo": niveles, "productividad_iso_costo": productividad_iso,
+    }
+
+
+# =============================================================================
+# --- PRECIOS DEL ALIMENTO POR FECHA ---
+# =============================================================================
+
+def normalizar_precios_alimento(df_precios):
+    """
+    Deja una serie de precios ($/Kg) lista para el cruce por fecha: índice de fechas
+    ordenado y una columna por fase (FASES). Acepta formato ancho (Fecha + una columna por
+    fase) o largo (Fecha, Fase, Precio). Cada precio rige desde su fecha hasta el siguiente
+    cambio; las fases sin precio quedan en NaN y se costean con el precio plano del lote.
+    """
+    df = df_precios.copy()
+    if {'Fase', 'Precio'} <= set(df.columns):
+        df = df.pivot_table(index='Fecha', columns='Fase', values='Precio', aggfunc='last').reset_index()
+    df['Fecha'] = pd.to_datetime(df['Fecha'], errors='coerce')
+    df = df.dropna(subset=['Fecha'])
+    precios = pd.DataFrame({
+        fase: clean_numeric_column(df[fase]).to_numpy(dtype=float) if fase in df.columns else np.nan for fase in FASES
+    }, index=df['Fecha'].to_numpy())
+    precios = precios.groupby(level=0).last().sort_index().ffill()
+    precios.index.name = 'Fecha'
+    return precios
+
+
+def cargar_precios_alimento(ruta=ARCHIVO_PRECIOS):
+    """Carga la serie de precios por fecha desde un CSV local; devuelve None si no existe."""
+    ruta = Path(ruta)
+    if not ruta.exists():
+        return None
+    return normalizar_precios_alimento(pd.read_csv(ruta))
+
+
+def precios_por_fecha(fechas, fases, precios_alimento, respaldo):
+    """
+    Precio ($/Kg) vigente en cada fecha para su fase, con un único cruce as-of (merge_asof)
+    sin importar cuántos lotes y días haya. `fechas`, `fases` y `respaldo` son arrays del
+    mismo tamaño; donde la serie no tiene precio (antes de su primera fecha o fase vacía)
+    se usa `respaldo`.
+    """
+    fechas = np.asarray(fechas, dtype='datetime64[ns]')
+    izquierda = pd.DataFrame({'Fecha': fechas.ravel(), 'orden': np.arange(fechas.size)}).sort_values('Fecha')
+    derecha = precios_alimento.reset_index()
+    derecha['Fecha'] = derecha['Fecha'].astype('datetime64[ns]')
+    cruce = pd.merge_asof(izquierda, derecha, on='Fecha', direction='backward')
+    vigentes = np.empty((fechas.size, len(FASES)))
+    vigentes[cruce['orden'].to_numpy()] = cruce[FASES].to_numpy(dtype=float)
+    precio = np.take_along_axis(vigentes, np.asarray(fases, dtype=int).reshape(-1, 1), axis=1)[:, 0]
+    precio = precio.reshape(fechas.shape)
+    return np.where(np.isnan(precio), respaldo, precio)
+
+
+# =============================================================================
+# --- CÁLCULO VECTORIZADO POR PORTAFOLIO (LOTES × DÍAS) ---
+# =============================================================================
+
+def preparar_lotes(lotes):
+    """Normaliza una tabla de lotes: completa los campos faltantes con los valores del panel lateral."""
+    lotes = pd.DataFrame(lotes).copy()
+    for campo, valor in LOTE_POR_DEFECTO.items():
+        if campo not in lotes.columns:
+            lotes[campo] = valor
+    # Fechas leídas de archivos (texto o datetime64) quedan como date, igual que en el panel.
+    if lotes['fecha_llegada'].notna().any():
+        lotes['fecha_llegada'] = pd.to_datetime(lotes['fecha_llegada']).dt.date
+    return lotes
+
+
+def _interp_por_fila(x, xp, fp, validos):
+    """
+    Equivalente a np.interp(x[i], xp[i], fp[i]) para cada fila, replicando el
+    drop_duplicates + sort_values que hacen las páginas sobre 'Peso_Estimado'.
+    """
+    d = xp.shape[1]
+    xp = np.where(validos, xp, np.inf)
+    orden = np.argsort(xp, axis=1, kind='stable')
+    xs = np.take_along_axis(xp, orden, axis=1)
+    fs = np.take_along_axis(fp, orden, axis=1)
+    # Los duplicados (se conserva la primera aparición) se mandan al final como inválidos.
+    duplicado = np.zeros_like(validos)
+    duplicado[:, 1:] = xs[:, 1:] == xs[:, :-1]
+    xs = np.where(duplicado, np.inf, xs)
+    orden = np.argsort(xs, axis=1, kind='stable')
+    xs = np.take_along_axis(xs, orden, axis=1)
+    fs = np.take_along_axis(fs, orden, axis=1)
+    n_validos = np.isfinite(xs).sum(axis=1)
+
+    tomar = lambda m, j: np.take_along_axis(m, np.clip(j, 0, d - 1)[:, None], axis=1)[:, 0]
+    pos = (xs <= x[:, None]).sum(axis=1)
+    j = np.clip(pos - 1, 0, np.maximum(n_validos - 2, 0))
+    x0, x1, f0, f1 = tomar(xs, j), tomar(xs, j + 1), tomar(fs, j), tomar(fs, j + 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        resultado = f0 + (x - x0) * (f1 - f0) / (x1 - x0)
+    resultado = np.where(pos == 0, fs[:, 0], resultado)
+    resultado = np.where(pos >= n_validos, tomar(fs, n_validos - 1), resultado)
+    return np.where(n_validos > 0, resultado, np.nan)
+
+
+def _matrices_por_linea(lotes, referencia):
+    """Arma las curvas de referencia de cada lote como matrices (lotes × días) rellenas con NaN."""
+    referencia = indexar_referencia(referencia)
+    claves = list(zip(lotes['raza_seleccionada'], lotes['sexo_seleccionado']))
+    lineas = list(dict.fromkeys(claves))
+    vacia = {'Dia': np.empty(0), 'Peso': np.empty(0), 'Cons_Acum': np.empty(0)}
+    curvas = [referencia.get(linea, vacia) for linea in lineas]
+
+    max_dias = max([len(c['Dia']) for c in curvas] + [1])
+    dia = np.full((len(lineas), max_dias), np.nan)
+    peso = np.full_like(dia, np.nan)
+    cons = np.full_like(dia, np.nan)
+    for i, c in enumerate(curvas):
+        n_dias = len(c['Dia'])
+        dia[i, :n_dias], peso[i, :n_dias], cons[i, :n_dias] = c['Dia'], c['Peso'], c['Cons_Acum']
+
+    codigo = np.array([lineas.index(k) for k in claves], dtype=int)
+    return claves, dia[codigo], peso[codigo], cons[codigo]
+
+
+# Etapas del presupuesto de un lote y lo que lee cada una: las etapas de las que depende y
+# sus propias entradas (campos del lote; 'fuentes' son la tabla genética y los coeficientes,
+# 'precios_alimento' la serie opcional por fecha). proyectar_lotes las encadena para todo el
+# portafolio; proyectar_lote y optimizar_dia_sacrificio_cacheado las memoizan una por una con
+# la clave de campos_de_etapa, así que una edición solo recalcula las etapas aguas abajo del
+# campo que cambió (un precio no vuelve a evaluar la curva de crecimiento ni la mortalidad).
+GRAFO_ETAPAS = {
+    "curva": ((), ("fuentes", "raza_seleccionada", "sexo_seleccionado", "restriccion_programada", "productividad")),
+    "fases": (("curva",), ("peso_objetivo", "pre_iniciador", "iniciador", "retiro")),
+    "balance": (("curva",), ("peso_objetivo", "aves_programadas", "mortalidad_objetivo", "unidades_calculo")),
+    "costos": (("curva", "fases", "balance"), ("val_pre_iniciador", "val_iniciador", "val_engorde", "val_retiro",
+                                              "costo_pollito", "otros_costos_ave", "fecha_llegada", "precios_alimento")),
+    "kpis": (("curva", "fases", "balance", "costos"), ()),
+}
+
+
+def campos_de_etapa(nombre):
+    """Entradas de las que depende una etapa, directa o indirectamente, en orden estable."""
+    dependencias, propias = GRAFO_ETAPAS[nombre]
+    return tuple(dict.fromkeys([c for d in dependencias for c in campos_de_etapa(d)] + list(propias)))
+
+
+def _columnas_de_lotes(lotes):
+    """Campos de una tabla de lotes ya preparada como arreglos de numpy (las etapas no pasan por pandas)."""
+    return {campo: lotes[campo].to_numpy() for campo in CAMPOS_LOTE}
+
+
+def _columna(lotes, campo):
+    return np.asarray(lotes[campo], dtype=float)
+
+
+def _etapa_curva(lotes, referencia, df_coeffs, df_coeffs_15):
+    """1. Curva de crecimiento de cada lote: referencia de su línea con restricción y productividad."""
+    claves, dia, peso, cons_acum = _matrices_por_linea(lotes, referencia)
+    cons = cons_acum * (1 - (_columna(lotes, 'restriccion_programada') / 100.0))[:, None]
+    peso_est = peso_estimado_por_dia(matriz_coeficientes(df_coeffs, df_coeffs_15), claves, cons, dia)
+    peso_est = peso_est * (_columna(lotes, 'productividad') / 100.0)[:, None]
+    return {"Dia": dia, "Peso": peso, "Cons_Acum": cons_acum, "existe": ~np.isnan(dia),
+            "Cons_Acum_Ajustado": cons, "Peso_Estimado": peso_est}
+
+
+def _etapa_fases(lotes, curva):
+    """2. Consumo objetivo por ave y fase de alimento de cada día."""
+    cons, peso_est = curva["Cons_Acum_Ajustado"], curva["Peso_Estimado"]
+    consumo_obj = _interp_por_fila(_columna(lotes, 'peso_objetivo'), peso_est, cons, curva["existe"] & ~np.isnan(peso_est))
+    fase = asignar_fases(
+        cons, consumo_obj[:, None],
+        _columna(lotes, 'pre_iniciador')[:, None], _columna(lotes, 'iniciador')[:, None], _columna(lotes, 'retiro')[:, None],
+    )
+    return {"consumo_obj": consumo_obj, "Fase": fase}
+
+
+def _etapa_balance(lotes, curva):
+    """3. Día de sacrificio, mortalidad lineal, saldo de aves y consumo diario en kilos o bultos."""
+    dia, existe, peso_est = curva["Dia"], curva["existe"], curva["Peso_Estimado"]
+    columnas = np.arange(dia.shape[1])
+    peso_obj = _columna(lotes, 'peso_objetivo')
+    distancia = np.abs(peso_est - peso_obj[:, None])
+    distancia = np.where(existe & ~np.isnan(distancia), distancia, np.inf)
+    idx_cercano = np.argmin(distancia, axis=1)
+    dia_obj = np.take_along_axis(np.nan_to_num(dia), idx_cercano[:, None], axis=1)[:, 0].astype(int)
+    n_dias = np.minimum(dia_obj, existe.sum(axis=1))
+    activo = columnas[None, :] < n_dias[:, None]
+
+    aves = _columna(lotes, 'aves_programadas')
+    total_mortalidad = aves * (_columna(lotes, 'mortalidad_objetivo') / 100.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        paso = np.where(dia_obj > 1, total_mortalidad / (dia_obj - 1), 0.0)
+    mortalidad = columnas[None, :] * paso[:, None]
+    es_ultimo = (columnas[None, :] == (dia_obj - 1)[:, None]) & (dia_obj > 1)[:, None]
+    mortalidad = np.where(es_ultimo, total_mortalidad[:, None], mortalidad)
+    mortalidad = np.where(activo, np.floor(mortalidad), 0.0)
+    saldo = aves[:, None] - mortalidad
+
+    cons_diario = np.diff(np.nan_to_num(curva["Cons_Acum_Ajustado"]), axis=1, prepend=0.0)
+    en_kilos = np.asarray(lotes['unidades_calculo'] == "Kilos", dtype=bool)
+    diario = np.where(
+        en_kilos[:, None],
+        (cons_diario * saldo) / 1000,
+        np.ceil((cons_diario * saldo) / 40000),
+    )
+    diario = np.where(activo, diario, 0.0)
+    return {"n_dias": n_dias, "activo": activo, "Mortalidad_Acumulada": mortalidad, "Saldo": saldo,
+            "Cons_Diario_Ave_gr": cons_diario, "Diario": diario, "factor_kg": np.where(en_kilos, 1, 40),
+            "Mortalidad_Diaria": np.diff(mortalidad, axis=1, prepend=0.0)}
+
+
+def _etapa_costos(lotes, curva, fases, balance, precios_alimento=None):
+    """4. Costo del alimento (precio por fase o por fecha), de pollitos y otros, y el alimento perdido por mortalidad."""
+    fase, diario, factor_kg, activo = fases["Fase"], balance["Diario"], balance["factor_kg"], balance["activo"]
+    aves = _columna(lotes, 'aves_programadas')
+    precios = np.column_stack([_columna(lotes, c) for c in ('val_pre_iniciador', 'val_iniciador', 'val_engorde', 'val_retiro')])
+    costo_kg_dia = np.take_along_axis(precios, fase, axis=1)
+    if precios_alimento is None:
+        unidades = np.column_stack([np.where(fase == f, diario, 0.0).sum(axis=1) for f in range(len(FASES))])
+        costo_total_alimento = np.zeros(len(aves))
+        for f in range(len(FASES)):
+            costo_total_alimento = costo_total_alimento + (unidades[:, f] * factor_kg) * precios[:, f]
+    else:
+        # Cada día activo se costea al precio vigente en su fecha (un solo cruce para todo el portafolio).
+        llegada = pd.Series(lotes['fecha_llegada'])
+        llegada = pd.to_datetime(llegada.where(llegada.notna(), date.today()))
+        fechas = (llegada.to_numpy(dtype='datetime64[D]')[:, None]
+                  + (np.nan_to_num(curva["Dia"], nan=1.0).astype(int) - 1).astype('timedelta64[D]'))
+        costo_kg_dia = costo_kg_dia.copy()
+        costo_kg_dia[activo] = precios_por_fecha(fechas[activo], fase[activo], precios_alimento, costo_kg_dia[activo])
+        costo_total_alimento = (diario * factor_kg[:, None] * costo_kg_dia).sum(axis=1)
+
+    costo_total_pollitos = aves * _columna(lotes, 'costo_pollito')
+    costo_total_otros = aves * _columna(lotes, 'otros_costos_ave')
+    costo_alimento_acum_ave = np.cumsum(np.where(activo, (balance["Cons_Diario_Ave_gr"] / 1000) * costo_kg_dia, 0.0), axis=1)
+    return {
+        "Costo_Kg_Dia": costo_kg_dia, "Costo_Alimento_Acum_Ave": costo_alimento_acum_ave,
+        "costo_total_alimento": costo_total_alimento, "costo_total_pollitos": costo_total_pollitos,
+        "costo_total_otros": costo_total_otros,
+        "costo_total_lote": costo_total_alimento + costo_total_pollitos + costo_total_otros,
+        "costo_alimento_desperdiciado": np.where(activo, balance["Mortalidad_Diaria"] * costo_alimento_acum_ave, 0.0).sum(axis=1),
+    }
+
+
+def _etapa_kpis(lotes, curva, fases, balance, costos):
+    """5. KPIs del presupuesto de cada lote y si el lote es válido (produce kilos)."""
+    saldo, n_dias = balance["Saldo"], balance["n_dias"]
+    ultimo = np.maximum(n_dias - 1, 0)[:, None]
+    aves_producidas = np.take_along_axis(saldo, ultimo, axis=1)[:, 0]
+    peso_final = np.take_along_axis(curva["Peso_Estimado"], ultimo, axis=1)[:, 0]
+    kilos = np.where(aves_producidas > 0, (aves_producidas * peso_final) / 1000, 0.0)
+    consumo_total_kg = balance["Diario"].sum(axis=1) * balance["factor_kg"]
+
+    aves_muertas_total = _columna(lotes, 'aves_programadas') - aves_producidas
+    costo_pollitos_perdidos = aves_muertas_total * _columna(lotes, 'costo_pollito')
+    costo_otros_perdidos = aves_muertas_total * _columna(lotes, 'otros_costos_ave')
+    costo_alimento_desperdiciado = costos["costo_alimento_desperdiciado"]
+
+    valido = (kilos > 0) & curva["existe"].any(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        por_kilo = lambda v: np.where(valido, v / kilos, np.nan)
+        kpis = {
+            "kilos_totales_producidos": kilos,
+            "consumo_total_kg": consumo_total_kg,
+            "costo_total_alimento": costos["costo_total_alimento"],
+            "costo_total_pollitos": costos["costo_total_pollitos"],
+            "costo_total_otros": costos["costo_total_otros"],
+            "costo_total_lote": costos["costo_total_lote"],
+            "costo_alimento_kilo": por_kilo(costos["costo_total_alimento"]),
+            "costo_pollito_kilo": por_kilo(costos["costo_total_pollitos"]),
+            "costo_otros_kilo": por_kilo(costos["costo_total_otros"]),
+            "costo_total_por_kilo": por_kilo(costos["costo_total_lote"]),
+            "conversion_alimenticia": por_kilo(consumo_total_kg),
+            "costo_total_mortalidad": costo_pollitos_perdidos + costo_alimento_desperdiciado + costo_otros_perdidos,
+            "costo_alimento_mortalidad_total": costo_alimento_desperdiciado,
+            "costo_pollito_mortalidad_total": costo_pollitos_perdidos,
+            "costo_otros_mortalidad_total": costo_otros_perdidos,
+            "costo_alimento_mortalidad_kilo": por_kilo(costo_alimento_desperdiciado),
+            "costo_pollito_mortalidad_kilo": por_kilo(costo_pollitos_perdidos),
+            "costo_otros_mortalidad_kilo": por_kilo(costo_otros_perdidos),
+            "aves_producidas": aves_producidas,
+            "peso_final_ave": peso_final,
+            "consumo_objetivo_ave": fases["consumo_obj"],
+            "dia_sacrificio": n_dias,
+        }
+    return {"kpis": kpis, "valido": valido}
+
+
+def _proyeccion(lotes, curva, fases, balance, costos, kpis):
+    """Reúne las salidas de las etapas en el diccionario que devuelve proyectar_lotes."""
+    return {
+        "lotes": lotes, "valido": kpis["valido"], "kpis": kpis["kpis"], "activo": balance["activo"],
+        "n_dias": balance["n_dias"], "Dia": curva["Dia"], "Peso": curva["Peso"], "Cons_Acum": curva["Cons_Acum"],
+        "Cons_Acum_Ajustado": curva["Cons_Acum_Ajustado"], "Peso_Estimado": curva["Peso_Estimado"],
+        "Fase": fases["Fase"], "Mortalidad_Acumulada": balance["Mortalidad_Acumulada"], "Saldo": balance["Saldo"],
+        "Cons_Diario_Ave_gr": balance["Cons_Diario_Ave_gr"], "Diario": balance["Diario"],
+        "Costo_Kg_Dia": costos["Costo_Kg_Dia"], "Costo_Alimento_Acum_Ave": costos["Costo_Alimento_Acum_Ave"],
+        "Mortalidad_Diaria": balance["Mortalidad_Diaria"],
+    }
+
+
+def proyectar_lotes(lotes, referencia, df_coeffs, df_coeffs_15, precios_alimento=None):
+    """
+    Proyecta todos los lotes a la vez. Devuelve un diccionario de matrices (lotes × días)
+    con la proyección diaria y de vectores (lotes) con los KPIs del presupuesto.
+    Con `precios_alimento` (ver normalizar_precios_alimento) el alimento de cada día se
+    costea al precio vigente en su Fecha en lugar del precio plano por fase.
+    """
+    lotes = preparar_lotes(lotes)
+    columnas = _columnas_de_lotes(lotes)
+    curva = _etapa_curva(columnas, referencia, df_coeffs, df_coeffs_15)
+    fases = _etapa_fases(columnas, curva)
+    balance = _etapa_balance(columnas, curva)
+    costos = _etapa_costos(columnas, curva, fases, balance, precios_alimento)
+    return _proyeccion(lotes, curva, fases, balance, costos, _etapa_kpis(columnas, curva, fases, balance, costos))
+
+
+# --- MEMOIZACIÓN POR ETAPA (UN LOTE) ---
+
+def _valor_de_clave(valor):
+    """Valor hashable y comparable para la clave de una etapa (NaN/None → None)."""
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    return None if valor is None or (isinstance(valor, float) and np.isnan(valor)) or valor is pd.NaT else valor
+
+
+def _solo_lectura(resultado):
+    """Marca como de solo lectura los arreglos de la salida de una etapa (se comparte entre sesiones)."""
+    for valor in resultado.values():
+        if isinstance(valor, np.ndarray):
+            valor.setflags(write=False)
+        elif isinstance(valor, dict):
+            _solo_lectura(valor)
+    return resultado
+
+
+def _huella_precios(precios_alimento):
+    if precios_alimento is None:
+        return None
+    return hash(pd.util.hash_pandas_object(precios_alimento, index=True).to_numpy().tobytes())
+
+
+def _etapas_memoizadas(familia, valores):
+    """Función etapa(nombre, construir) que memoiza en la caché 'etapas' con la clave de GRAFO_ETAPAS."""
+    def etapa(nombre, construir):
+        clave = (familia, nombre, *(valores.get(c) for c in campos_de_etapa(nombre)))
+        return _memoizar("etapas", clave, None, lambda: _solo_lectura(construir()))
+    return etapa
+
+
+def proyectar_lote(parametros, referencia, df_coeffs, df_coeffs_15, precios_alimento=None):
+    """
+    proyectar_lotes para un solo lote (por ejemplo st.session_state), con cada etapa memoizada
+    según GRAFO_ETAPAS: solo se recalculan las etapas que dependen de lo que cambió.
+    """
+    lote = {campo: parametros[campo] if campo in parametros else valor for campo, valor in LOTE_POR_DEFECTO.items()}
+    if pd.notna(lote['fecha_llegada']):  # como preparar_lotes
+        lote['fecha_llegada'] = pd.Timestamp(lote['fecha_llegada']).date()
+    columnas = {campo: np.array([valor], dtype=object) for campo, valor in lote.items()}
+    valores = {campo: _valor_de_clave(valor) for campo, valor in lote.items()}
+    valores["fuentes"] = _firma_fuentes(referencia, df_coeffs, df_coeffs_15,
+                                        valores["raza_seleccionada"], valores["sexo_seleccionado"])
+    valores["precios_alimento"] = _huella_precios(precios_alimento)
+    etapa = _etapas_memoizadas("presupuesto", valores)
+
+    curva = etapa("curva", lambda: _etapa_curva(columnas, referencia, df_coeffs, df_coeffs_15))
+    fases = etapa("fases", lambda: _etapa_fases(columnas, curva))
+    balance = etapa("balance", lambda: _etapa_balance(columnas, curva))
+    costos = etapa("costos", lambda: _etapa_costos(columnas, curva, fases, balance, precios_alimento))
+    kpis = etapa("kpis", lambda: _etapa_kpis(columnas, curva, fases, balance, costos))
+    return _proyeccion(pd.DataFrame([lote]), curva, fases, balance, costos, kpis)
+
+
+def calcular_presupuestos(lotes, referencia, df_coeffs, df_coeffs_15, precios_alimento=None):
+    """
+    Calcula los KPIs de un portafolio de lotes en una sola pasada vectorizada.
+    Los lotes sin datos de referencia o sin kilos producidos quedan con KPIs en NaN.
+    """
+    proyeccion = proyectar_lotes(lotes, referencia, df_coeffs, df_coeffs_15, precios_alimento)
+    df_kpis = pd.DataFrame(proyeccion["kpis"], index=proyeccion["lotes"].index)
+    df_kpis.loc[~proyeccion["valido"], KPIS[:-4]] = np.nan
+    return df_kpis
+
+
+def tabla_de_proyeccion(proyeccion, i=0):
+    """Arma la tabla diaria (DataFrame) del lote i de una proyección, como la muestra la página principal."""
+    lote = proyeccion["lotes"].iloc[i]
+    n_dias = int(proyeccion["n_dias"][i])
+    fila = lambda clave: proyeccion[clave][i, :n_dias]
+    en_kilos = lote['unidades_calculo'] == "Kilos"
+    daily_col, total_col = ("Kilos Diarios", "Kilos Totales") if en_kilos else ("Bultos Diarios", "Bultos Totales")
+    fecha_llegada = lote['fecha_llegada'] if pd.notna(lote['fecha_llegada']) else date.today()
+
+    tabla = pd.DataFrame({
+        'RAZA': lote['raza_seleccionada'], 'SEXO': lote['sexo_seleccionado'],
+        'Dia': fila("Dia").astype(int), 'Peso': fila("Peso"), 'Cons_Acum': fila("Cons_Acum"),
+        'Cons_Acum_Ajustado': fila("Cons_Acum_Ajustado"), 'Peso_Estimado': fila("Peso_Estimado"),
+        'Fase_Alimento': np.array(FASES, dtype=object)[fila("Fase")],
+        'Mortalidad_Acumulada': fila("Mortalidad_Acumulada"), 'Saldo': fila("Saldo"),
+    })
+    tabla['Fecha'] = [fecha_llegada + timedelta(days=int(d) - 1) for d in tabla['Dia']]
+    tabla['Cons_Diario_Ave_gr'] = fila("Cons_Diario_Ave_gr")
+    tabla[daily_col] = fila("Diario")
+    tabla[total_col] = tabla[daily_col].cumsum()
+    if proyeccion["valido"][i]:
+        tabla['Costo_Kg_Dia'] = fila("Costo_Kg_Dia")
+        tabla['Costo_Alimento_Diario_Ave'] = fila("Cons_Diario_Ave_gr") / 1000 * fila("Costo_Kg_Dia")
+        tabla['Costo_Alimento_Acum_Ave'] = fila("Costo_Alimento_Acum_Ave")
+        tabla['Mortalidad_Diaria'] = fila("Mortalidad_Diaria")
+    return tabla
+
+
+def proyeccion_larga(proyeccion):
+    """
+    Proyección diaria de todos los lotes en formato largo: una fila por (lote, día) activo,
+    sin recorrer los lotes uno a uno. Los kilos diarios son siempre kilos de alimento.
+    """
+    lotes = proyeccion["lotes"]
+    activo = proyeccion["activo"]
+    lote = np.nonzero(activo)[0]
+    celda = lambda clave: proyeccion[clave][activo]
+
+    llegada = pd.to_datetime(lotes['fecha_llegada'].where(lotes['fecha_llegada'].notna(), date.today()))
+    dia = celda("Dia").astype(int)
+    return pd.DataFrame({
+        'lote': lotes.index.to_numpy()[lote],
+        'Dia': dia,
+        'Fecha': llegada.to_numpy(dtype='datetime64[D]')[lote] + (dia - 1).astype('timedelta64[D]'),
+        'Fase_Alimento': pd.Categorical.from_codes(celda("Fase"), FASES),
+        'Mortalidad_Acumulada': celda("Mortalidad_Acumulada"),
+        'Saldo': celda("Saldo"),
+        'Cons_Acum_Ajustado': celda("Cons_Acum_Ajustado"),
+        'Peso_Estimado': celda("Peso_Estimado"),
+        'Cons_Diario_Ave_gr': celda("Cons_Diario_Ave_gr"),
+        'Kilos_Diarios': celda("Cons_Diario_Ave_gr") * celda("Saldo") / 1000,
+        'Costo_Kg_Dia': celda("Costo_Kg_Dia"),
+    })
+
+
+def calcular_presupuesto(parametros, referencia, df_coeffs, df_coeffs_15, precios_alimento=None):
+    """
+    Calcula el presupuesto de un solo lote. `parametros` es cualquier mapeo con los
+    campos de CAMPOS_LOTE (por ejemplo st.session_state).
+    Devuelve (kpis, tabla); kpis es None si no se producen kilos y ambos son None
+    si la línea genética no tiene datos de referencia.
+    """
+    proyeccion = proyectar_lote(parametros, referencia, df_coeffs, df_coeffs_15, precios_alimento)
+    if not proyeccion["activo"][0].any():
+        return None, None
+    tabla = tabla_de_proyeccion(proyeccion, 0)
+    if not proyeccion["valido"][0]:
+        return None, tabla
+    kpis = {k: float(v[0]) for k, v in proyeccion["kpis"].items()}
+    kpis["dia_sacrificio"] = int(kpis["dia_sacrificio"])
+    kpis["tabla_proyeccion"] = tabla
+    return kpis, tabla
+
+
+# =============================================================================
+# --- PRECALENTAMIENTO DEL PROCESO ---
+# =============================================================================
+
+def precalentar(directorio=DIR_ARCHIVOS):
+    """
+    Llena las cachés del proceso antes de la primera sesión: lee la tabla genética y los
+    coeficientes (leer_csv_cacheado / referencia_cacheada, las mismas que usan las páginas),
+    arma la matriz de coeficientes y las tablas base e inversas de cada línea con la
+    restricción y productividad por defecto, y corre un presupuesto de ejemplo.
+    Devuelve los milisegundos por paso.
+    """
+    directorio = Path(directorio)
+    tiempos = {}
+    inicio = time.perf_counter()
+
+    def paso(nombre):
+        nonlocal inicio
+        ahora = time.perf_counter()
+        tiempos[nombre] = (ahora - inicio) * 1000
+        inicio = ahora
+
+    referencia = referencia_cacheada(directorio / "ROSS_COBB_HUBBARD_2025.csv")
+    df_coeffs = leer_csv_cacheado(directorio / "Cons_Acum_Peso.csv")
+    df_coeffs_15 = leer_csv_cacheado(directorio / "Cons_Acum_Peso_15.csv")
+    paso("archivos")
+    matriz_coeficientes(df_coeffs, df_coeffs_15)
+    paso("coeficientes")
+    restriccion, productividad = LOTE_POR_DEFECTO["restriccion_programada"], LOTE_POR_DEFECTO["productividad"]
+    for raza, sexo in referencia:
+        tabla_base_cacheada(referencia, df_coeffs, df_coeffs_15, raza, sexo, restriccion, productividad)
+        tabla_inversa_cacheada(referencia, df_coeffs, df_coeffs_15, raza, sexo, restriccion, productividad)
+    paso("tablas")
+    calcular_presupuesto({**LOTE_POR_DEFECTO, "fecha_llegada": date.today()}, referencia, df_coeffs, df_coeffs_15)
+    paso("presupuesto")
+    return tiempos
@@ -4,14 +4,19 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from pathlib import Path
-import matplotlib.pyplot as plt
-from utils import load_data, reconstruir_tabla_base
-from matplotlib.ticker import PercentFormatter
-import matplotlib.colors as mcolors
-from PIL import Image
-from matplotlib.offsetbox import OffsetImage, AnnotationBbox
+from utils import (
+    casilla_graficos_navegador, iniciar_trazas, kpis_resultados_base, load_coeficientes, load_referencia,
+    mostrar_panel_rendimiento, reconstruir_tabla_base, reconstruir_tabla_inversa,
+)
+from graficos import mostrar_grafico
+from motor import (
+    RANGOS_PLAN, optimizar_plan_alimentacion, posicion_para_pesos, precios_por_fase, preparar_ciclo_alimentacion,
+    sensibilidad_peso_objetivo,
+)
+from trazas import etapa, tramo
 
 st.set_page_config(page_title="Simulador de Alimentación", page_icon="🌽", layout="wide")
+iniciar_trazas("Simulador de Alimentación")
 
 st.title("🌽 Simulador de Estrategias de Alimentación")
 
@@ -20,21 +25,25 @@ if 'aves_programadas' not in st.session_state or st.session_state.aves_programad
     st.stop()
 
 # --- Cargar datos ---
+etapa("Carga de datos")
 BASE_DIR = Path(__file__).resolve().parent.parent
-df_referencia = load_data(BASE_DIR / "ARCHIVOS" / "ROSS_COBB_HUBBARD_2025.csv")
-df_coeffs = load_data(BASE_DIR / "ARCHIVOS" / "Cons_Acum_Peso.csv")
-df_coeffs_15 = load_data(BASE_DIR / "ARCHIVOS" / "Cons_Acum_Peso_15.csv")
+referencia = load_referencia(BASE_DIR / "ARCHIVOS" / "ROSS_COBB_HUBBARD_2025.csv")
+df_coeffs, df_coeffs_15 = load_coeficientes()
 
 # --- RECONSTRUIR TABLA BASE (USANDO LA FUNCIÓN DE UTILS) ---
-tabla_base_completa = reconstruir_tabla_base(st.session_state, df_referencia, df_coeffs, df_coeffs_15)
+etapa("Tabla base e inversa")
+tabla_base_completa = reconstruir_tabla_base(st.session_state, referencia, df_coeffs, df_coeffs_15)
 
 if tabla_base_completa is None:
     st.error("No se pudieron generar los datos base para la simulación.")
     st.stop()
 
+tabla_inversa = reconstruir_tabla_inversa(st.session_state, referencia, df_coeffs, df_coeffs_15)
+
 # =============================================================================
 # --- 1. SIMULADOR DE PLAN DE ALIMENTACIÓN ---
 # =============================================================================
+etapa("Plan de alimentación simulado")
 st.header("1. Simulador de Plan de Alimentación")
 st.write("""
 Aquí puedes ajustar las cantidades de las fases de alimento para encontrar la combinación más económica 
@@ -43,20 +52,17 @@ que te permita alcanzar tu peso objetivo. El modelo asume que el rendimiento bio
 
 c1, c2, c3 = st.columns(3)
 with c1:
-    pre_iniciador_sim = st.slider("Gramos Pre-iniciador/ave", 0, 500, st.session_state.pre_iniciador, key="slider_pre")
+    pre_iniciador_sim = st.slider("Gramos Pre-iniciador/ave", *RANGOS_PLAN['Pre-iniciador'], st.session_state.pre_iniciador, key="slider_pre")
 with c2:
-    iniciador_sim = st.slider("Gramos Iniciador/ave", 500, 2000, st.session_state.iniciador, key="slider_ini")
+    iniciador_sim = st.slider("Gramos Iniciador/ave", *RANGOS_PLAN['Iniciador'], st.session_state.iniciador, key="slider_ini")
 with c3:
-    retiro_sim = st.slider("Gramos Retiro/ave", 0, 1000, st.session_state.retiro, key="slider_ret")
+    retiro_sim = st.slider("Gramos Retiro/ave", *RANGOS_PLAN['Retiro'], st.session_state.retiro, key="slider_ret")
 
 try:
     # --- Cálculos para el Plan de Alimentación Simulado ---
-    tabla_sim_alimento = tabla_base_completa.copy()
-    closest_idx = (tabla_sim_alimento['Peso_Estimado'] - st.session_state.peso_objetivo).abs().idxmin()
-    tabla_sim_alimento = tabla_sim_alimento.loc[:closest_idx].copy()
-
-    df_interp = tabla_sim_alimento.drop_duplicates(subset=['Peso_Estimado']).sort_values('Peso_Estimado')
-    consumo_total_objetivo_ave = np.interp(st.session_state.peso_objetivo, df_interp['Peso_Estimado'], df_interp['Cons_Acum_Ajustado'])
+    tabla_sim_alimento, consumo_total_objetivo_ave, kilos_producidos = preparar_ciclo_alimentacion(
+        tabla_base_completa, tabla_inversa, st.session_state,
+    )
     
     limite_pre = pre_iniciador_sim
     limite_ini = pre_iniciador_sim + iniciador_sim
@@ -69,11 +75,6 @@ try:
     choices = ['Pre-iniciador', 'Iniciador', 'Retiro']
     tabla_sim_alimento['Fase_Alimento'] = np.select(conditions, choices, default='Engorde')
 
-    mortalidad_diaria_prom = (st.session_state.aves_programadas * (st.session_state.mortalidad_objetivo / 100)) / len(tabla_sim_alimento)
-    tabla_sim_alimento['Saldo'] = st.session_state.aves_programadas - (tabla_sim_alimento['Dia'] * mortalidad_diaria_prom).apply(np.floor)
-    tabla_sim_alimento['Cons_Diario_Ave_gr'] = tabla_sim_alimento['Cons_Acum_Ajustado'].diff().fillna(tabla_sim_alimento['Cons_Acum_Ajustado'].iloc[0])
-    tabla_sim_alimento['Kilos_Diarios_Lote'] = (tabla_sim_alimento['Cons_Diario_Ave_gr'] * tabla_sim_alimento['Saldo']) / 1000
-    
     costos_kg_map = {
         'Pre-iniciador': st.session_state.val_pre_iniciador, 'Iniciador': st.session_state.val_iniciador,
         'Engorde': st.session_state.val_engorde, 'Retiro': st.session_state.val_retiro
@@ -81,7 +82,6 @@ try:
     consumo_por_fase = tabla_sim_alimento.groupby('Fase_Alimento')['Kilos_Diarios_Lote'].sum()
     costo_total_alimento_sim = sum(consumo_por_fase.get(f, 0) * costos_kg_map.get(f, 0) for f in consumo_por_fase.index)
 
-    kilos_producidos = (tabla_sim_alimento['Saldo'].iloc[-1] * tabla_sim_alimento['Peso_Estimado'].iloc[-1]) / 1000
     costo_alimento_kilo_sim = costo_total_alimento_sim / kilos_producidos if kilos_producidos > 0 else 0
     
     st.markdown("##### Resultados del Plan Simulado")
@@ -89,12 +89,47 @@ try:
     res1.metric("Costo Total del Alimento", f"${costo_total_alimento_sim:,.0f}")
     res2.metric("Costo del Alimento por Kilo Producido", f"${costo_alimento_kilo_sim:,.2f}")
 
+    # --- Búsqueda automática del plan de mínimo costo ---
+    etapa("Búsqueda del plan de mínimo costo")
+    with st.expander("🔎 Buscar el plan de alimentación de mínimo costo"):
+        st.caption("Evalúa todas las combinaciones de los deslizadores (cada 10 gramos) y devuelve la más económica que alcanza el peso objetivo. Opcionalmente puedes fijar mínimos y máximos nutricionales por fase (gr/ave).")
+        rangos = {**RANGOS_PLAN, 'Engorde': (0, int(np.ceil(consumo_total_objetivo_ave)))}
+        limites = {}
+        for columna, (fase, (minimo, maximo)) in zip(st.columns(len(rangos)), rangos.items()):
+            with columna:
+                limites[fase] = (
+                    st.number_input(f"Mín. {fase}", minimo, maximo, minimo, 10, key=f"plan_min_{fase}"),
+                    st.number_input(f"Máx. {fase}", minimo, maximo, maximo, 10, key=f"plan_max_{fase}"),
+                )
+
+        if st.button("Buscar plan óptimo", key="buscar_plan"):
+            plan = optimizar_plan_alimentacion(
+                tabla_sim_alimento['Cons_Acum_Ajustado'], tabla_sim_alimento['Kilos_Diarios_Lote'],
+                consumo_total_objetivo_ave, precios_por_fase(st.session_state), limites=limites,
+                plan_actual=(pre_iniciador_sim, iniciador_sim, retiro_sim),
+            )
+            if plan is None:
+                st.warning("Ningún plan cumple las restricciones indicadas.")
+            else:
+                costo_plan_kilo = plan['costo_total_alimento'] / kilos_producidos if kilos_producidos > 0 else 0
+                p1, p2, p3, p4 = st.columns(4)
+                p1.metric("Pre-iniciador", f"{plan['pre_iniciador']:,.0f} gr")
+                p2.metric("Iniciador", f"{plan['iniciador']:,.0f} gr")
+                p3.metric("Retiro", f"{plan['retiro']:,.0f} gr")
+                p4.metric("Engorde", f"{plan['engorde']:,.0f} gr")
+                o1, o2 = st.columns(2)
+                o1.metric("Costo Total del Alimento", f"${plan['costo_total_alimento']:,.0f}",
+                          delta=f"{plan['costo_total_alimento'] - costo_total_alimento_sim:+,.0f}", delta_color="inverse")
+                o2.metric("Costo del Alimento por Kilo Producido", f"${costo_plan_kilo:,.2f}")
+                st.caption(f"{plan['planes_factibles']:,} planes factibles evaluados de {plan['planes_evaluados']:,}.")
+
 except Exception as e:
     st.error(f"Error en el simulador de alimentación: {e}")
 
 # =============================================================================
 # --- 2. ANÁLISIS DE SENSIBILIDAD AL PESO OBJETIVO ---
 # =============================================================================
+etapa("Sensibilidad al peso objetivo")
 st.markdown("---")
 st.header("2. Análisis de Sensibilidad al Peso Objetivo")
 st.write("""
@@ -107,97 +142,45 @@ try:
     paso = 100
     pesos_a_evaluar = [peso_base + i * paso for i in range(-3, 4)]
 
-    costos_kg_map = {
-        'Pre-iniciador': st.session_state.val_pre_iniciador, 'Iniciador': st.session_state.val_iniciador,
-        'Engorde': st.session_state.val_engorde, 'Retiro': st.session_state.val_retiro
+    # Una sola pasada para los 7 pesos de la tabla y la malla fina (cada 10 g) de todo el rango alcanzable.
+    peso_min_malla = np.ceil(tabla_base_completa['Peso_Estimado'].min() / 10) * 10
+    peso_max_malla = np.floor(tabla_base_completa['Peso_Estimado'].max() / 10) * 10
+    malla_pesos = np.arange(max(peso_min_malla, 10), peso_max_malla + 1, 10)
+    sensibilidad = sensibilidad_peso_objetivo(
+        tabla_base_completa, tabla_inversa, np.unique(np.concatenate([pesos_a_evaluar, malla_pesos])), st.session_state,
+    )
+    columnas_sensibilidad = {
+        "peso_objetivo": "Peso Objetivo (gr)", "dias_ciclo": "Días de Ciclo",
+        "conversion_alimenticia": "Conversión Alimenticia", "costo_alimento_kilo": "Costo Alimento / Kilo ($)",
+        "costo_pollito_kilo": "Costo Pollito / Kilo ($)", "costo_otros_kilo": "Otros Costos / Kilo ($)",
+        "costo_total_por_kilo": "Costo Total / Kilo ($)",
     }
 
-    tabla_base_limpia = tabla_base_completa.dropna(subset=['Peso_Estimado']).copy()
-    max_peso_posible = tabla_base_limpia['Peso_Estimado'].max()
-
+    base_results = kpis_resultados_base()
     for peso_obj_sens in pesos_a_evaluar:
-        if peso_obj_sens == peso_base and 'resultados_base' in st.session_state:
-            base_results = st.session_state['resultados_base']
-            tabla_sens_base = tabla_base_limpia.loc[:(tabla_base_limpia['Peso_Estimado'] - peso_base).abs().idxmin()]
-            
+        fila = sensibilidad[sensibilidad['peso_objetivo'] == peso_obj_sens]
+        if peso_obj_sens == peso_base and base_results is not None:
             resultados_sensibilidad.append({
                 "Peso Objetivo (gr)": int(peso_base),
-                "Días de Ciclo": int(tabla_sens_base['Dia'].iloc[-1]),
+                "Días de Ciclo": int(tabla_base_completa['Dia'].iloc[posicion_para_pesos(tabla_inversa, peso_base)]),
                 "Conversión Alimenticia": base_results["conversion_alimenticia"],
                 "Costo Alimento / Kilo ($)": base_results["costo_alimento_kilo"],
                 "Costo Pollito / Kilo ($)": base_results["costo_pollito_kilo"],
                 "Otros Costos / Kilo ($)": base_results["costo_otros_kilo"],
                 "Costo Total / Kilo ($)": base_results["costo_total_por_kilo"]
             })
-            continue
-
-        if peso_obj_sens <= 0: continue
-        
-        tabla_sens = tabla_base_limpia.copy()
-        
-        if peso_obj_sens > max_peso_posible:
-            tabla_truncada = tabla_sens.copy()
-        else:
-            idx = (tabla_sens['Peso_Estimado'] - peso_obj_sens).abs().idxmin()
-            tabla_truncada = tabla_sens.loc[:idx].copy()
-        
-        df_interp_sens = tabla_truncada.drop_duplicates(subset=['Peso_Estimado']).sort_values('Peso_Estimado')
-        consumo_total_sens = np.interp(peso_obj_sens, df_interp_sens['Peso_Estimado'], df_interp_sens['Cons_Acum_Ajustado'])
-        
-        limite_pre_sens = st.session_state.pre_iniciador
-        limite_ini_sens = st.session_state.pre_iniciador + st.session_state.iniciador
-        limite_ret_sens = consumo_total_sens - st.session_state.retiro if st.session_state.retiro > 0 else np.inf
-        
-        conditions_sens = [
-            tabla_truncada['Cons_Acum_Ajustado'] <= limite_pre_sens,
-            tabla_truncada['Cons_Acum_Ajustado'].between(limite_pre_sens, limite_ini_sens, inclusive='right'),
-            tabla_truncada['Cons_Acum_Ajustado'] > limite_ret_sens
-        ]
-        choices_sens = ['Pre-iniciador', 'Iniciador', 'Retiro']
-        tabla_truncada['Fase_Alimento'] = np.select(conditions_sens, choices_sens, default='Engorde')
-
-        dias_ciclo = tabla_truncada['Dia'].iloc[-1]
-        
-        mortalidad_total_aves = st.session_state.aves_programadas * (st.session_state.mortalidad_objetivo / 100)
-        mortalidad_diaria_prom = mortalidad_total_aves / dias_ciclo if dias_ciclo > 0 else 0
-        tabla_truncada['Saldo'] = st.session_state.aves_programadas - (tabla_truncada['Dia'] * mortalidad_diaria_prom).apply(np.floor)
-        
-        tabla_truncada['Cons_Diario_Ave_gr'] = tabla_truncada['Cons_Acum_Ajustado'].diff().fillna(tabla_truncada['Cons_Acum_Ajustado'].iloc[0])
-        tabla_truncada['Kilos_Diarios_Lote'] = (tabla_truncada['Cons_Diario_Ave_gr'] * tabla_truncada['Saldo']) / 1000
-        consumo_total_kg = tabla_truncada['Kilos_Diarios_Lote'].sum()
-        
-        aves_producidas = tabla_truncada['Saldo'].iloc[-1]
-        peso_final_real = tabla_truncada['Peso_Estimado'].iloc[-1]
-        kilos_producidos_sens = (aves_producidas * peso_final_real) / 1000
-        
-        if kilos_producidos_sens > 0:
-            consumo_por_fase_sens = tabla_truncada.groupby('Fase_Alimento')['Kilos_Diarios_Lote'].sum()
-            costo_total_alimento_sens = sum(consumo_por_fase_sens.get(f, 0) * costos_kg_map.get(f, 0) for f in consumo_por_fase_sens.index)
-            
-            costo_total_pollitos_sens = st.session_state.aves_programadas * st.session_state.costo_pollito
-            costo_total_otros_sens = st.session_state.aves_programadas * st.session_state.otros_costos_ave
-            costo_total_lote_sens = costo_total_alimento_sens + costo_total_pollitos_sens + costo_total_otros_sens
-
-            costo_alimento_kilo = costo_total_alimento_sens / kilos_producidos_sens
-            costo_pollito_kilo = costo_total_pollitos_sens / kilos_producidos_sens
-            costo_otros_kilo = costo_total_otros_sens / kilos_producidos_sens
-            costo_total_kilo = costo_total_lote_sens / kilos_producidos_sens
-            conversion = consumo_total_kg / kilos_producidos_sens
-            
-            resultados_sensibilidad.append({
-                "Peso Objetivo (gr)": int(peso_obj_sens),
-                "Días de Ciclo": int(dias_ciclo),
-                "Conversión Alimenticia": conversion,
-                "Costo Alimento / Kilo ($)": costo_alimento_kilo,
-                "Costo Pollito / Kilo ($)": costo_pollito_kilo,
-                "Otros Costos / Kilo ($)": costo_otros_kilo,
-                "Costo Total / Kilo ($)": costo_total_kilo
-            })
+        elif not fila.empty:
+            registro = fila.rename(columns=columnas_sensibilidad)[list(columnas_sensibilidad.values())].iloc[0].to_dict()
+            registro["Peso Objetivo (gr)"] = int(peso_obj_sens)
+            registro["Días de Ciclo"] = int(registro["Días de Ciclo"])
+            resultados_sensibilidad.append(registro)
 
     if resultados_sensibilidad:
         df_sensibilidad = pd.DataFrame(resultados_sensibilidad).sort_values(by="Peso Objetivo (gr)").reset_index(drop=True)
         columnas_finales = ["Peso Objetivo (gr)", "Días de Ciclo", "Conversión Alimenticia", "Costo Alimento / Kilo ($)", "Costo Pollito / Kilo ($)", "Otros Costos / Kilo ($)", "Costo Total / Kilo ($)"]
         
+        etapa("Tabla de sensibilidad (Styler)")
+
         def highlight_base(row):
             is_base = row["Peso Objetivo (gr)"] == peso_base
             return ['background-color: #D6EAF8' if is_base else '' for _ in row]
@@ -233,6 +216,24 @@ try:
             .set_properties(**{'text-align': 'center'})
         )
 
+        # --- Curva completa del costo por kilo y su mínimo exacto ---
+        malla = sensibilidad[sensibilidad['peso_objetivo'].isin(malla_pesos)]
+        if not malla.empty:
+            etapa("Curva de costo por peso (gráfico)")
+            st.subheader("Costo Total por Kilo en Todo el Rango de Pesos")
+            optimo = malla.loc[malla['costo_total_por_kilo'].idxmin()]
+            m1, m2, m3 = st.columns(3)
+            m1.metric("Peso de Mínimo Costo", f"{optimo['peso_objetivo']:,.0f} gr")
+            m2.metric("Días de Ciclo", f"{optimo['dias_ciclo']:,.0f}")
+            m3.metric("Costo Total / Kilo Mínimo", f"${optimo['costo_total_por_kilo']:,.2f}")
+
+            with tramo("Gráfico de la curva"):
+                mostrar_grafico(
+                    "costo_por_peso", pesos=malla['peso_objetivo'].to_numpy(), costos=malla['costo_total_por_kilo'].to_numpy(),
+                    peso_optimo=optimo['peso_objetivo'], costo_optimo=optimo['costo_total_por_kilo'], peso_base=peso_base,
+                )
+
+        etapa("Estructura de costos (gráfico)")
         st.subheader("Visualización de la Estructura de Costos por Peso Objetivo")
 
         df_chart = df_sensibilidad.set_index("Peso Objetivo (gr)")
@@ -252,42 +253,14 @@ try:
             "Otros Costos / Kilo (%)"
         ]
 
-        fig, ax = plt.subplots()
-
-        # Usar una paleta de verdes
-        colores_verdes = ['#2E7D32', '#66BB6A', '#A5D6A7']
-        df_percentage.plot(kind='bar', stacked=True, ax=ax, color=colores_verdes)
-
-        # Formatear el eje Y como porcentaje
-        ax.yaxis.set_major_formatter(PercentFormatter(100))
-        ax.set_ylim(0, 100)
-
-        ax.set_ylabel("Participación Porcentual en el Costo por Kilo")
-        ax.set_xlabel("Peso Objetivo (gramos)")
-        ax.legend(title="Componente de Costo")
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-
-        # Color de texto dinámico (blanco/negro)
-        for i, container in enumerate(ax.containers):
-            bg_color = colores_verdes[i]
-            rgb = mcolors.to_rgb(bg_color)
-            luminancia = 0.299 * rgb[0] + 0.587 * rgb[1] + 0.114 * rgb[2]
-            color_texto = 'white' if luminancia < 0.5 else 'black'
-            
-            labels = [f"{v:.1f}%" if v > 4 else '' for v in container.datavalues]
-            ax.bar_label(container, labels=labels, label_type='center', color=color_texto, weight='bold', fontsize=8)
-
-        # Añadir la marca de agua
-        try:
-            logo_img_f = Image.open(BASE_DIR / "ARCHIVOS" / "log_PEQ.png")
-            imagebox = OffsetImage(logo_img_f, zoom=0.3, alpha=0.1)
-            ab = AnnotationBbox(imagebox, (0.5, 0.5), xycoords='axes fraction', frameon=False, box_alignment=(0.5, 0.5), zorder=-1)
-            ax.add_artist(ab)
-        except Exception:
-            pass
-
-        st.pyplot(fig)
+        with tramo("Gráfico de estructura"):
+            mostrar_grafico(
+                "estructura_costos", pesos=df_percentage.index.to_numpy(), porcentajes=df_percentage.to_numpy(),
+                componentes=list(df_percentage.columns),
+            )
 
 except Exception as e:
     st.error(f"Error en el análisis de sensibilidad: {e}")
+
+casilla_graficos_navegador()
+mostrar_panel_rendimiento()
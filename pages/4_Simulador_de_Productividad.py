@@ -3,11 +3,19 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from pathlib import Path
-from utils import load_data, reconstruir_tabla_base
+from utils import (
+    casilla_graficos_navegador, iniciar_trazas, kpis_resultados_base, load_coeficientes, load_precios_alimento,
+    load_referencia, mostrar_panel_rendimiento,
+)
+from graficos import mostrar_grafico
+from motor import ARCHIVO_PRECIOS, kpis_por_productividad, superficie_productividad_precio
+from trazas import etapa, tramo
 
 st.set_page_config(page_title="Simulador de Productividad", page_icon="⚙️", layout="wide")
+iniciar_trazas("Simulador de Productividad")
+
+BASE_DIR = Path(__file__).resolve().parent.parent
 
 st.title("⚙️ Simulador de Eficiencia Productiva")
 
@@ -29,30 +37,28 @@ Desde la perspectiva de costos, esta métrica es fundamental. Una productividad
     """
 )
 
-if 'resultados_base' not in st.session_state:
+resultados_base = kpis_resultados_base()
+if resultados_base is None:
     st.warning("👈 Por favor, ejecuta un cálculo en la página '1_Presupuesto_Principal' primero.")
     st.stop()
 
 try:
-    resultados_base = st.session_state['resultados_base']
     productividad_base_perc = st.session_state.get('productividad', 100.0)
-    
-    costo_total_alimento = resultados_base.get('costo_total_alimento', 0)
-    costo_total_pollitos = resultados_base.get('costo_total_pollitos', 0)
-    costo_total_otros = resultados_base.get('costo_total_otros', 0)
-    costo_total_lote = costo_total_alimento + costo_total_pollitos + costo_total_otros
-
-    consumo_total_kg = resultados_base.get('consumo_total_kg', 0)
-    
-    kilos_base_ajustados = resultados_base.get('kilos_totales_producidos', 0)
     if productividad_base_perc == 0:
         st.error("La productividad base no puede ser cero.")
         st.stop()
-    kilos_potenciales_100 = kilos_base_ajustados / (productividad_base_perc / 100.0)
+
+    # Cada productividad se proyecta de nuevo con el motor: cambia el peso estimado, el día de
+    # sacrificio y el alimento consumido, no solo los kilos finales.
+    etapa("Carga de datos")
+    referencia = load_referencia(BASE_DIR / "ARCHIVOS" / "ROSS_COBB_HUBBARD_2025.csv")
+    df_coeffs, df_coeffs_15 = load_coeficientes()
+    precios_alimento = load_precios_alimento(ARCHIVO_PRECIOS)
 
     # =============================================================================
     # --- 1. Simulador Interactivo de Productividad ---
     # =============================================================================
+    etapa("Simulador interactivo")
     st.header("1. Simulador Interactivo de Productividad")
     st.write("Ajusta el slider para simular cómo una variación en la productividad general afecta tus costos.")
 
@@ -61,14 +67,14 @@ try:
         min_value=70.0, max_value=110.0, value=productividad_base_perc, step=0.5, format="%.1f%%"
     )
 
-    kilos_producidos_sim = kilos_potenciales_100 * (productividad_sim_perc / 100.0)
+    niveles_productividad = sorted(list(set([100.0, 97.5, 95.0, 90.0, 85.0, 80.0, 75.0, productividad_base_perc])), reverse=True)
+    df_kpis = kpis_por_productividad(
+        st.session_state, referencia, df_coeffs, df_coeffs_15, [productividad_sim_perc, *niveles_productividad],
+        precios_alimento,
+    ).fillna(0)
 
-    if kilos_producidos_sim > 0:
-        costo_total_kilo_sim = costo_total_lote / kilos_producidos_sim
-        conversion_sim = consumo_total_kg / kilos_producidos_sim
-    else:
-        costo_total_kilo_sim = 0
-        conversion_sim = 0
+    costo_total_kilo_sim = df_kpis['costo_total_por_kilo'].iloc[0]
+    conversion_sim = df_kpis['conversion_alimenticia'].iloc[0]
 
     st.markdown("##### Resultados de la Simulación")
     kpi_cols = st.columns(2)
@@ -88,6 +94,7 @@ try:
     # =============================================================================
     # --- 2. Análisis de Sensibilidad por Productividad ---
     # =============================================================================
+    etapa("Sensibilidad por productividad (Styler)")
     st.markdown("---")
     st.header("2. Análisis de Sensibilidad por Productividad")
     st.write(f"""
@@ -95,32 +102,15 @@ try:
     productividad definida en la página principal ({productividad_base_perc}%).
     """)
 
-    resultados_sensibilidad = []
-    niveles_productividad = sorted(list(set([100.0, 97.5, 95.0, 90.0, 85.0, 80.0, 75.0, productividad_base_perc])), reverse=True)
-
-    for prod_perc in niveles_productividad:
-        kilos_sim = kilos_potenciales_100 * (prod_perc / 100.0)
-        
-        if kilos_sim > 0:
-            costo_kilo = costo_total_lote / kilos_sim
-            conversion = consumo_total_kg / kilos_sim
-            costo_alimento_kilo = costo_total_alimento / kilos_sim
-            costo_pollito_kilo = costo_total_pollitos / kilos_sim
-            costo_otros_kilo = costo_total_otros / kilos_sim
-        else:
-            costo_kilo = conversion = costo_alimento_kilo = costo_pollito_kilo = costo_otros_kilo = 0
-
-        resultados_sensibilidad.append({
-            "Productividad (%)": prod_perc,
-            "Kilos Producidos": kilos_sim,
-            "Conversión": conversion,
-            "Costo Alimento/Kilo": costo_alimento_kilo,
-            "Costo Pollito/Kilo": costo_pollito_kilo,
-            "Costo Otros/Kilo": costo_otros_kilo,
-            "Costo Total/Kilo": costo_kilo
-        })
-
-    df_sensibilidad = pd.DataFrame(resultados_sensibilidad)
+    df_sensibilidad = pd.DataFrame({
+        "Productividad (%)": niveles_productividad,
+        "Kilos Producidos": df_kpis['kilos_totales_producidos'].iloc[1:].to_numpy(),
+        "Conversión": df_kpis['conversion_alimenticia'].iloc[1:].to_numpy(),
+        "Costo Alimento/Kilo": df_kpis['costo_alimento_kilo'].iloc[1:].to_numpy(),
+        "Costo Pollito/Kilo": df_kpis['costo_pollito_kilo'].iloc[1:].to_numpy(),
+        "Costo Otros/Kilo": df_kpis['costo_otros_kilo'].iloc[1:].to_numpy(),
+        "Costo Total/Kilo": df_kpis['costo_total_por_kilo'].iloc[1:].to_numpy(),
+    })
 
     def highlight_base(row):
         is_base = row["Productividad (%)"] == productividad_base_perc
@@ -142,44 +132,44 @@ try:
     # =============================================================================
     # --- 3. Visualización del Impacto de la Productividad en los Costos ---
     # =============================================================================
+    etapa("Impacto en el costo (gráfico)")
     st.markdown("---")
     st.header("3. Impacto de la Productividad en el Costo por Kilo")
     st.write("""
     Este gráfico muestra cómo el costo total por kilo y sus componentes aumentan a medida que disminuye la eficiencia productiva del lote.
     """)
 
-    df_chart = df_sensibilidad.set_index("Productividad (%)")
-    
-    # Seleccionamos las columnas de costos por kilo
-    df_cost_lines = df_chart[[
-        "Costo Alimento/Kilo", 
-        "Costo Pollito/Kilo", 
-        "Costo Otros/Kilo",
-        "Costo Total/Kilo"
-    ]]
-    
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
-    # Graficar las líneas con un marcador en cada punto
-    df_cost_lines.plot(kind='line', ax=ax, marker='o')
-    
-    # Formatear el eje Y como moneda
-    from matplotlib.ticker import StrMethodFormatter
-    ax.yaxis.set_major_formatter(StrMethodFormatter('${x:,.0f}'))
-    
-    # Mejorar la visualización
-    ax.set_ylabel("Costo por Kilo ($)")
-    ax.set_xlabel("Productividad (%)")
-    ax.set_title("Sensibilidad del Costo por Kilo a la Productividad")
-    ax.legend(title="Componente de Costo")
-    ax.grid(True, linestyle='--', alpha=0.6)
-    
-    # Invertir el eje X para que la "caída" de productividad se lea de izquierda a derecha
-    ax.invert_xaxis()
-    
-    plt.tight_layout()
-    st.pyplot(fig)
+    columnas_costo = ["Costo Alimento/Kilo", "Costo Pollito/Kilo", "Costo Otros/Kilo", "Costo Total/Kilo"]
+    with tramo("Gráfico de impacto"):
+        mostrar_grafico(
+            "impacto_productividad", productividad=df_sensibilidad["Productividad (%)"].to_numpy(),
+            series={columna: df_sensibilidad[columna].to_numpy() for columna in columnas_costo},
+        )
+
+    # =============================================================================
+    # --- 4. Superficie Productividad × Precio del Alimento ---
+    # =============================================================================
+    etapa("Superficie productividad × precio")
+    st.markdown("---")
+    st.header("4. Superficie de Costo: Productividad × Precio del Alimento")
+    st.write("""
+    Costo total por kilo para cada combinación de productividad (70% a 110%, cada 0.1%) y variación del precio
+    del alimento. Las líneas blancas unen las combinaciones con el mismo costo por kilo (iso-costo).
+    """)
+
+    variacion_precio = st.slider("Variación máxima del precio del alimento (±%)", 5, 50, 20, 5)
+    superficie = superficie_productividad_precio(
+        st.session_state, referencia, df_coeffs, df_coeffs_15,
+        multiplicadores=np.linspace(1 - variacion_precio / 100, 1 + variacion_precio / 100, 81),
+        precios_alimento=precios_alimento,
+    )
+
+    with tramo("Gráfico de superficie"):
+        mostrar_grafico("superficie", superficie=superficie, productividad_base=productividad_base_perc)
 
 except Exception as e:
     st.error(f"Ocurrió un error al procesar la simulación: {e}")
     st.exception(e)
+
+casilla_graficos_navegador()
+mostrar_panel_rendimiento()
@@ -2,16 +2,19 @@
 
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-from pathlib import Path
-from PIL import Image
+from utils import (
+    ARCHIVO_GUIA_PDF, ARCHIVO_LOGO, archivo_mapeado, casilla_graficos_navegador, imagen_png, iniciar_trazas,
+    mostrar_panel_rendimiento,
+)
+from graficos import mostrar_grafico
+from trazas import etapa, tramo
 
 st.set_page_config(page_title="Guía de Costeo", page_icon="📖", layout="wide")
+iniciar_trazas("Guía de Costeo")
 
 # --- LOGO EN SIDEBAR ---
-BASE_DIR = Path(__file__).resolve().parent.parent 
 try:
-    logo = Image.open(BASE_DIR / "ARCHIVOS" / "log_PEQ.png")
+    logo = imagen_png(ARCHIVO_LOGO, 150)
     st.sidebar.image(logo, width=150)
 except Exception:
     st.sidebar.warning("Logo no encontrado.")
@@ -27,18 +30,15 @@ st.subheader("Análisis de Costos y Métricas de Rendimiento: De la Granja al Sa
 st.markdown("---")
 
 
+etapa("Guía en PDF")
 try:
-    # Construir la ruta completa al archivo PDF
-    pdf_path = BASE_DIR / "ARCHIVOS" / "Costeo_Pollo_Engorde_ Granja_a_Sacrificio.pdf"
-    
-    # Leer el archivo en modo binario ('rb')
-    with open(pdf_path, "rb") as pdf_file:
-        pdf_bytes = pdf_file.read()
+    # El PDF queda mapeado en memoria una vez por proceso; el botón lo lee solo al hacer clic.
+    pdf_mapeado = archivo_mapeado(ARCHIVO_GUIA_PDF)
 
     # Crear el botón de descarga en el área principal
     st.download_button(
         label="📥 Descargar Guía Completa en PDF",
-        data=pdf_bytes,
+        data=lambda: pdf_mapeado[:],
         file_name="Guia_Costeo_Pollo_Engorde.pdf", # Nombre que tendrá el archivo al descargar
         mime='application/pdf'
     )
@@ -47,6 +47,7 @@ except FileNotFoundError:
 
 st.markdown("---")
 # --- 1. ESTRUCTURA DE COSTOS ---
+etapa("Estructura de costos (gráfico)")
 st.header("1. Estructura de Costos de Producción")
 col1, col2 = st.columns([1.5, 1])
 
@@ -71,12 +72,11 @@ with col2:
     sizes = [70, 18, 5, 3, 4]
     colors = ['#00A6FB', '#F5B700', '#00B295', '#F15946', '#5C3C92'] # Azul, Amarillo, Verde, Rojo, Púrpura
 
-    fig, ax = plt.subplots()
-    ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90, colors=colors, wedgeprops=dict(width=0.4))
-    ax.axis('equal')
-    st.pyplot(fig)
+    with tramo("Gráfico de estructura"):
+        mostrar_grafico("participacion", tamanos=sizes, etiquetas=labels, colores=colors, anillo=True)
 
 # --- 2. DESGLOSE DETALLADO ---
+etapa("Contenido de la guía")
 st.markdown("---")
 st.header("2. Desglose Detallado de Costos de Producción")
 st.write("""
@@ -156,3 +156,6 @@ with adv2:
     - **Valor Positivo:** El lote superó las expectativas.
     - **Valor Negativo:** Señal de alerta que indica problemas de manejo, infraestructura, sanidad o calidad de alimento.
     """)
+
+casilla_graficos_navegador()
+mostrar_panel_rendimiento()
@@ -0,0 +1,116 @@
+# Página de ajuste de los coeficientes de peso con registros históricos propios
+
+import streamlit as st
+import pandas as pd
+from utils import (
+    ARCHIVO_LOGO, ajustar_registros, imagen_png, iniciar_trazas, leer_registros, mostrar_panel_rendimiento,
+)
+from ajuste_curvas import COLUMNAS_REGISTROS, DIA_FIN_AJUSTE_15, guardar_ajuste, versiones_de_ajuste
+from motor import COLUMNAS_COEFICIENTES
+from trazas import etapa
+
+st.set_page_config(page_title="Ajuste de Curvas", page_icon="📐", layout="wide")
+iniciar_trazas("Ajuste de Curvas")
+
+# --- LOGO EN SIDEBAR ---
+try:
+    logo = imagen_png(ARCHIVO_LOGO, 150)
+    st.sidebar.image(logo, width=150)
+except Exception:
+    st.sidebar.warning("Logo no encontrado.")
+st.sidebar.markdown("---")
+
+st.title("📐 Ajuste de Curvas de Crecimiento")
+st.markdown(f"""
+El peso estimado de la app sale de un polinomio de grado 4 del consumo acumulado por línea y sexo, con un
+modelo para los primeros días (ajustado con los días 1-{DIA_FIN_AJUSTE_15}) y otro general (todos los días).
+Aquí puedes ajustar esos coeficientes con los **registros históricos de tu granja** y usarlos en todas las páginas.
+""")
+
+# =============================================================================
+# --- 1. REGISTROS Y AJUSTE ---
+# =============================================================================
+etapa("Carga de registros")
+archivo = st.file_uploader(
+    f"Registros históricos (CSV con columnas {', '.join(COLUMNAS_REGISTROS)}; una fila por lote y día)", type="csv"
+)
+
+if archivo is None:
+    st.info("👆 Sube un CSV de registros para ajustar nuevos coeficientes, o elige abajo una versión ya guardada.")
+else:
+    try:
+        registros = leer_registros(archivo.getvalue())
+    except ValueError as e:
+        st.error(f"No se pudieron leer los registros: {e}")
+        st.stop()
+
+    st.subheader("Filtros")
+    col1, col2 = st.columns(2)
+    lineas = sorted(set(zip(registros['RAZA'], registros['SEXO'])))
+    with col1:
+        elegidas = st.multiselect("Líneas a ajustar", lineas, default=lineas, format_func=lambda l: f"{l[0]} - {l[1]}")
+    with col2:
+        dia_max = int(registros['Dia'].max()) if len(registros) else 1
+        dias = st.slider("Días incluidos", 1, max(dia_max, 2), (1, dia_max))
+
+    linea_fila = pd.Series(list(zip(registros['RAZA'], registros['SEXO'])), index=registros.index)
+    filtrados = registros[linea_fila.isin(elegidas) & registros['Dia'].between(*dias)]
+    st.caption(f"{len(filtrados):,} de {len(registros):,} registros válidos después de los filtros.")
+
+    if filtrados.empty:
+        st.info("Ningún registro cumple los filtros: elige al menos una línea y un rango de días con registros.")
+    else:
+        etapa("Ajuste por mínimos cuadrados")
+        ajuste = ajustar_registros(filtrados)
+        calidad = ajuste["calidad"]
+
+        st.subheader("Calidad del ajuste")
+        st.dataframe(
+            calidad.style.format({'RMSE_g': "{:,.1f}", 'R2': "{:.5f}", 'Registros': "{:,.0f}"}, na_rep="—"),
+            hide_index=True, use_container_width=True,
+        )
+        if not calidad['Ajustado'].all():
+            st.warning("Las líneas/tramos con menos de 5 consumos distintos no se ajustan y conservan los coeficientes entregados.")
+
+        col1, col2 = st.columns(2)
+        formato = {c: "{:.6g}" for c in COLUMNAS_COEFICIENTES}
+        with col1:
+            st.markdown(f"**Coeficientes días 1-{DIA_FIN_AJUSTE_15}** (rigen hasta el día {DIA_FIN_AJUSTE_15 - 1})")
+            st.dataframe(ajuste["df_coeffs_15"].style.format(formato), hide_index=True, use_container_width=True)
+        with col2:
+            st.markdown(f"**Coeficientes generales** (rigen desde el día {DIA_FIN_AJUSTE_15})")
+            st.dataframe(ajuste["df_coeffs"].style.format(formato), hide_index=True, use_container_width=True)
+
+        descripcion = st.text_input("Descripción de la versión (opcional)", placeholder="Ej.: Granja norte, lotes 2024")
+        if st.button("💾 Guardar versión y usarla en la app", disabled=ajuste["df_coeffs"].empty and ajuste["df_coeffs_15"].empty):
+            try:
+                st.session_state["version_coeficientes"] = guardar_ajuste(ajuste, descripcion)
+                st.success(f"Versión {st.session_state['version_coeficientes']} guardada. Vuelve a generar el presupuesto en la página principal para aplicarla.")
+            except OSError as e:
+                st.error(f"No se pudo guardar la versión: {e}")
+
+# =============================================================================
+# --- 2. VERSIONES GUARDADAS ---
+# =============================================================================
+etapa("Versiones guardadas")
+st.markdown("---")
+st.header("Coeficientes en uso")
+versiones = {m["version"]: m for m in versiones_de_ajuste()}
+opciones = [None, *versiones]
+actual = st.session_state.get("version_coeficientes")
+
+def etiqueta(version):
+    if version is None:
+        return "Coeficientes entregados (ARCHIVOS/)"
+    m = versiones[version]
+    return f"{version} · {m['fecha'].replace('T', ' ')} · {m['registros']:,} registros" + (f" · {m['descripcion']}" if m['descripcion'] else "")
+
+elegida = st.selectbox("Versión que usan todas las páginas", opciones, index=opciones.index(actual) if actual in opciones else 0,
+                       format_func=etiqueta)
+if elegida != actual:
+    st.session_state["version_coeficientes"] = elegida
+    st.info("Vuelve a generar el presupuesto en la página principal para aplicar el cambio.")
+if elegida is not None:
+    st.caption("Líneas ajustadas: " + ", ".join(versiones[elegida]["lineas_ajustadas"]))
+
+mostrar_panel_rendimiento()
@@ -0,0 +1,73 @@
+"""
+Programador de encasetamientos: proyecta un plan anual de lotes (granja, galpón, fecha,
+aves, línea y sexo) con el motor de presupuesto y agrega la demanda diaria de alimento por
+fecha y fase, en kilos y en bultos de 40 Kg, para planear la planta, los camiones y los silos.
+No depende de Streamlit.
+"""
+
+import numpy as np
+import pandas as pd
+
+from motor import FASES, preparar_lotes, proyeccion_larga, proyectar_lotes
+
+KILOS_POR_BULTO = 40
+
+# Nombres cortos aceptados en el plan, equivalentes a los campos del panel lateral.
+ALIAS_PLAN = {
+    "fecha": "fecha_llegada", "aves": "aves_programadas",
+    "raza": "raza_seleccionada", "sexo": "sexo_seleccionado",
+}
+
+
+def preparar_plan(plan):
+    """Normaliza el plan: aplica ALIAS_PLAN, exige granja/galpón y completa los demás campos del lote."""
+    plan = pd.DataFrame(plan).rename(columns=ALIAS_PLAN)
+    for columna in ("granja", "galpon"):
+        if columna not in plan.columns:
+            plan[columna] = ""
+    return preparar_lotes(plan).reset_index(drop=True)
+
+
+def celdas_de_demanda(plan, referencia, df_coeffs, df_coeffs_15, precios_alimento=None):
+    """
+    Proyecta todos los lotes del plan en una sola pasada y devuelve una fila por (lote, día)
+    activo con granja, galpón, Fecha, fase, aves y kilos de alimento del lote ese día.
+    """
+    plan = preparar_plan(plan)
+    celdas = proyeccion_larga(proyectar_lotes(plan, referencia, df_coeffs, df_coeffs_15, precios_alimento))
+    return pd.DataFrame({
+        "lote": celdas["lote"],
+        "granja": plan["granja"].to_numpy()[celdas["lote"]],
+        "galpon": plan["galpon"].to_numpy()[celdas["lote"]],
+        "Fecha": celdas["Fecha"],
+        "Dia": celdas["Dia"],
+        "Fase_Alimento": celdas["Fase_Alimento"],
+        "Aves": celdas["Saldo"],
+        "Kilos": celdas["Kilos_Diarios"],
+        "Costo_Alimento": celdas["Kilos_Diarios"] * celdas["Costo_Kg_Dia"],
+    })
+
+
+def demanda_diaria(plan, referencia, df_coeffs, df_coeffs_15, por=(), precios_alimento=None):
+    """
+    Demanda de alimento agregada por fecha y fase (y por las columnas de `por`, por ejemplo
+    ("granja",) para rutas de camiones). Devuelve Kilos, Bultos (de 40 Kg, redondeados hacia
+    arriba sobre el total del grupo), aves alimentadas, lotes activos y costo del alimento.
+    """
+    celdas = celdas_de_demanda(plan, referencia, df_coeffs, df_coeffs_15, precios_alimento)
+    claves = [*por, "Fecha", "Fase_Alimento"]
+    demanda = celdas.groupby(claves, observed=True, sort=True).agg(
+        Kilos=("Kilos", "sum"), Aves=("Aves", "sum"), Lotes=("lote", "nunique"),
+        Costo_Alimento=("Costo_Alimento", "sum"),
+    ).reset_index()
+    demanda.insert(demanda.columns.get_loc("Kilos") + 1, "Bultos", np.ceil(demanda["Kilos"] / KILOS_POR_BULTO))
+    return demanda
+
+
+def demanda_por_fecha(demanda, valor="Kilos"):
+    """Pasa la demanda a formato ancho: una fila por fecha y una columna por fase (más el total)."""
+    ancho = demanda.pivot_table(index="Fecha", columns="Fase_Alimento", values=valor,
+                                aggfunc="sum", fill_value=0, observed=False)
+    ancho = ancho.reindex(columns=FASES, fill_value=0)
+    ancho["Total"] = ancho.sum(axis=1)
+    return ancho
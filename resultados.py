@@ -0,0 +1,157 @@
+"""
+Resultados compactos por sesión, con cuenta de memoria y desalojo de sesiones inactivas.
+No depende de Streamlit.
+
+Un resultado compacto guarda los KPIs como escalares y la tabla de proyección por columnas:
+float32 para las magnitudes, int32 para los días, un código int8 por fase (índice en FASES) y
+las fechas como datetime64[D]. Ocupa una fracción de la tabla de pandas con columnas object.
+Las páginas leen de aquí los KPIs del presupuesto base (no de st.session_state).
+
+Los resultados viven en un almacén del proceso indexado por (sesión, nombre). Cada acceso
+renueva la sesión; al guardar se desalojan las sesiones inactivas por más de INACTIVIDAD_MAX_S
+y, si el total pasa de MEMORIA_MAX_BYTES, las de acceso más antiguo. Quien pida un resultado
+desalojado recibe None y debe recalcularlo.
+
+    compacto = compactar(kpis, tabla)
+    guardar(sesion, "resultados_base", compacto)
+    obtener(sesion, "resultados_base"), tabla_de(compacto), estadisticas(sesion)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from motor import FASES
+
+MEMORIA_MAX_BYTES = 256 * 2**20
+INACTIVIDAD_MAX_S = 30 * 60
+
+_COLUMNAS_TEXTO_CONSTANTE = ('RAZA', 'SEXO')
+
+# sesión → {"ultimo_acceso": segundos monotónicos, "resultados": {nombre: compacto}, "bytes": n}
+_sesiones = OrderedDict()
+_lock = threading.Lock()
+_contadores = {"guardados": 0, "desalojos_inactividad": 0, "desalojos_memoria": 0}
+
+
+# =============================================================================
+# --- RESULTADO COMPACTO ---
+# =============================================================================
+
+def compactar(kpis, tabla=None):
+    """
+    Resultado compacto a partir de los KPIs de motor.calcular_presupuesto y su tabla diaria
+    (por defecto kpis['tabla_proyeccion']). Las columnas de texto constantes (RAZA, SEXO)
+    quedan como un solo valor.
+    """
+    if tabla is None:
+        tabla = kpis.get('tabla_proyeccion')
+    escalares = {k: v for k, v in kpis.items() if k != 'tabla_proyeccion'}
+    columnas, constantes = {}, {}
+    if tabla is not None:
+        for nombre in tabla.columns:
+            serie = tabla[nombre]
+            if nombre in _COLUMNAS_TEXTO_CONSTANTE:
+                constantes[nombre] = serie.iloc[0] if len(serie) else None
+            elif nombre == 'Fase_Alimento':
+                columnas[nombre] = pd.Categorical(serie, categories=FASES).codes.astype(np.int8)
+            elif nombre == 'Fecha':
+                columnas[nombre] = np.asarray(pd.to_datetime(serie), dtype='datetime64[D]')
+            elif pd.api.types.is_integer_dtype(serie):
+                columnas[nombre] = serie.to_numpy(dtype=np.int32)
+            else:
+                columnas[nombre] = serie.to_numpy(dtype=np.float32)
+    for arreglo in columnas.values():
+        arreglo.setflags(write=False)
+    return {"kpis": escalares, "columnas": columnas, "constantes": constantes}
+
+
+def tabla_de(compacto):
+    """DataFrame de la tabla compacta (fase como categoría de FASES y fechas datetime64)."""
+    columnas = dict(compacto["columnas"])
+    if 'Fase_Alimento' in columnas:
+        columnas['Fase_Alimento'] = pd.Categorical.from_codes(columnas['Fase_Alimento'], categories=FASES)
+    tabla = pd.DataFrame(columnas)
+    for i, (nombre, valor) in enumerate(compacto["constantes"].items()):
+        tabla.insert(i, nombre, valor)
+    return tabla
+
+
+def bytes_de(compacto):
+    """Memoria aproximada de un resultado compacto: arreglos más escalares (~8 bytes por valor)."""
+    return (sum(a.nbytes for a in compacto["columnas"].values())
+            + 8 * (len(compacto["kpis"]) + len(compacto["constantes"])))
+
+
+# =============================================================================
+# --- ALMACÉN POR SESIÓN ---
+# =============================================================================
+
+def guardar(sesion, nombre, compacto, ahora=None):
+    """Guarda (o reemplaza) un resultado de la sesión y aplica la política de desalojo."""
+    ahora = time.monotonic() if ahora is None else ahora
+    with _lock:
+        entrada = _sesiones.setdefault(sesion, {"ultimo_acceso": ahora, "resultados": {}, "bytes": 0})
+        entrada["resultados"][nombre] = compacto
+        entrada["bytes"] = sum(bytes_de(c) for c in entrada["resultados"].values())
+        entrada["ultimo_acceso"] = ahora
+        _sesiones.move_to_end(sesion)
+        _contadores["guardados"] += 1
+        _desalojar(ahora, proteger=sesion)
+
+
+def obtener(sesion, nombre, ahora=None):
+    """Resultado guardado de la sesión, o None si nunca se guardó o fue desalojado."""
+    with _lock:
+        entrada = _sesiones.get(sesion)
+        if entrada is None:
+            return None
+        entrada["ultimo_acceso"] = time.monotonic() if ahora is None else ahora
+        _sesiones.move_to_end(sesion)
+        return entrada["resultados"].get(nombre)
+
+
+def olvidar(sesion):
+    """Libera todos los resultados de una sesión."""
+    with _lock:
+        _sesiones.pop(sesion, None)
+
+
+def _desalojar(ahora, proteger=None):
+    """Quita las sesiones inactivas y, si hace falta, las de acceso más antiguo hasta entrar en el presupuesto."""
+    for sesion in [s for s, e in _sesiones.items() if ahora - e["ultimo_acceso"] > INACTIVIDAD_MAX_S and s != proteger]:
+        del _sesiones[sesion]
+        _contadores["desalojos_inactividad"] += 1
+    total = sum(e["bytes"] for e in _sesiones.values())
+    for sesion in list(_sesiones):  # de la más antigua a la más reciente
+        if total <= MEMORIA_MAX_BYTES:
+            break
+        if sesion == proteger:
+            continue
+        total -= _sesiones.pop(sesion)["bytes"]
+        _contadores["desalojos_memoria"] += 1
+
+
+def desalojar(ahora=None):
+    """Aplica la política de desalojo sin guardar nada (por ejemplo, desde una tarea periódica)."""
+    with _lock:
+        _desalojar(time.monotonic() if ahora is None else ahora)
+
+
+def estadisticas(sesion=None):
+    """Memoria del almacén: total, sesiones, presupuesto, desalojos y, si se da, la de `sesion`."""
+    with _lock:
+        datos = {
+            "bytes_total": sum(e["bytes"] for e in _sesiones.values()),
+            "sesiones": len(_sesiones),
+            "maximo_bytes": MEMORIA_MAX_BYTES,
+            "inactividad_max_s": INACTIVIDAD_MAX_S,
+            **_contadores,
+        }
+        if sesion is not None:
+            entrada = _sesiones.get(sesion)
+            datos["bytes_sesion"] = entrada["bytes"] if entrada else 0
+        return datos
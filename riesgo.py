@@ -0,0 +1,133 @@
+"""
+Motor Monte Carlo del riesgo de mortalidad.
+
+Por cada lote sortea miles de trayectorias de mortalidad (total, momento y concentración
+semanal) como una sola matriz (sorteos × días), las costea con motor.evaluar_mortalidades
+y resume el costo por kilo, el costo de la mortalidad y las aves producidas en bandas de
+percentiles. Cada lote tiene su propio flujo aleatorio derivado de la semilla, así que el
+resultado es reproducible y no depende de cuántos procesos se usen.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from motor import (
+    TIPOS_MORTALIDAD, curvas_mortalidad, evaluar_mortalidades, perfil_de_costos,
+    preparar_lotes, proyectar_lotes,
+)
+
+SUPUESTOS_POR_DEFECTO = {
+    "cv_mortalidad": 0.30,                   # coeficiente de variación de la mortalidad total
+    "prob_tipos": (0.50, 0.25, 0.25),        # probabilidad de cada curva de TIPOS_MORTALIDAD
+    "concentracion_min": 50.0,               # % de la mortalidad concentrada en una semana
+    "concentracion_max": 90.0,
+}
+PERCENTILES = (5, 50, 95)
+INDICADORES_RIESGO = ["costo_total_por_kilo", "costo_total_mortalidad", "aves_producidas"]
+# Sin kilos producidos el costo por kilo no existe: esos sorteos cuentan como costo infinito.
+INDICADORES_POR_KILO = ["costo_total_por_kilo"]
+
+
+def sortear_mortalidad(rng, n_sorteos, dias_ciclo, aves, mortalidad_objetivo, supuestos=None):
+    """
+    Sortea `n_sorteos` curvas de mortalidad acumulada (sorteos × días). La mortalidad total
+    sigue una gamma con media en la mortalidad objetivo; el tipo de curva y el porcentaje
+    concentrado se sortean según los supuestos.
+    """
+    supuestos = {**SUPUESTOS_POR_DEFECTO, **(supuestos or {})}
+    cv = supuestos["cv_mortalidad"]
+    if cv > 0 and mortalidad_objetivo > 0:
+        forma = 1.0 / cv**2
+        total_porc = rng.gamma(forma, mortalidad_objetivo / forma, size=n_sorteos)
+    else:
+        total_porc = np.full(n_sorteos, float(mortalidad_objetivo))
+    total_porc = np.clip(total_porc, 0.0, 100.0)
+
+    prob = np.asarray(supuestos["prob_tipos"], dtype=float)
+    tipo = rng.choice(len(TIPOS_MORTALIDAD), size=n_sorteos, p=prob / prob.sum())
+    porcentaje = rng.uniform(supuestos["concentracion_min"], supuestos["concentracion_max"], size=n_sorteos)
+
+    return curvas_mortalidad(dias_ciclo, aves * (total_porc / 100.0), tipo, porcentaje)
+
+
+def _percentiles_con_cola(valores, sin_kilos):
+    """
+    Percentiles (interpolación lineal, como np.percentile) contando los sorteos sin kilos como
+    costo por kilo infinito: quedan al final de la cola en lugar de descartarse.
+    """
+    orden = np.sort(np.where(sin_kilos, np.inf, valores))
+    posicion = (len(orden) - 1) * np.asarray(PERCENTILES, dtype=float) / 100
+    bajo, alto = np.floor(posicion).astype(int), np.ceil(posicion).astype(int)
+    with np.errstate(invalid='ignore'):
+        interpolado = orden[bajo] + (posicion - bajo) * (orden[alto] - orden[bajo])
+    return np.where(np.isinf(orden[alto]), np.inf, interpolado)
+
+
+def _resumir(resultados):
+    sin_kilos = ~(resultados["kilos_totales_producidos"] > 0)
+    fila = {}
+    for indicador in INDICADORES_RIESGO:
+        valores = resultados[indicador]
+        if indicador in INDICADORES_POR_KILO:
+            bandas = _percentiles_con_cola(valores, sin_kilos)
+        else:
+            bandas = (np.nanpercentile(valores, PERCENTILES) if np.isfinite(valores).any()
+                      else np.full(len(PERCENTILES), np.nan))
+        for p, v in zip(PERCENTILES, bandas):
+            fila[f"{indicador}_p{p}"] = v
+    fila["fraccion_sin_kilos"] = sin_kilos.mean()
+    return fila
+
+
+def _simular_perfil(tarea):
+    """Sorteos y costeo de un lote; es una función de módulo para poder enviarla a otro proceso."""
+    perfil, semilla, n_sorteos, mortalidad_objetivo, supuestos = tarea
+    rng = np.random.default_rng(semilla)
+    mortalidad = sortear_mortalidad(
+        rng, n_sorteos, len(perfil["cons_diario"]), perfil["aves"], mortalidad_objetivo, supuestos,
+    )
+    return _resumir(evaluar_mortalidades(perfil, mortalidad))
+
+
+def simular_lotes(lotes, referencia, df_coeffs, df_coeffs_15, n_sorteos=10000, semilla=None,
+                  supuestos=None, procesos=None):
+    """
+    Simula la mortalidad de cada lote y devuelve un DataFrame (un lote por fila) con los
+    percentiles P5/P50/P95 de INDICADORES_RIESGO y la fracción de sorteos sin kilos producidos
+    (fraccion_sin_kilos; en el costo por kilo cuentan como infinito). Con `procesos` > 1 los lotes se reparten en
+    un pool de procesos; los lotes sin datos de referencia quedan en NaN.
+    """
+    lotes = preparar_lotes(lotes)
+    proyeccion = proyectar_lotes(lotes, referencia, df_coeffs, df_coeffs_15)
+    semillas = np.random.SeedSequence(semilla).spawn(len(lotes))
+
+    tareas, posiciones = [], []
+    for i, parametros in enumerate(lotes.to_dict('records')):
+        if not proyeccion["valido"][i]:
+            continue
+        d = proyeccion["n_dias"][i]
+        perfil = perfil_de_costos(
+            proyeccion["Cons_Acum_Ajustado"][i, :d], proyeccion["Fase"][i, :d],
+            proyeccion["kpis"]["peso_final_ave"][i], parametros,
+        )
+        tareas.append((perfil, semillas[i], n_sorteos, parametros['mortalidad_objetivo'], supuestos))
+        posiciones.append(i)
+
+    if procesos and procesos > 1 and len(tareas) > 1:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            filas = list(pool.map(_simular_perfil, tareas, chunksize=max(1, len(tareas) // (4 * procesos))))
+    else:
+        filas = [_simular_perfil(t) for t in tareas]
+
+    columnas = [f"{ind}_p{p}" for ind in INDICADORES_RIESGO for p in PERCENTILES] + ["fraccion_sin_kilos"]
+    resultado = pd.DataFrame(np.nan, index=lotes.index, columns=columnas)
+    if filas:
+        resultado.iloc[posiciones] = pd.DataFrame(filas, columns=columnas).to_numpy()
+    return resultado
+
+
+def simular_lote(parametros, referencia, df_coeffs, df_coeffs_15, n_sorteos=10000, semilla=None, supuestos=None):
+    """Atajo para un solo lote (por ejemplo st.session_state): devuelve un diccionario de percentiles."""
+    return simular_lotes([parametros], referencia, df_coeffs, df_coeffs_15, n_sorteos, semilla, supuestos).iloc[0].to_dict()
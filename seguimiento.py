@@ -0,0 +1,465 @@
+"""
+Seguimiento de lotes en curso con los registros diarios reales de la granja. No depende de Streamlit.
+
+Cada lote registrado (campos del panel lateral más un identificador 'lote') guarda solo
+acumulados: día, aves vivas, mortalidad, alimento entregado, consumo acumulado por ave, costo
+del alimento por fase y las sumas de la productividad ("Diferencia VS Genética" de la página
+4). Anexar un día actualiza esos acumulados sin recorrer el ciclo (O(1) por lote), así que
+cientos de lotes se pueden refrescar cada pocos minutos.
+
+La productividad compara el peso de cada pesaje con el peso genético (los coeficientes de
+peso al 100 %) al consumo real por ave de ese día, y se acumula como Σ peso real / Σ peso
+genético; antes del primer pesaje vale la productividad del plan.
+
+La reproyección parte del día N con el estado real: el consumo por ave sigue los incrementos
+diarios de la tabla base de la línea con la restricción del lote (tabla_base_cacheada, como
+reconstruir_tabla_base), el peso sale del mismo polinomio escalado por la productividad
+observada, y el día de sacrificio, la mortalidad lineal, las fases y los costos siguen las
+reglas del presupuesto. Se recalcula solo para los lotes que recibieron datos nuevos.
+
+Los registros llegan como CSV en una carpeta (lote, Dia o Fecha, Mortalidad, Alimento_Kg y,
+opcional, Peso_Muestra en gramos). Un día ya registrado se ignora, así que volver a leer un
+archivo no duplica nada; los archivos se leen en orden de nombre y deben aparecer completos
+(escritos con otro nombre y renombrados).
+
+Uso:
+    python seguimiento.py lotes.csv registros/ estado.csv --diario reproyeccion.csv --cada 300
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from motor import (
+    DIA_FIN_MODELO_15, DIR_ARCHIVOS, FASES, asignar_fases, cargar_referencias, clean_numeric_column,
+    construir_tabla_inversa, consumo_para_pesos, evaluar_horner, matriz_coeficientes, posicion_para_pesos,
+    precios_por_fase, preparar_lotes, proyectar_lotes, tabla_base_cacheada,
+)
+
+COLUMNAS_REGISTRO = ['lote', 'Dia', 'Mortalidad', 'Alimento_Kg', 'Peso_Muestra']
+KPIS_PLAN = ["dia_sacrificio", "peso_final_ave", "aves_producidas", "kilos_totales_producidos",
+             "consumo_total_kg", "conversion_alimenticia", "costo_total_por_kilo"]
+
+# lote → estado acumulado (ver _estado_inicial)
+_lotes = {}
+_lock = threading.Lock()
+
+
+# =============================================================================
+# --- REGISTRO DE LOTES ---
+# =============================================================================
+
+def _estado_inicial(parametros, plan, coef, base):
+    """Estado de un lote antes del primer día: el plan, lo que la reproyección necesita y los acumulados en cero."""
+    return {
+        "parametros": parametros,
+        "plan": plan,
+        "coef": coef,
+        "dias_base": base['Dia'].to_numpy(dtype=float),
+        "cons_base": base['Cons_Acum_Ajustado'].to_numpy(dtype=float),
+        "precios": precios_por_fase(parametros),
+        "dia": 0,
+        "aves": float(parametros['aves_programadas']),
+        "mortalidad": 0.0,
+        "alimento_kg": 0.0,
+        "costo_alimento": 0.0,
+        "cons_acum_ave": 0.0,
+        "ultimo_alimento_kg": 0.0,
+        "ultimo_costo_alimento": 0.0,
+        "pesajes": 0,
+        "suma_peso_real": 0.0,
+        "suma_peso_genetico": 0.0,
+        "ultimo_peso": np.nan,
+        "productividad_ultimo_pesaje": np.nan,
+        "revision": 0,
+        "reproyeccion": None,
+    }
+
+
+def registrar_lotes(lotes, referencia, df_coeffs, df_coeffs_15):
+    """
+    Registra los lotes de una tabla con columna 'lote' (los demás campos como en el panel
+    lateral). Proyecta el plan de todos en una sola pasada; los lotes ya registrados
+    conservan su estado. Devuelve {'registrados', 'existentes', 'errores': [(lote, mensaje)]}.
+    """
+    if 'lote' not in pd.DataFrame(lotes).columns:
+        raise ValueError("La tabla de lotes necesita una columna 'lote' con el identificador de cada lote.")
+    lotes = preparar_lotes(lotes).reset_index(drop=True)
+    lotes['lote'] = lotes['lote'].astype(str).str.strip()
+    with _lock:
+        nuevos = lotes[~lotes['lote'].isin(list(_lotes))].drop_duplicates('lote')
+    resumen = {"registrados": 0, "existentes": len(lotes) - len(nuevos), "errores": []}
+    if nuevos.empty:
+        return resumen
+
+    proyeccion = proyectar_lotes(nuevos, referencia, df_coeffs, df_coeffs_15)
+    matriz = matriz_coeficientes(df_coeffs, df_coeffs_15)
+    for i, fila in enumerate(nuevos.to_dict("records")):
+        if not proyeccion["valido"][i]:
+            resumen["errores"].append((fila['lote'], "sin datos de referencia o sin kilos en el plan"))
+            continue
+        linea = (fila['raza_seleccionada'], fila['sexo_seleccionado'])
+        base = tabla_base_cacheada(referencia, df_coeffs, df_coeffs_15, *linea, fila['restriccion_programada'], 100.0)
+        plan = {k: float(proyeccion["kpis"][k][i]) for k in [*KPIS_PLAN, "consumo_objetivo_ave"]}
+        plan["productividad"] = float(fila['productividad'])
+        estado = _estado_inicial(fila, plan, matriz['coef'][matriz['indice'][linea]], base)
+        with _lock:
+            _lotes.setdefault(fila['lote'], estado)
+        resumen["registrados"] += 1
+    return resumen
+
+
+def lotes_registrados():
+    with _lock:
+        return list(_lotes)
+
+
+def quitar_lote(lote):
+    """Olvida un lote (cerrado, o para volver a registrarlo y reingerir sus registros)."""
+    with _lock:
+        return _lotes.pop(lote, None) is not None
+
+
+# =============================================================================
+# --- REGISTROS DIARIOS (O(1) POR LOTE Y DÍA) ---
+# =============================================================================
+
+def _peso_genetico(coef, dia, cons_acum_ave):
+    """Peso de la línea al 100 % de productividad para un consumo acumulado (tramo de 15 días o general)."""
+    return float(evaluar_horner(coef[0 if dia <= DIA_FIN_MODELO_15 else 1], cons_acum_ave))
+
+
+def anexar_dia(lote, dia, mortalidad, alimento_kg, peso_muestra=None):
+    """
+    Agrega el registro real de un día: aves muertas, kilos de alimento entregados y, si hubo
+    pesaje, el peso promedio de la muestra (gramos). Solo actualiza los acumulados del lote.
+    Devuelve False si el día ya estaba registrado; lanza ValueError si el lote no existe,
+    falta un día intermedio o el registro no es válido.
+    """
+    dia = int(dia)
+    mortalidad, alimento_kg = float(mortalidad), float(alimento_kg)
+    with _lock:
+        estado = _lotes.get(lote)
+        if estado is None:
+            raise ValueError(f"Lote '{lote}' no registrado.")
+        if dia <= estado["dia"]:
+            return False
+        if dia != estado["dia"] + 1:
+            raise ValueError(f"Falta el día {estado['dia'] + 1} (llegó el {dia}).")
+        if not (mortalidad >= 0 and alimento_kg >= 0):
+            raise ValueError("Mortalidad y alimento deben ser números no negativos.")
+        aves = estado["aves"] - mortalidad
+        if aves <= 0:
+            raise ValueError("La mortalidad acumulada supera las aves del lote.")
+
+        # Consumo por ave con el saldo del día, como el presupuesto (kilos = consumo × saldo / 1000).
+        cons_acum_ave = estado["cons_acum_ave"] + alimento_kg * 1000 / aves
+        parametros = estado["parametros"]
+        fase = int(asignar_fases(cons_acum_ave, estado["plan"]["consumo_objetivo_ave"], parametros['pre_iniciador'],
+                                 parametros['iniciador'], parametros['retiro']))
+        costo = alimento_kg * estado["precios"][fase]
+        estado.update(dia=dia, aves=aves, mortalidad=estado["mortalidad"] + mortalidad,
+                      alimento_kg=estado["alimento_kg"] + alimento_kg, costo_alimento=estado["costo_alimento"] + costo,
+                      cons_acum_ave=cons_acum_ave, ultimo_alimento_kg=alimento_kg, ultimo_costo_alimento=costo)
+
+        if peso_muestra is not None and not np.isnan(peso_muestra) and peso_muestra > 0:
+            genetico = _peso_genetico(estado["coef"], dia, cons_acum_ave)
+            if genetico > 0:
+                estado["pesajes"] += 1
+                estado["suma_peso_real"] += float(peso_muestra)
+                estado["suma_peso_genetico"] += genetico
+                estado["ultimo_peso"] = float(peso_muestra)
+                estado["productividad_ultimo_pesaje"] = 100.0 * float(peso_muestra) / genetico
+        estado["revision"] += 1
+    return True
+
+
+def _productividad(estado):
+    if estado["pesajes"] == 0:
+        return estado["plan"]["productividad"]
+    return 100.0 * estado["suma_peso_real"] / estado["suma_peso_genetico"]
+
+
+def productividad(lote):
+    """Productividad (%) acumulada del lote (la del plan si aún no hay pesajes)."""
+    with _lock:
+        return _productividad(_lotes[lote])
+
+
+def normalizar_registros(df, llegadas=None):
+    """
+    Registros diarios con números limpios. Si no hay 'Dia' lo calcula desde 'Fecha' con la
+    fecha de llegada de cada lote (`llegadas`: lote → fecha). Mortalidad vacía cuenta como
+    cero; Peso_Muestra vacío es un día sin pesaje. Lanza ValueError si falta una columna.
+    """
+    faltantes = [c for c in ('lote', 'Mortalidad', 'Alimento_Kg') if c not in df.columns]
+    if 'Dia' not in df.columns and 'Fecha' not in df.columns:
+        faltantes.append('Dia o Fecha')
+    if faltantes:
+        raise ValueError(f"Faltan columnas en los registros: {', '.join(faltantes)}.")
+    lote = df['lote'].astype(str).str.strip()
+    if 'Dia' in df.columns:
+        dia = clean_numeric_column(df['Dia'])
+    else:
+        llegada = pd.to_datetime(lote.map(llegadas or {}), errors='coerce')
+        dia = (pd.to_datetime(df['Fecha'], errors='coerce') - llegada).dt.days + 1
+    registros = pd.DataFrame({
+        'lote': lote,
+        'Dia': dia,
+        'Mortalidad': clean_numeric_column(df['Mortalidad']).fillna(0.0),
+        'Alimento_Kg': clean_numeric_column(df['Alimento_Kg']),
+        'Peso_Muestra': clean_numeric_column(df['Peso_Muestra']) if 'Peso_Muestra' in df.columns else np.nan,
+    })
+    return registros.sort_values(['lote', 'Dia'], kind='stable').reset_index(drop=True)
+
+
+def ingerir(registros):
+    """
+    Anexa una tabla de registros diarios (ver normalizar_registros), en orden de lote y día.
+    Devuelve {'anexados', 'repetidos', 'errores': [(lote, dia, mensaje)]}.
+    """
+    with _lock:
+        llegadas = {lote: e["parametros"]['fecha_llegada'] for lote, e in _lotes.items()}
+    registros = normalizar_registros(registros, llegadas)
+    resumen = {"anexados": 0, "repetidos": 0, "errores": []}
+    for lote, dia, mortalidad, alimento, peso in zip(*(registros[c].to_numpy() for c in COLUMNAS_REGISTRO)):
+        try:
+            if np.isnan(dia):
+                raise ValueError("Día o fecha no válido.")
+            if anexar_dia(lote, dia, mortalidad, alimento, peso):
+                resumen["anexados"] += 1
+            else:
+                resumen["repetidos"] += 1
+        except ValueError as e:
+            resumen["errores"].append((lote, dia, str(e)))
+    return resumen
+
+
+def ingerir_carpeta(carpeta, vistos):
+    """
+    Ingiere, en orden de nombre, los CSV de `carpeta` que no estén en `vistos` (conjunto de
+    (nombre, tamaño, mtime) que el llamador conserva entre llamadas y que aquí se actualiza).
+    """
+    resumen = {"archivos": 0, "anexados": 0, "repetidos": 0, "errores": []}
+    for ruta in sorted(Path(carpeta).glob("*.csv")):
+        estado = ruta.stat()
+        firma = (ruta.name, estado.st_size, estado.st_mtime_ns)
+        if firma in vistos:
+            continue
+        try:
+            parcial = ingerir(pd.read_csv(ruta))
+        except (OSError, ValueError) as e:
+            parcial = {"anexados": 0, "repetidos": 0, "errores": [(ruta.name, None, str(e))]}
+        vistos.add(firma)
+        resumen["archivos"] += 1
+        for clave in ("anexados", "repetidos", "errores"):
+            resumen[clave] += parcial[clave]
+    return resumen
+
+
+# =============================================================================
+# --- REPROYECCIÓN DESDE EL DÍA N ---
+# =============================================================================
+
+def _reproyectar(estado):
+    """Resto del ciclo desde el estado real del día N (la primera fila es el día N, si N > 0)."""
+    parametros, n = estado["parametros"], estado["dia"]
+    prod = _productividad(estado)
+    dias_base, cons_base = estado["dias_base"], estado["cons_base"]
+    resto = dias_base > n
+    ancla = float(np.interp(n, dias_base, cons_base, left=0.0)) if n > 0 else 0.0
+
+    # Consumo por ave: el real hasta el día N y los incrementos de la tabla base desde ahí.
+    previo = slice(0, 1 if n > 0 else 0)
+    dia = np.r_[[float(n)][previo], dias_base[resto]]
+    cons = np.r_[[estado["cons_acum_ave"]][previo], estado["cons_acum_ave"] + (cons_base[resto] - ancla)]
+    curvas = evaluar_horner(estado["coef"][:, None, :], cons[None, :])
+    peso = np.where(dia <= DIA_FIN_MODELO_15, curvas[0], curvas[1]) * (prod / 100.0)
+
+    inversa = construir_tabla_inversa({'Dia': dia, 'Cons_Acum_Ajustado': cons, 'Peso_Estimado': peso})
+    peso_obj = float(parametros['peso_objetivo'])
+    consumo_obj = float(consumo_para_pesos(inversa, peso_obj))
+    ultimo = int(posicion_para_pesos(inversa, peso_obj))
+    dia, cons, peso = dia[:ultimo + 1].astype(int), cons[:ultimo + 1], peso[:ultimo + 1]
+    dia_sacrificio = int(dia[-1])
+    real = np.arange(len(dia)) < (n > 0)
+
+    # Mortalidad lineal del presupuesto hasta el día de sacrificio, sumada a la real del día N.
+    aves_programadas = float(parametros['aves_programadas'])
+    total_mortalidad = aves_programadas * (float(parametros['mortalidad_objetivo']) / 100.0)
+    paso = total_mortalidad / (dia_sacrificio - 1) if dia_sacrificio > 1 else 0.0
+    lineal = lambda d: np.floor(np.where((d == dia_sacrificio) & (dia_sacrificio > 1), total_mortalidad, (d - 1) * paso))
+    desde_n = lineal(dia) - (lineal(n) if n > 0 else 0.0)
+    mortalidad = estado["mortalidad"] + np.maximum(desde_n, 0.0)
+    saldo = aves_programadas - mortalidad
+
+    fase = asignar_fases(cons, consumo_obj, parametros['pre_iniciador'], parametros['iniciador'], parametros['retiro'])
+    cons_diario = np.diff(cons, prepend=ancla)
+    kilos = np.where(real, estado["ultimo_alimento_kg"], (cons_diario * saldo) / 1000)
+    costo = np.where(real, estado["ultimo_costo_alimento"], kilos * estado["precios"][fase])
+
+    columnas = {'Dia': dia}
+    llegada = parametros['fecha_llegada']
+    if pd.notna(llegada):
+        columnas['Fecha'] = np.datetime64(pd.Timestamp(llegada).date(), 'D') + (dia - 1).astype('timedelta64[D]')
+    columnas.update({
+        'Origen': np.where(real, "Real", "Proyectado"), 'Cons_Acum_Ajustado': cons, 'Peso_Estimado': peso,
+        'Fase_Alimento': np.asarray(FASES, dtype=object)[fase], 'Mortalidad_Acumulada': mortalidad, 'Saldo': saldo,
+        'Kilos_Diarios': kilos, 'Costo_Alimento': costo,
+    })
+
+    aves_producidas, peso_final = float(saldo[-1]), float(peso[-1])
+    kilos_totales = (aves_producidas * peso_final) / 1000 if aves_producidas > 0 else 0.0
+    consumo_total_kg = estado["alimento_kg"] + float(kilos[~real].sum())
+    costo_total_alimento = estado["costo_alimento"] + float(costo[~real].sum())
+    costo_total_lote = (costo_total_alimento + aves_programadas * float(parametros['costo_pollito'])
+                        + aves_programadas * float(parametros['otros_costos_ave']))
+    por_kilo = lambda v: v / kilos_totales if kilos_totales > 0 else np.nan
+    kpis = {
+        "dia_sacrificio": dia_sacrificio, "peso_final_ave": peso_final, "aves_producidas": aves_producidas,
+        "kilos_totales_producidos": kilos_totales, "consumo_total_kg": consumo_total_kg,
+        "conversion_alimenticia": por_kilo(consumo_total_kg), "costo_total_alimento": costo_total_alimento,
+        "costo_total_lote": costo_total_lote, "costo_total_por_kilo": por_kilo(costo_total_lote),
+        "consumo_objetivo_ave": consumo_obj, "productividad": prod,
+    }
+    return {"dia": n, "revision": estado["revision"], "columnas": columnas, "kpis": kpis}
+
+
+def reproyectar(lote):
+    """
+    Reproyección del lote desde su último día real: {'dia', 'columnas' (arreglos de los días N
+    a sacrificio, ver tabla_de_reproyeccion), 'kpis'}. Se guarda en el estado y solo se
+    recalcula si llegaron registros nuevos.
+    """
+    with _lock:
+        estado = _lotes[lote]
+        if estado["reproyeccion"] is not None and estado["reproyeccion"]["revision"] == estado["revision"]:
+            return estado["reproyeccion"]
+        foto = dict(estado)
+    resultado = _reproyectar(foto)
+    with _lock:
+        if _lotes.get(lote) is estado and estado["revision"] == resultado["revision"]:
+            estado["reproyeccion"] = resultado
+    return resultado
+
+
+def estado_de_lotes(lotes=None):
+    """
+    Una fila por lote con lo real acumulado, la productividad y los KPIs reproyectados junto
+    a los del plan (prefijo 'plan_').
+    """
+    filas = []
+    for lote in lotes if lotes is not None else lotes_registrados():
+        reproyeccion = reproyectar(lote)
+        with _lock:
+            estado = _lotes[lote]
+            parametros, aves_programadas = estado["parametros"], float(estado["parametros"]['aves_programadas'])
+            real = {
+                "Dia": estado["dia"], "Aves": estado["aves"], "Mortalidad_Acumulada": estado["mortalidad"],
+                "Mortalidad_%": 100.0 * estado["mortalidad"] / aves_programadas,
+                "Alimento_Kg": estado["alimento_kg"], "Costo_Alimento": estado["costo_alimento"],
+                "Cons_Acum_Ave_gr": estado["cons_acum_ave"], "Pesajes": estado["pesajes"],
+                "Ultimo_Peso": estado["ultimo_peso"], "Productividad": _productividad(estado),
+                "Productividad_Ultimo_Pesaje": estado["productividad_ultimo_pesaje"],
+            }
+            plan = estado["plan"]
+        filas.append({
+            "lote": lote, "RAZA": parametros['raza_seleccionada'], "SEXO": parametros['sexo_seleccionado'], **real,
+            **{k: reproyeccion["kpis"][k] for k in KPIS_PLAN},
+            "plan_productividad": plan["productividad"], **{f"plan_{k}": plan[k] for k in KPIS_PLAN},
+        })
+    return pd.DataFrame(filas)
+
+
+def tabla_de_reproyeccion(reproyeccion):
+    """DataFrame de la reproyección de un lote (la fila 'Real' es el día N)."""
+    return pd.DataFrame(reproyeccion["columnas"])
+
+
+def reproyeccion_larga(lotes=None):
+    """Reproyecciones de todos los lotes en una sola tabla con la columna 'lote' (un solo DataFrame al final)."""
+    lotes = lotes if lotes is not None else lotes_registrados()
+    partes = [reproyectar(lote)["columnas"] for lote in lotes]
+    if not partes:
+        return pd.DataFrame(columns=['lote'])
+    nombres = list(dict.fromkeys(nombre for columnas in partes for nombre in columnas))
+    larga = {'lote': np.repeat(np.asarray(lotes, dtype=object), [len(columnas['Dia']) for columnas in partes])}
+    for nombre in nombres:
+        vacia = np.full(1, np.datetime64('NaT', 'D') if nombre == 'Fecha' else None)
+        larga[nombre] = np.concatenate([columnas.get(nombre, np.repeat(vacia, len(columnas['Dia']))) for columnas in partes])
+    return pd.DataFrame(larga)
+
+
+# =============================================================================
+# --- VIGILANCIA DE UNA CARPETA DESDE LA LÍNEA DE COMANDOS ---
+# =============================================================================
+
+def _escribir_csv_atomico(df, ruta):
+    """Escribe el CSV con otro nombre y lo renombra: quien lo lea nunca ve un archivo a medias."""
+    ruta = Path(ruta)
+    descriptor, temporal = tempfile.mkstemp(prefix=ruta.stem, suffix=".tmp", dir=ruta.parent)
+    with os.fdopen(descriptor, "w", encoding="utf-8", newline="") as archivo:
+        df.to_csv(archivo, index=False)
+    os.chmod(temporal, 0o644)
+    os.replace(temporal, ruta)
+
+
+def actualizar(ruta_lotes, carpeta, salida, datos, vigilancia, diario=None):
+    """
+    Un ciclo: registra los lotes nuevos si cambió el archivo de lotes, ingiere los CSV nuevos
+    de la carpeta y escribe el estado (y la reproyección diaria). `vigilancia` guarda entre
+    ciclos el mtime del archivo de lotes y los archivos ya leídos. Devuelve el resumen.
+    """
+    resumen = {"registrados": 0, "errores": []}
+    mtime = os.stat(ruta_lotes).st_mtime_ns
+    if vigilancia.get("lotes_mtime") != mtime:
+        registro = registrar_lotes(pd.read_csv(ruta_lotes), *datos)
+        resumen.update(registrados=registro["registrados"], errores=[(l, None, m) for l, m in registro["errores"]])
+        vigilancia["lotes_mtime"] = mtime
+    ingesta = ingerir_carpeta(carpeta, vigilancia.setdefault("vistos", set()))
+    resumen.update(archivos=ingesta["archivos"], anexados=ingesta["anexados"], repetidos=ingesta["repetidos"],
+                   errores=resumen["errores"] + ingesta["errores"])
+    _escribir_csv_atomico(estado_de_lotes(), salida)
+    if diario:
+        _escribir_csv_atomico(reproyeccion_larga(), diario)
+    return resumen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("lotes", help="CSV de lotes en curso: columna 'lote' y los campos del panel lateral.")
+    parser.add_argument("carpeta", help="Carpeta donde llegan los CSV de registros diarios.")
+    parser.add_argument("salida", help="CSV con el estado y la reproyección de cada lote.")
+    parser.add_argument("--diario", help="CSV opcional con la reproyección diaria de todos los lotes.")
+    parser.add_argument("--cada", type=float, help="Segundos entre revisiones de la carpeta (sin esto, una sola pasada).")
+    parser.add_argument("--archivos", default=str(DIR_ARCHIVOS), help="Carpeta con la tabla genética y los coeficientes.")
+    parser.add_argument("--coeficientes", help="Versión de coeficientes ajustados (ver ajuste_curvas) en lugar de los entregados.")
+    args = parser.parse_args(argv)
+
+    referencia, df_coeffs, df_coeffs_15 = cargar_referencias(args.archivos)
+    if args.coeficientes:
+        import ajuste_curvas
+        df_coeffs, df_coeffs_15 = ajuste_curvas.coeficientes_de_version(args.coeficientes)
+    datos, vigilancia = (referencia, df_coeffs, df_coeffs_15), {}
+    while True:
+        inicio = time.perf_counter()
+        resumen = actualizar(args.lotes, args.carpeta, args.salida, datos, vigilancia, args.diario)
+        print(f"{len(lotes_registrados()):,} lotes · {resumen['archivos']} archivos nuevos · "
+              f"{resumen['anexados']:,} días anexados · {resumen['repetidos']:,} repetidos · "
+              f"{len(resumen['errores'])} errores · {(time.perf_counter() - inicio) * 1000:,.0f} ms", file=sys.stderr)
+        for lote, dia, mensaje in resumen["errores"][:20]:
+            print(f"  {lote} día {dia}: {mensaje}", file=sys.stderr)
+        if not args.cada:
+            return 0
+        time.sleep(args.cada)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,435 @@
+"""
+Servicio HTTP local con el presupuesto en JSON, para que otros sistemas (por ejemplo el ERP)
+pidan los números de un lote sin pasar por las páginas de Streamlit.
+
+Usa solo asyncio de la biblioteca estándar. Las tablas de referencia se cargan una vez al
+arrancar; cada cálculo corre en un pool de hilos para no bloquear el ciclo de eventos y la
+respuesta queda en una caché LRU por (ruta, parámetros), así que las consultas repetidas no
+vuelven a calcular. Todas las rutas de cálculo reciben un POST con un objeto JSON con los
+campos del panel lateral (los que falten toman LOTE_POR_DEFECTO):
+
+    POST /presupuesto       KPIs del presupuesto principal ("diario": true agrega la proyección)
+    POST /mortalidad        escenarios de mortalidad de la página 2
+    POST /alimentacion      plan simulado de la página 3 y plan de mínimo costo
+    POST /dia_sacrificio    día óptimo de sacrificio de la página 5
+    GET  /salud             estado del servicio y de las cachés
+
+Uso:
+    python servidor_api.py --puerto 8765 --hilos 4
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import math
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from motor import (
+    ARCHIVO_PRECIOS, CAMPOS_LOTE, DIR_ARCHIVOS, FASES, LOTE_POR_DEFECTO, TIPOS_MORTALIDAD, calcular_presupuesto,
+    cargar_precios_alimento, cargar_referencias, estadisticas_cache_tablas, kilos_por_fase_de_planes, matriz_escenarios_mortalidad,
+    optimizar_dia_sacrificio, optimizar_plan_alimentacion, perfil_mortalidad, planes_en_malla, precios_por_fase,
+    preparar_ciclo_alimentacion, preparar_lotes, tabla_base_cacheada, tabla_inversa_cacheada,
+)
+
+CACHE_RESPUESTAS_MAX = 512
+TAMANO_MAXIMO_CUERPO = 1 << 20
+ESTADOS_HTTP = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 422: "Unprocessable Entity", 500: "Internal Server Error"}
+
+# Datos de referencia del proceso: se cargan una sola vez en iniciar_datos.
+_datos = {}
+
+
+class ErrorDeSolicitud(ValueError):
+    """Error atribuible a la solicitud; se responde con su código HTTP y el mensaje."""
+
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def iniciar_datos(directorio=DIR_ARCHIVOS, ruta_precios=None):
+    """Carga la tabla genética, los coeficientes y, si hay, la serie de precios por fecha."""
+    referencia, df_coeffs, df_coeffs_15 = cargar_referencias(directorio)
+    precios = cargar_precios_alimento(ruta_precios) if ruta_precios else None
+    _datos.update(referencia=referencia, df_coeffs=df_coeffs, df_coeffs_15=df_coeffs_15, precios=precios)
+
+
+# --- PARÁMETROS Y SERIALIZACIÓN ---
+
+# Rango válido de cada campo numérico del lote: (mínimo, máximo, si el mínimo se admite),
+# como los controles del panel lateral (aves, peso y precios deben ser mayores que cero).
+RANGOS_NUMERICOS = {
+    "aves_programadas": (0, 10_000_000, False),
+    "costo_pollito": (0, 5000, True),
+    "peso_objetivo": (0, 10_000, False),
+    "mortalidad_objetivo": (0, 100, True),
+    "productividad": (0, 110, False),
+    "restriccion_programada": (0, 100, True),
+    "pre_iniciador": (0, 300, True),
+    "iniciador": (0, 2000, True),
+    "retiro": (0, 2000, True),
+    "val_pre_iniciador": (0, 5200, False),
+    "val_iniciador": (0, 5200, False),
+    "val_engorde": (0, 5200, False),
+    "val_retiro": (0, 5200, False),
+    "otros_costos_ave": (0, 10_000, True),
+}
+CAMPOS_TEXTO = ("raza_seleccionada", "sexo_seleccionado", "unidades_calculo")
+# Tamaño máximo de las listas de la solicitud y de la malla de planes de /alimentacion
+# (paso=10 en todo RANGOS_PLAN son ~780 mil planes; paso=1 serían 750 millones).
+LISTA_MAX = 1000
+PLANES_MAX = 1_000_000
+
+
+def numero_de_solicitud(nombre, valor, minimo=-math.inf, maximo=math.inf, minimo_incluido=True):
+    """Convierte un número de la solicitud (o texto numérico) a float finito dentro del rango; si no, 422."""
+    try:
+        if isinstance(valor, bool):
+            raise TypeError
+        numero = float(valor)
+    except (TypeError, ValueError):
+        raise ErrorDeSolicitud(422, f"{nombre} debe ser un número.") from None
+    dentro = numero >= minimo if minimo_incluido else numero > minimo
+    if not (math.isfinite(numero) and dentro and numero <= maximo):
+        limite = f"{'>=' if minimo_incluido else '>'} {minimo:g}" + (f" y <= {maximo:g}" if math.isfinite(maximo) else "")
+        raise ErrorDeSolicitud(422, f"{nombre} debe ser un número {limite}.")
+    return numero
+
+
+def lista_de_solicitud(nombre, valor, descripcion):
+    """Verifica que `valor` sea una lista no vacía de hasta LISTA_MAX elementos; si no, 422."""
+    if not isinstance(valor, list) or not 0 < len(valor) <= LISTA_MAX:
+        raise ErrorDeSolicitud(422, f"{nombre} debe ser una lista de 1 a {LISTA_MAX} {descripcion}.")
+    return valor
+
+
+def parametros_de_solicitud(cuerpo):
+    """
+    Completa los campos del lote con LOTE_POR_DEFECTO y valida tipos y rangos (RANGOS_NUMERICOS);
+    sin fecha usa la de hoy. Los valores inválidos se responden con 422.
+    """
+    if not isinstance(cuerpo, dict):
+        raise ErrorDeSolicitud(400, "El cuerpo debe ser un objeto JSON.")
+    lote = {campo: cuerpo[campo] for campo in CAMPOS_LOTE if campo in cuerpo}
+    for campo, rango in RANGOS_NUMERICOS.items():
+        if campo in lote:
+            numero = numero_de_solicitud(campo, lote[campo], *rango)
+            lote[campo] = int(numero) if isinstance(LOTE_POR_DEFECTO[campo], int) and numero.is_integer() else numero
+    for campo in CAMPOS_TEXTO:
+        if campo in lote and not isinstance(lote[campo], str):
+            raise ErrorDeSolicitud(422, f"{campo} debe ser texto.")
+    lote.setdefault("fecha_llegada", datetime.date.today().isoformat())
+    try:
+        parametros = preparar_lotes([lote]).iloc[0].to_dict()
+    except (TypeError, ValueError) as error:
+        raise ErrorDeSolicitud(422, f"Parámetros inválidos: {error}") from None
+    if pd.isna(parametros["fecha_llegada"]):
+        raise ErrorDeSolicitud(422, "fecha_llegada no es una fecha válida (AAAA-MM-DD).")
+    return parametros
+
+
+def a_json(valor):
+    """Convierte resultados del motor (NumPy, pandas, fechas) a tipos JSON; NaN e infinito pasan a null."""
+    if isinstance(valor, dict):
+        return {str(k): a_json(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [a_json(v) for v in valor]
+    if isinstance(valor, pd.DataFrame):
+        return [a_json(fila) for fila in valor.to_dict("records")]
+    if isinstance(valor, (pd.Series, np.ndarray)):
+        return a_json(valor.tolist())
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float):
+        return valor if math.isfinite(valor) else None
+    if isinstance(valor, (datetime.date, pd.Timestamp)):
+        return None if pd.isna(valor) else valor.isoformat()
+    return valor
+
+
+def _tablas(parametros):
+    argumentos = (
+        _datos["referencia"], _datos["df_coeffs"], _datos["df_coeffs_15"], parametros["raza_seleccionada"],
+        parametros["sexo_seleccionado"], parametros["restriccion_programada"], parametros["productividad"],
+    )
+    tabla_base = tabla_base_cacheada(*argumentos)
+    if tabla_base is None:
+        raise ErrorDeSolicitud(422, "No hay datos de referencia para la línea genética y sexo indicados.")
+    return tabla_base, tabla_inversa_cacheada(*argumentos)
+
+
+# --- CÁLCULOS POR RUTA (corren fuera del ciclo de eventos) ---
+
+def calcular_ruta_presupuesto(cuerpo):
+    parametros = parametros_de_solicitud(cuerpo)
+    kpis, tabla = calcular_presupuesto(
+        parametros, _datos["referencia"], _datos["df_coeffs"], _datos["df_coeffs_15"], _datos["precios"],
+    )
+    if tabla is None:
+        raise ErrorDeSolicitud(422, "No hay datos de referencia o el ciclo no produce kilos.")
+    respuesta = {"parametros": parametros, "kpis": None}
+    if kpis is not None:
+        respuesta["kpis"] = {k: v for k, v in kpis.items() if k != "tabla_proyeccion"}
+    if cuerpo.get("diario"):
+        respuesta["proyeccion"] = tabla.reset_index(drop=True)
+    return respuesta
+
+
+def calcular_ruta_mortalidad(cuerpo):
+    parametros = parametros_de_solicitud(cuerpo)
+    tabla_base, inversa = _tablas(parametros)
+    base = parametros["mortalidad_objetivo"]
+    mortalidades = lista_de_solicitud("mortalidades", cuerpo.get("mortalidades", [base + i * 0.5 for i in range(-3, 4)]),
+                                      "porcentajes entre 0 y 100")
+    mortalidades = [numero_de_solicitud("mortalidades", m, 0, 100) for m in mortalidades]
+    porcentajes = lista_de_solicitud("porcentajes", cuerpo.get("porcentajes", [50, 90]), "porcentajes entre 0 y 100")
+    porcentajes = [numero_de_solicitud("porcentajes", p, 0, 100) for p in porcentajes]
+    tipos = lista_de_solicitud("tipos", cuerpo.get("tipos", TIPOS_MORTALIDAD), "tipos de mortalidad")
+    if not all(isinstance(t, str) for t in tipos) or not set(tipos) <= set(TIPOS_MORTALIDAD):
+        raise ErrorDeSolicitud(422, f"Tipos de mortalidad válidos: {TIPOS_MORTALIDAD}.")
+
+    escenarios, _ = matriz_escenarios_mortalidad(
+        perfil_mortalidad(tabla_base, inversa, parametros), tipos, porcentajes, np.unique(mortalidades),
+    )
+    return {"parametros": parametros, "escenarios": escenarios}
+
+
+def calcular_ruta_alimentacion(cuerpo):
+    parametros = parametros_de_solicitud(cuerpo)
+    tabla_base, inversa = _tablas(parametros)
+    tabla, consumo_objetivo, kilos_producidos = preparar_ciclo_alimentacion(tabla_base, inversa, parametros)
+    cons = tabla["Cons_Acum_Ajustado"].to_numpy()
+    kilos_diarios = tabla["Kilos_Diarios_Lote"].to_numpy()
+    precios = precios_por_fase(parametros)
+
+    plan = (parametros["pre_iniciador"], parametros["iniciador"], parametros["retiro"])
+    kilos_fase = kilos_por_fase_de_planes(cons, kilos_diarios, consumo_objetivo, *plan)
+    actual = {
+        "pre_iniciador": plan[0], "iniciador": plan[1], "retiro": plan[2],
+        "engorde": consumo_objetivo - sum(plan), "costo_total_alimento": float(kilos_fase @ precios),
+        "kilos_por_fase": dict(zip(FASES, kilos_fase.tolist())),
+    }
+    paso = numero_de_solicitud("paso", cuerpo.get("paso", 10), 0, minimo_incluido=False)
+    limites_solicitud = cuerpo.get("limites") or {}
+    if not isinstance(limites_solicitud, dict) or not set(limites_solicitud) <= set(FASES):
+        raise ErrorDeSolicitud(422, f"limites debe ser un objeto con fases de {FASES}.")
+    limites = {}
+    for fase, rango in limites_solicitud.items():
+        if not isinstance(rango, list) or len(rango) != 2:
+            raise ErrorDeSolicitud(422, f"limites[{fase}] debe ser una lista [mínimo, máximo] en gramos.")
+        limites[fase] = tuple(numero_de_solicitud(f"limites[{fase}]", g, 0) for g in rango)
+    planes = planes_en_malla(limites, paso)
+    if planes > PLANES_MAX:
+        raise ErrorDeSolicitud(422, f"La malla tendría {planes:,} planes (máximo {PLANES_MAX:,}): use un paso mayor o acote limites.")
+    optimo = optimizar_plan_alimentacion(
+        cons, kilos_diarios, consumo_objetivo, precios, limites=limites, paso=paso, plan_actual=plan,
+    )
+    for resultado in (actual, optimo):
+        if resultado is not None:
+            resultado["costo_alimento_kilo"] = (resultado["costo_total_alimento"] / kilos_producidos
+                                                if kilos_producidos > 0 else None)
+    return {
+        "parametros": parametros, "consumo_objetivo_ave": consumo_objetivo,
+        "kilos_producidos": kilos_producidos, "plan_actual": actual, "plan_optimo": optimo,
+    }
+
+
+def calcular_ruta_dia_sacrificio(cuerpo):
+    parametros = parametros_de_solicitud(cuerpo)
+    tabla_base, _ = _tablas(parametros)
+    resultados = optimizar_dia_sacrificio(tabla_base, parametros)
+    if resultados.empty:
+        raise ErrorDeSolicitud(422, "Ningún día del ciclo produce kilos con estos parámetros.")
+    respuesta = {"parametros": parametros, "dia_optimo": resultados.loc[resultados["Total Costo x Kilo"].idxmin()]}
+    if cuerpo.get("diario"):
+        respuesta["por_dia"] = resultados
+    return respuesta
+
+
+RUTAS = {
+    "/presupuesto": calcular_ruta_presupuesto,
+    "/mortalidad": calcular_ruta_mortalidad,
+    "/alimentacion": calcular_ruta_alimentacion,
+    "/dia_sacrificio": calcular_ruta_dia_sacrificio,
+}
+
+
+def responder(ruta, cuerpo_canonico):
+    """Calcula la ruta para un cuerpo JSON ya normalizado y devuelve los bytes de la respuesta."""
+    resultado = RUTAS[ruta](json.loads(cuerpo_canonico))
+    return json.dumps(a_json(resultado), ensure_ascii=False).encode("utf-8")
+
+
+# --- CACHÉ DE RESPUESTAS ---
+
+_respuestas = OrderedDict()
+_respuestas_contadores = {"hits": 0, "misses": 0}
+_respuestas_lock = threading.Lock()
+
+
+def _respuesta_cacheada(clave):
+    with _respuestas_lock:
+        if clave in _respuestas:
+            _respuestas.move_to_end(clave)
+            _respuestas_contadores["hits"] += 1
+            return _respuestas[clave]
+        _respuestas_contadores["misses"] += 1
+        return None
+
+
+def _guardar_respuesta(clave, respuesta):
+    with _respuestas_lock:
+        _respuestas[clave] = respuesta
+        _respuestas.move_to_end(clave)
+        while len(_respuestas) > CACHE_RESPUESTAS_MAX:
+            _respuestas.popitem(last=False)
+
+
+def estado_servicio():
+    with _respuestas_lock:
+        respuestas = {**_respuestas_contadores, "entradas": len(_respuestas), "maximo": CACHE_RESPUESTAS_MAX}
+    return {
+        "estado": "ok", "rutas": sorted(RUTAS), "precios_por_fecha": _datos.get("precios") is not None,
+        "cache_respuestas": respuestas,
+        "cache_tablas": {nombre: estadisticas_cache_tablas(nombre) for nombre in ("tablas", "inversas", "coeficientes", "etapas")},
+    }
+
+
+# --- HTTP SOBRE ASYNCIO ---
+
+async def _leer_solicitud(lector):
+    """Lee una solicitud HTTP/1.1; devuelve (método, ruta, encabezados, cuerpo) o None si se cerró la conexión."""
+    try:
+        linea = await lector.readline()
+    except ConnectionError:
+        return None
+    if not linea:
+        return None
+    try:
+        metodo, destino, _ = linea.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise ErrorDeSolicitud(400, "Línea de solicitud inválida.") from None
+
+    encabezados = {}
+    while True:
+        linea = await lector.readline()
+        if linea in (b"\r\n", b"\n", b""):
+            break
+        nombre, _, valor = linea.decode("latin-1").partition(":")
+        encabezados[nombre.strip().lower()] = valor.strip()
+
+    longitud = int(encabezados.get("content-length", 0) or 0)
+    if longitud > TAMANO_MAXIMO_CUERPO:
+        raise ErrorDeSolicitud(413, "El cuerpo de la solicitud es demasiado grande.")
+    cuerpo = await lector.readexactly(longitud) if longitud else b""
+    return metodo.upper(), destino.split("?", 1)[0].rstrip("/") or "/", encabezados, cuerpo
+
+
+def _escribir_respuesta(escritor, estado, datos, mantener):
+    escritor.write(
+        f"HTTP/1.1 {estado} {ESTADOS_HTTP[estado]}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(datos)}\r\n"
+        f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n".encode("latin-1") + datos
+    )
+
+
+def _error(mensaje):
+    return json.dumps({"error": mensaje}, ensure_ascii=False).encode("utf-8")
+
+
+async def _atender(metodo, ruta, cuerpo, ejecutor):
+    """Resuelve una solicitud ya leída; devuelve (estado, bytes)."""
+    if ruta == "/salud":
+        return 200, json.dumps(estado_servicio(), ensure_ascii=False).encode("utf-8")
+    if ruta not in RUTAS:
+        return 404, _error(f"Ruta desconocida. Rutas: {sorted(RUTAS) + ['/salud']}.")
+    if metodo != "POST":
+        return 405, _error("Use POST con un objeto JSON.")
+    try:
+        datos = json.loads(cuerpo or b"{}")
+    except ValueError:
+        return 400, _error("El cuerpo no es JSON válido.")
+    # Sin fecha de llegada se usa la de hoy; se fija antes de armar la clave de la caché para
+    # no servir mañana una respuesta calculada con la fecha de hoy.
+    if isinstance(datos, dict) and "fecha_llegada" not in datos:
+        datos["fecha_llegada"] = datetime.date.today().isoformat()
+    cuerpo_canonico = json.dumps(datos, sort_keys=True, separators=(",", ":"))
+
+    clave = (ruta, cuerpo_canonico)
+    respuesta = _respuesta_cacheada(clave)
+    if respuesta is None:
+        bucle = asyncio.get_running_loop()
+        try:
+            respuesta = await bucle.run_in_executor(ejecutor, responder, ruta, cuerpo_canonico)
+        except ErrorDeSolicitud as error:
+            return error.estado, _error(str(error))
+        _guardar_respuesta(clave, respuesta)
+    return 200, respuesta
+
+
+async def manejar_conexion(lector, escritor, ejecutor):
+    """Atiende las solicitudes de una conexión (con keep-alive) hasta que el cliente la cierre."""
+    try:
+        while True:
+            try:
+                solicitud = await _leer_solicitud(lector)
+            except ErrorDeSolicitud as error:
+                _escribir_respuesta(escritor, error.estado, _error(str(error)), mantener=False)
+                break
+            except (asyncio.IncompleteReadError, ValueError):
+                _escribir_respuesta(escritor, 400, _error("Solicitud incompleta o mal formada."), mantener=False)
+                break
+            if solicitud is None:
+                break
+            metodo, ruta, encabezados, cuerpo = solicitud
+            mantener = encabezados.get("connection", "").lower() != "close"
+            try:
+                estado, datos = await _atender(metodo, ruta, cuerpo, ejecutor)
+            except Exception as error:  # el servicio sigue atendiendo aunque falle un cálculo
+                estado, datos = 500, _error(f"Error interno: {error}")
+            _escribir_respuesta(escritor, estado, datos, mantener)
+            await escritor.drain()
+            if not mantener:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        escritor.close()
+
+
+async def servir(anfitrion="127.0.0.1", puerto=8765, hilos=4):
+    """Arranca el servicio y atiende hasta que se cancele (Ctrl+C)."""
+    with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="presupuesto") as ejecutor:
+        servidor = await asyncio.start_server(partial(manejar_conexion, ejecutor=ejecutor), anfitrion, puerto)
+        print(f"Servicio de presupuesto en http://{anfitrion}:{puerto} (rutas: {', '.join(sorted(RUTAS))}, /salud)")
+        async with servidor:
+            await servidor.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servicio HTTP local (JSON) del presupuesto de pollo de engorde.")
+    parser.add_argument("--anfitrion", default="127.0.0.1", help="Dirección de escucha (por defecto solo local).")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--hilos", type=int, default=4, help="Hilos para los cálculos (por defecto 4).")
+    parser.add_argument("--archivos", default=str(DIR_ARCHIVOS), help="Carpeta con la tabla genética y los coeficientes.")
+    parser.add_argument("--precios", help="CSV de precios del alimento por fecha (por defecto ARCHIVOS/Precios_Alimento.csv si existe).")
+    args = parser.parse_args(argv)
+
+    iniciar_datos(args.archivos, args.precios or (ARCHIVO_PRECIOS if ARCHIVO_PRECIOS.exists() else None))
+    try:
+        asyncio.run(servir(args.anfitrion, args.puerto, args.hilos))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
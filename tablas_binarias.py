@@ -0,0 +1,256 @@
+"""
+Formato binario versionado de las tablas de referencia (ARCHIVOS/*.csv). No depende de Streamlit.
+
+Cada CSV se convierte en un .npz sin comprimir a su lado, con una columna tipada por campo
+(texto como Unicode de ancho fijo, números ya limpios de comas decimales, ver
+motor.clean_numeric_column), las etiquetas de fila originales y un manifiesto con la versión
+del esquema, la huella SHA-256 del CSV de origen y la del contenido. La tabla genética se
+guarda agrupada por línea (RAZA, SEXO), así que cada línea es un tramo contiguo.
+
+Al cargar, cada columna se mapea en memoria directamente desde el archivo (sin copiarla ni
+volver a interpretar texto): varios procesos del servidor comparten las mismas páginas. Si el
+CSV cambió, el esquema es de otra versión o la huella del contenido no coincide, el binario se
+reconstruye; si no se puede leer ni escribir, el llamador vuelve al CSV.
+
+    python tablas_binarias.py                 # construye o actualiza los binarios de ARCHIVOS/
+    python tablas_binarias.py --verificar     # solo informa cuáles están vigentes
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from motor import DIR_ARCHIVOS, clean_numeric_column
+
+ESQUEMA_VERSION = 1
+
+# Tablas de ARCHIVOS/ que se convierten: columnas por las que se agrupan sus filas y columnas
+# que se guardan como float (las que motor.indexar_referencia usa como float).
+TABLAS = {
+    "ROSS_COBB_HUBBARD_2025.csv": {"agrupar": ("RAZA", "SEXO"), "flotantes": ("Peso", "Cons_Acum")},
+    "Cons_Acum_Peso.csv": {},
+    "Cons_Acum_Peso_15.csv": {},
+}
+
+_MANIFIESTO = "__manifiesto__"
+_INDICE = "__indice__"
+
+
+def ruta_binaria(ruta_csv):
+    return Path(ruta_csv).with_suffix(".npz")
+
+
+def _huella_archivo(ruta):
+    return hashlib.sha256(Path(ruta).read_bytes()).hexdigest()
+
+
+def _huella_contenido(columnas):
+    """SHA-256 de las columnas (nombre, tipo, forma y bytes), en orden."""
+    huella = hashlib.sha256()
+    for nombre, arreglo in columnas.items():
+        huella.update(f"{nombre}|{arreglo.dtype.str}|{arreglo.shape}".encode())
+        huella.update(np.ascontiguousarray(arreglo).tobytes())
+    return huella.hexdigest()
+
+
+# =============================================================================
+# --- CONVERSIÓN CSV → COLUMNAS TIPADAS ---
+# =============================================================================
+
+def _columna_tipada(serie, flotante=False):
+    """Columna numérica (entera o float, sin comas decimales) o texto Unicode de ancho fijo."""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.to_numpy(dtype=float) if flotante else serie.to_numpy()
+    numerica = clean_numeric_column(serie)
+    if numerica.notna().sum() == serie.notna().sum():
+        return numerica.to_numpy(dtype=float)
+    if serie.isna().any():
+        raise ValueError(f"La columna de texto '{serie.name}' tiene celdas vacías.")
+    return serie.to_numpy(dtype=str)
+
+
+def columnas_de_csv(ruta_csv, agrupar=None, flotantes=()):
+    """
+    Lee el CSV y devuelve sus columnas tipadas más las etiquetas de fila originales
+    (_INDICE). Con `agrupar` las filas de cada grupo quedan contiguas, en el orden de
+    primera aparición y sin alterar el orden dentro del grupo (como groupby(sort=False)).
+    """
+    df = pd.read_csv(ruta_csv)
+    if agrupar:
+        codigo = df.groupby(list(agrupar), sort=False).ngroup().to_numpy()
+        df = df.iloc[np.argsort(codigo, kind="stable")]
+    columnas = {nombre: _columna_tipada(df[nombre], nombre in flotantes) for nombre in df.columns}
+    columnas[_INDICE] = df.index.to_numpy()
+    return columnas
+
+
+def _opciones(ruta_csv):
+    opciones = TABLAS.get(Path(ruta_csv).name, {})
+    return {"agrupar": list(opciones.get("agrupar") or []), "flotantes": list(opciones.get("flotantes") or [])}
+
+
+def escribir(ruta_csv):
+    """Construye el binario de `ruta_csv` (escritura atómica: otro proceso nunca ve un archivo a medias)."""
+    ruta_csv = Path(ruta_csv)
+    opciones = _opciones(ruta_csv)
+    columnas = columnas_de_csv(ruta_csv, **opciones)
+    estado = ruta_csv.stat()
+    manifiesto = {
+        "esquema": ESQUEMA_VERSION,
+        "fuente": ruta_csv.name,
+        "fuente_sha256": _huella_archivo(ruta_csv),
+        "fuente_bytes": estado.st_size,
+        "fuente_mtime_ns": estado.st_mtime_ns,
+        **opciones,
+        "columnas": list(columnas),
+        "contenido_sha256": _huella_contenido(columnas),
+    }
+    destino = ruta_binaria(ruta_csv)
+    descriptor, temporal = tempfile.mkstemp(prefix=destino.stem, suffix=".tmp", dir=destino.parent)
+    try:
+        with os.fdopen(descriptor, "wb") as archivo:
+            np.savez(archivo, **{f"c{i}": a for i, a in enumerate(columnas.values())},
+                     **{_MANIFIESTO: np.frombuffer(json.dumps(manifiesto).encode(), dtype=np.uint8)})
+        os.chmod(temporal, 0o644)  # mkstemp lo crea 0600; otros procesos del servidor deben poder leerlo
+        os.replace(temporal, destino)
+    except BaseException:
+        Path(temporal).unlink(missing_ok=True)
+        raise
+    return destino
+
+
+# =============================================================================
+# --- LECTURA MAPEADA EN MEMORIA ---
+# =============================================================================
+
+def _mapear(ruta):
+    """
+    Abre un .npz sin comprimir y devuelve (manifiesto, columnas) con cada columna como un
+    arreglo de solo lectura sobre el mmap del archivo (np.load no mapea los miembros de un .npz).
+    """
+    with open(ruta, "rb") as archivo:
+        memoria = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+    miembros = {}
+    with zipfile.ZipFile(ruta) as zf:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{ruta.name}: el miembro {info.filename} está comprimido.")
+            largo_nombre, largo_extra = struct.unpack_from("<HH", memoria, info.header_offset + 26)
+            inicio = info.header_offset + 30 + largo_nombre + largo_extra
+            cabecera = io.BytesIO(memoria[inicio:inicio + 4096])
+            version = np.lib.format.read_magic(cabecera)
+            leer_cabecera = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+            forma, fortran, dtype = leer_cabecera(cabecera)
+            if dtype.hasobject:
+                raise ValueError(f"{ruta.name}: el miembro {info.filename} tiene objetos de Python.")
+            arreglo = np.frombuffer(memoria, dtype=dtype, count=int(np.prod(forma)), offset=inicio + cabecera.tell())
+            miembros[info.filename.removesuffix(".npy")] = arreglo.reshape(forma, order="F" if fortran else "C")
+    manifiesto = json.loads(miembros.pop(_MANIFIESTO).tobytes())
+    columnas = {nombre: miembros[f"c{i}"] for i, nombre in enumerate(manifiesto["columnas"])}
+    return manifiesto, columnas
+
+
+def _vigente(manifiesto, columnas, ruta_csv):
+    """El binario corresponde al CSV actual, al esquema y a las opciones de TABLAS, y su contenido está íntegro."""
+    if manifiesto.get("esquema") != ESQUEMA_VERSION or any(manifiesto.get(k) != v for k, v in _opciones(ruta_csv).items()):
+        return False
+    estado = Path(ruta_csv).stat()
+    mismo_archivo = (estado.st_size, estado.st_mtime_ns) == (manifiesto["fuente_bytes"], manifiesto["fuente_mtime_ns"])
+    if not mismo_archivo and _huella_archivo(ruta_csv) != manifiesto["fuente_sha256"]:
+        return False
+    return _huella_contenido(columnas) == manifiesto["contenido_sha256"]
+
+
+def cargar(ruta_csv):
+    """
+    Columnas mapeadas en memoria del binario de `ruta_csv`, reconstruyéndolo si hace falta.
+    Devuelve None si no se puede usar (por ejemplo, ARCHIVOS/ de solo lectura sin binario
+    vigente); el llamador lee entonces el CSV.
+    """
+    binario = ruta_binaria(ruta_csv)
+    for intento in range(2):
+        try:
+            manifiesto, columnas = _mapear(binario)
+            if _vigente(manifiesto, columnas, ruta_csv):
+                return columnas
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            pass
+        if intento == 0:
+            try:
+                escribir(ruta_csv)
+            except (OSError, ValueError):
+                return None
+    return None
+
+
+def tabla(ruta_csv):
+    """DataFrame sobre las columnas mapeadas (sin copiarlas), con las etiquetas de fila originales; None si no hay binario."""
+    columnas = cargar(ruta_csv)
+    if columnas is None:
+        return None
+    datos = {nombre: arreglo for nombre, arreglo in columnas.items() if nombre != _INDICE}
+    etiquetas = columnas[_INDICE]
+    indice = pd.RangeIndex(len(etiquetas)) if np.array_equal(etiquetas, np.arange(len(etiquetas))) else pd.Index(etiquetas)
+    return pd.DataFrame(datos, index=indice, copy=False)
+
+
+def referencia_indexada(ruta_csv):
+    """
+    Tabla genética indexada por (RAZA, SEXO) como la de motor.indexar_referencia, pero cada
+    arreglo es un tramo del archivo mapeado (sin copia). None si no hay binario.
+    """
+    columnas = cargar(ruta_csv)
+    if columnas is None:
+        return None
+    raza, sexo = columnas["RAZA"], columnas["SEXO"]
+    cortes = np.flatnonzero((raza[1:] != raza[:-1]) | (sexo[1:] != sexo[:-1])) + 1
+    if Path(ruta_csv).name not in TABLAS or len(cortes) + 1 != len(set(zip(raza, sexo))):
+        return None  # sin la agrupación y los tipos de TABLAS las líneas no son tramos contiguos
+    indice = {}
+    for inicio, fin in zip(np.r_[0, cortes], np.r_[cortes, len(raza)]):
+        indice[(str(raza[inicio]), str(sexo[inicio]))] = {
+            'Dia': columnas['Dia'][inicio:fin], 'Peso': columnas['Peso'][inicio:fin],
+            'Cons_Acum': columnas['Cons_Acum'][inicio:fin], 'Indice': columnas[_INDICE][inicio:fin],
+        }
+    return indice
+
+
+# =============================================================================
+# --- CONSTRUCCIÓN DESDE LA LÍNEA DE COMANDOS ---
+# =============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directorio", type=Path, default=DIR_ARCHIVOS)
+    parser.add_argument("--verificar", action="store_true", help="No reconstruye; termina con código 1 si alguno no está vigente.")
+    args = parser.parse_args(argv)
+
+    vigentes = True
+    for nombre in TABLAS:
+        ruta_csv = args.directorio / nombre
+        if args.verificar:
+            try:
+                ok = _vigente(*_mapear(ruta_binaria(ruta_csv)), ruta_csv)
+            except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+                ok = False
+            vigentes &= ok
+            print(f"{nombre}: {'vigente' if ok else 'falta o desactualizado'}")
+        else:
+            destino = escribir(ruta_csv)
+            print(f"{nombre} → {destino.name} ({destino.stat().st_size:,} bytes)")
+    return 0 if vigentes else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Tramos de tiempo por etapa de una ejecución de página (carga de datos, tablas, escenarios,
+formato con Styler, gráficos), para ver en qué se va el tiempo cuando una página se siente
+lenta. No depende de Streamlit.
+
+Las mediciones se guardan por hilo (Streamlit corre cada ejecución de una sesión en su hilo)
+y solo si se activaron con iniciar(True). Apagadas, etapa() retorna de inmediato y tramo()
+devuelve un contexto vacío compartido, así que el costo es una consulta de atributo.
+
+    iniciar(activo, "Presupuesto Principal")
+    etapa("Carga de datos")            # cierra la etapa anterior y abre esta
+    with tramo("calcular_presupuesto"):  # tramo anidado dentro de la etapa en curso
+        ...
+    tramos(), a_json(), a_chrome_trace()
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+_estado = threading.local()
+_NULO = nullcontext()
+
+
+def iniciar(activo=True, pagina=""):
+    """Empieza una ejecución nueva: descarta los tramos anteriores del hilo."""
+    _estado.activo = bool(activo)
+    _estado.pagina = pagina
+    _estado.origen = time.perf_counter()
+    _estado.tramos = []
+    _estado.abierta = None
+    _estado.profundidad = 0
+
+
+def activo():
+    return getattr(_estado, "activo", False)
+
+
+def _registrar(nombre, inicio, fin, profundidad):
+    _estado.tramos.append({
+        "nombre": nombre,
+        "inicio_ms": (inicio - _estado.origen) * 1000,
+        "duracion_ms": (fin - inicio) * 1000,
+        "profundidad": profundidad,
+    })
+
+
+def etapa(nombre=None):
+    """Cierra la etapa en curso y abre `nombre`; sin nombre solo la cierra."""
+    if not getattr(_estado, "activo", False):
+        return
+    ahora = time.perf_counter()
+    if _estado.abierta is not None:
+        _registrar(*_estado.abierta, ahora, 0)
+    _estado.abierta = (nombre, ahora) if nombre else None
+
+
+@contextmanager
+def _medir(nombre):
+    inicio = time.perf_counter()
+    _estado.profundidad += 1
+    try:
+        yield
+    finally:
+        _estado.profundidad -= 1
+        _registrar(nombre, inicio, time.perf_counter(), _estado.profundidad + 1)
+
+
+def tramo(nombre):
+    """Contexto que mide un bloque dentro de la etapa en curso (anidable)."""
+    if not getattr(_estado, "activo", False):
+        return _NULO
+    return _medir(nombre)
+
+
+def tramos():
+    """Tramos de la ejecución en curso ordenados por inicio; cierra la etapa abierta."""
+    if not activo():
+        return []
+    etapa(None)
+    return sorted(_estado.tramos, key=lambda t: (t["inicio_ms"], t["profundidad"]))
+
+
+def total_ms():
+    return (time.perf_counter() - _estado.origen) * 1000 if activo() else 0.0
+
+
+def a_json():
+    """Tramos de la ejecución como JSON (página, total y lista de tramos)."""
+    return json.dumps({"pagina": _estado.pagina, "total_ms": total_ms(), "tramos": tramos()},
+                      ensure_ascii=False, indent=1)
+
+
+def a_chrome_trace():
+    """Tramos en el formato Trace Event de Chrome (chrome://tracing, Perfetto)."""
+    eventos = [{
+        "name": t["nombre"], "cat": _estado.pagina, "ph": "X", "pid": 1, "tid": 1,
+        "ts": round(t["inicio_ms"] * 1000, 3), "dur": round(t["duracion_ms"] * 1000, 3),
+    } for t in tramos()]
+    return json.dumps({"traceEvents": eventos, "displayTimeUnit": "ms"}, ensure_ascii=False)
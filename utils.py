@@ -1,14 +1,27 @@
 # Contenido COMPLETO y ACTUALIZADO para: utils.py
 
+import io
+import mmap
+import uuid
+
 import streamlit as st
 import pandas as pd
 import numpy as np
+import ajuste_curvas
+import motor
+import resultados
+import trazas
+from motor import (
+    buscar_coeficientes, tabla_base_cacheada, tabla_inversa_cacheada,
+)
 
-@st.cache_data
 def load_data(file_path):
-    """Carga datos desde un archivo CSV de forma robusta."""
+    """
+    Carga datos desde un archivo CSV de forma robusta. Lee de la caché del proceso
+    (motor.leer_csv_cacheado), que motor.precalentar puede dejar lista antes de la primera sesión.
+    """
     try:
-        return pd.read_csv(file_path)
+        return motor.leer_csv_cacheado(file_path)
     except FileNotFoundError:
         # Este es el error que estás viendo
         st.error(f"Error Crítico: No se encontró el archivo de datos en: {file_path}")
@@ -17,23 +30,96 @@ def load_data(file_path):
         st.error(f"Error Crítico al cargar el archivo {file_path.name}: {e}")
         return None
 
-def clean_numeric_column(series):
-    """Convierte una columna a tipo numérico, manejando comas como decimales."""
-    if series.dtype == 'object':
-        return pd.to_numeric(series.str.replace(',', '.', regex=False), errors='coerce')
-    return series
+def load_referencia(file_path):
+    """
+    Carga la tabla genética una sola vez por proceso y la deja indexada por (RAZA, SEXO)
+    en arrays de solo lectura, compartidos por todas las páginas y sesiones.
+    """
+    try:
+        return motor.referencia_cacheada(file_path)
+    except FileNotFoundError:
+        st.error(f"Error Crítico: No se encontró el archivo de datos en: {file_path}")
+        return None
+    except Exception as e:
+        st.error(f"Error Crítico al cargar el archivo {file_path.name}: {e}")
+        return None
+
+@st.cache_data
+def load_precios_alimento(file_path):
+    """Carga la serie opcional de precios del alimento por fecha; None si el archivo no existe."""
+    try:
+        return motor.cargar_precios_alimento(file_path)
+    except Exception as e:
+        st.warning(f"No se pudo leer la serie de precios {file_path.name}: {e}. Se usan los costos por fase del panel.")
+        return None
+
+# --- COEFICIENTES DE PESO (ENTREGADOS O AJUSTADOS) ---
+def load_coeficientes():
+    """
+    Coeficientes de peso (día >= 15 y día <= 14) de la sesión: los de la versión ajustada que se
+    eligió en la página de ajuste (st.session_state['version_coeficientes']) o los entregados.
+    """
+    version = st.session_state.get("version_coeficientes")
+    if version:
+        try:
+            return ajuste_curvas.coeficientes_de_version(version)
+        except (FileNotFoundError, ValueError) as e:
+            st.warning(f"No se pudo leer la versión de coeficientes {version}: {e}. Se usan los entregados.")
+            st.session_state["version_coeficientes"] = None
+    return (load_data(motor.DIR_ARCHIVOS / ajuste_curvas.ARCHIVO_COEFICIENTES),
+            load_data(motor.DIR_ARCHIVOS / ajuste_curvas.ARCHIVO_COEFICIENTES_15))
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def leer_registros(contenido):
+    """Registros históricos subidos (bytes de un CSV), normalizados con ajuste_curvas.normalizar_registros."""
+    return ajuste_curvas.normalizar_registros(pd.read_csv(io.BytesIO(contenido)))
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def ajustar_registros(registros):
+    """Ajuste de coeficientes de unos registros ya filtrados; cada combinación de filtros se ajusta una sola vez."""
+    return ajuste_curvas.ajustar_coeficientes(registros)
+
+# --- RECURSOS ESTÁTICOS (LOGO, ÍCONO, GUÍA PDF) ---
+# Se leen y decodifican una vez por proceso; las reejecuciones de todas las sesiones reciben
+# el mismo objeto sin tocar el disco.
+ARCHIVO_LOGO = motor.DIR_ARCHIVOS / "log_PEQ.png"
+ARCHIVO_ICONO = motor.DIR_ARCHIVOS / "pollito_tapabocas.ico"
+ARCHIVO_GUIA_PDF = motor.DIR_ARCHIVOS / "Costeo_Pollo_Engorde_ Granja_a_Sacrificio.pdf"
+
+@st.cache_resource(show_spinner=False)
+def imagen_png(file_path, ancho=None):
+    """
+    Imagen como bytes PNG, ya reducida al ancho con que se muestra. st.image y page_icon
+    aceptan esos bytes tal cual (no vuelven a decodificar ni a escalar en cada ejecución).
+    """
+    from PIL import Image
+    imagen = Image.open(file_path)
+    if ancho and imagen.width > ancho:
+        imagen = imagen.resize((ancho, int(imagen.height * ancho / imagen.width)), resample=Image.BILINEAR)
+    buffer = io.BytesIO()
+    imagen.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+@st.cache_resource(show_spinner=False)
+def imagen_rgba(file_path):
+    """Imagen decodificada como arreglo RGBA de solo lectura (marcas de agua de los gráficos)."""
+    from PIL import Image
+    arreglo = np.asarray(Image.open(file_path).convert("RGBA"))
+    arreglo.flags.writeable = False
+    return arreglo
+
+@st.cache_resource(show_spinner=False)
+def archivo_mapeado(file_path):
+    """Archivo de solo lectura mapeado en memoria; las páginas del SO se comparten entre sesiones."""
+    with open(file_path, "rb") as archivo:
+        return mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
 
 def calcular_peso_estimado(data, coeffs_df, raza, sexo):
     """Calcula el peso estimado usando coeficientes de regresión polinomial."""
     if coeffs_df is None: return pd.Series(0, index=data.index)
-    coeffs_seleccion = coeffs_df[(coeffs_df['RAZA'] == raza) & (coeffs_df['SEXO'] == sexo)]
-    if not coeffs_seleccion.empty:
-        params = coeffs_seleccion.iloc[0]
-        x = data['Cons_Acum_Ajustado']
-        return (params['Intercept'] + params['Coef_1'] * x + params['Coef_2'] * (x**2) + 
-                params['Coef_3'] * (x**3) + params['Coef_4'] * (x**4))
-    st.warning(f"No se encontraron coeficientes de peso para {raza} - {sexo}.")
-    return pd.Series(0, index=data.index)
+    if buscar_coeficientes(coeffs_df, raza, sexo) is None:
+        st.warning(f"No se encontraron coeficientes de peso para {raza} - {sexo}.")
+    return motor.calcular_peso_estimado(data, coeffs_df, raza, sexo)
 
 def style_kpi_df(df):
     """Aplica formato condicional a un DataFrame de KPIs de forma eficiente."""
@@ -45,57 +131,122 @@ def style_kpi_df(df):
     df_styled['Valor'] = [formatter(val, name) for name, val in df['Valor'].items()]
     return df_styled
 
-def calcular_curva_mortalidad(dias_ciclo, total_mortalidad, tipo, porcentaje=50):
-    """Genera un array de mortalidad acumulada según un escenario."""
-    dias_ciclo = int(dias_ciclo)
-    total_mortalidad = float(total_mortalidad)
-    mortalidad_acumulada = np.zeros(dias_ciclo)
-    if tipo == "Lineal (Uniforme)":
-        mortalidad_acumulada = np.linspace(0, total_mortalidad, dias_ciclo)
-    elif tipo == "Concentrada al Inicio (Semana 1)":
-        dias_concentracion = min(7, dias_ciclo)
-        mortalidad_inicial = total_mortalidad * (porcentaje / 100.0)
-        mortalidad_restante = total_mortalidad - mortalidad_inicial
-        curva_inicial = np.linspace(0, mortalidad_inicial, dias_concentracion)
-        mortalidad_acumulada[:dias_concentracion] = curva_inicial
-        if dias_ciclo > dias_concentracion:
-            curva_restante = np.linspace(0, mortalidad_restante, dias_ciclo - dias_concentracion)
-            mortalidad_acumulada[dias_concentracion:] = mortalidad_inicial + curva_restante
-    elif tipo == "Concentrada al Final (Última Semana)":
-        dias_concentracion = min(7, dias_ciclo)
-        punto_inicio_final = dias_ciclo - dias_concentracion
-        mortalidad_final_concentrada = total_mortalidad * (porcentaje / 100.0)
-        mortalidad_previa = total_mortalidad - mortalidad_final_concentrada
-        if punto_inicio_final > 0:
-            curva_previa = np.linspace(0, mortalidad_previa, punto_inicio_final)
-            mortalidad_acumulada[:punto_inicio_final] = curva_previa
-        curva_final = np.linspace(0, mortalidad_final_concentrada, dias_concentracion)
-        mortalidad_acumulada[punto_inicio_final:] = mortalidad_previa + curva_final
-    return np.floor(mortalidad_acumulada)
-
 # --- NUEVA FUNCIÓN CENTRALIZADA ---
-def reconstruir_tabla_base(st_session_state, df_referencia, df_coeffs, df_coeffs_15):
+def reconstruir_tabla_base(st_session_state, referencia, df_coeffs, df_coeffs_15):
     """
     Reconstruye la tabla base de proyecciones a partir de los parámetros guardados en la sesión.
+    `referencia` es el índice por línea de load_referencia (o la tabla genética cruda).
+    El resultado sale de la caché LRU compartida de motor.tabla_base_cacheada.
     Devuelve la tabla truncada al peso objetivo y lista para simulaciones.
     """
-    tabla = df_referencia[
-        (df_referencia['RAZA'] == st_session_state.raza_seleccionada) &
-        (df_referencia['SEXO'] == st_session_state.sexo_seleccionado)
-    ].copy()
+    raza, sexo = st_session_state.raza_seleccionada, st_session_state.sexo_seleccionado
+    tabla = tabla_base_cacheada(
+        referencia, df_coeffs, df_coeffs_15, raza, sexo,
+        st_session_state.restriccion_programada, st_session_state.productividad
+    )
+    if tabla is not None:
+        for coeffs_df in (df_coeffs_15, df_coeffs):
+            if coeffs_df is not None and buscar_coeficientes(coeffs_df, raza, sexo) is None:
+                st.warning(f"No se encontraron coeficientes de peso para {raza} - {sexo}.")
+    return tabla
 
-    if tabla.empty:
-        return None
+def reconstruir_tabla_inversa(st_session_state, referencia, df_coeffs, df_coeffs_15):
+    """
+    Tabla inversa peso → consumo/día de la línea y condiciones de la sesión, para consultar
+    muchos pesos objetivo con motor.consumo_para_pesos / motor.posicion_para_pesos.
+    """
+    return tabla_inversa_cacheada(
+        referencia, df_coeffs, df_coeffs_15,
+        st_session_state.raza_seleccionada, st_session_state.sexo_seleccionado,
+        st_session_state.restriccion_programada, st_session_state.productividad
+    )
 
-    tabla['Cons_Acum'] = clean_numeric_column(tabla['Cons_Acum'])
-    tabla['Peso'] = clean_numeric_column(tabla['Peso'])
-    factor_ajuste = 1 - (st_session_state.restriccion_programada / 100.0)
-    tabla['Cons_Acum_Ajustado'] = tabla['Cons_Acum'] * factor_ajuste
-    
-    dias_1_14 = tabla['Dia'] <= 14
-    dias_15_adelante = tabla['Dia'] >= 15
-    tabla.loc[dias_1_14, 'Peso_Estimado'] = calcular_peso_estimado(tabla[dias_1_14], df_coeffs_15, st_session_state.raza_seleccionada, st_session_state.sexo_seleccionado)
-    tabla.loc[dias_15_adelante, 'Peso_Estimado'] = calcular_peso_estimado(tabla[dias_15_adelante], df_coeffs, st_session_state.raza_seleccionada, st_session_state.sexo_seleccionado)
-    tabla['Peso_Estimado'] *= (st_session_state.productividad / 100.0)
-    
-    return tabla
+
+# --- RESULTADOS DE LA SESIÓN (ALMACÉN COMPACTO) ---
+def id_sesion():
+    """Identificador de la sesión en el almacén de resultados (se crea en la primera ejecución)."""
+    if "_id_sesion" not in st.session_state:
+        st.session_state["_id_sesion"] = uuid.uuid4().hex
+    return st.session_state["_id_sesion"]
+
+def guardar_resultados_base(kpis):
+    """
+    Guarda el presupuesto de la sesión en el almacén del proceso: los KPIs escalares y la tabla
+    diaria compacta (kpis['tabla_proyeccion']). Las páginas los leen con kpis_resultados_base y
+    tabla_resultados_base.
+    """
+    resultados.guardar(id_sesion(), "resultados_base", resultados.compactar(kpis))
+
+def kpis_resultados_base():
+    """KPIs del último presupuesto de la sesión, o None si no hay o fue desalojado (hay que recalcularlo)."""
+    compacto = resultados.obtener(id_sesion(), "resultados_base")
+    return None if compacto is None else dict(compacto["kpis"])
+
+def tabla_resultados_base():
+    """Tabla diaria del último presupuesto de la sesión, o None si no hay o fue desalojada."""
+    compacto = resultados.obtener(id_sesion(), "resultados_base")
+    return None if compacto is None else resultados.tabla_de(compacto)
+
+
+# --- OPCIONES DEL PANEL LATERAL: GRÁFICOS Y RENDIMIENTO ---
+def iniciar_trazas(pagina):
+    """
+    Empieza la medición de tramos de esta ejecución si el panel de rendimiento está activo y
+    marca la sesión como activa en el almacén de resultados (no se desaloja por inactividad).
+    """
+    trazas.iniciar(st.session_state.get("panel_rendimiento", False), pagina)
+    resultados.obtener(id_sesion(), "resultados_base")
+    trazas.etapa("Configuración de página")
+
+def _casilla_persistente(etiqueta, clave, ayuda):
+    """Casilla del panel lateral cuyo valor vive en st.session_state[clave] y se conserva entre páginas."""
+    def copiar():
+        st.session_state[clave] = st.session_state[f"_casilla_{clave}"]
+    return st.sidebar.checkbox(etiqueta, value=st.session_state.get(clave, False), key=f"_casilla_{clave}",
+                               on_change=copiar, help=ayuda)
+
+def casilla_graficos_navegador():
+    """Casilla del modo en que el navegador dibuja los gráficos (Vega-Lite) en lugar de recibir imágenes."""
+    st.sidebar.markdown("---")
+    _casilla_persistente(
+        "📈 Gráficos en el navegador", "graficos_navegador",
+        "Envía los datos de los gráficos y los dibuja el navegador (interactivos, sin rasterizar en el servidor).",
+    )
+
+def mostrar_panel_rendimiento():
+    """
+    Casilla del panel lateral que activa la medición y, si está activa, la tabla de tramos de
+    esta ejecución con descargas en JSON y en formato de traza de Chrome. Va al final de la página.
+    """
+    _casilla_persistente(
+        "⏱️ Panel de rendimiento", "panel_rendimiento",
+        "Mide el tiempo de cada etapa de la página (depuración). Desactivado no agrega costo.",
+    )
+    if not trazas.activo():
+        return
+    tramos = trazas.tramos()
+    with st.sidebar.expander("⏱️ Tiempos de esta ejecución", expanded=True):
+        st.caption(f"Total: {trazas.total_ms():,.1f} ms")
+        memoria = resultados.estadisticas(id_sesion())
+        st.caption(
+            f"Resultados en memoria: esta sesión {memoria['bytes_sesion'] / 1024:,.1f} KB · proceso "
+            f"{memoria['bytes_total'] / 2**20:,.2f} de {memoria['maximo_bytes'] / 2**20:,.0f} MB "
+            f"({memoria['sesiones']} sesiones, {memoria['desalojos_inactividad'] + memoria['desalojos_memoria']} desalojadas)"
+        )
+        caches = {nombre: motor.estadisticas_cache_tablas(nombre) for nombre in ("tablas", "inversas", "coeficientes", "archivos", "etapas")}
+        st.caption(
+            "Cachés del motor (compartidas): " + " · ".join(
+                f"{nombre} {c['bytes'] / 2**20:,.2f} MB ({c['entradas']})" for nombre, c in caches.items())
+            + f" · máximo {motor.CACHE_BYTES_MAX / 2**20:,.0f} MB por caché, "
+            f"{sum(c['desalojos'] for c in caches.values())} desalojos"
+        )
+        if tramos:
+            df_tramos = pd.DataFrame(tramos)
+            df_tramos['Etapa'] = ["· " * t['profundidad'] + t['nombre'] for t in tramos]
+            st.dataframe(
+                df_tramos[['Etapa', 'duracion_ms']].rename(columns={'duracion_ms': 'ms'}).style.format({'ms': "{:,.1f}"}),
+                hide_index=True, use_container_width=True,
+            )
+        st.download_button("Descargar JSON", trazas.a_json(), file_name="tiempos.json", mime="application/json")
+        st.download_button("Descargar traza de Chrome", trazas.a_chrome_trace(), file_name="traza_chrome.json",
+                           mime="application/json", help="Abrir en chrome://tracing o ui.perfetto.dev")